@@ -50,11 +50,13 @@ class PackDownloadService {
     statusNotifier.value = status;
   }
 
+  // If config URL ends with .json, use it directly; otherwise append /packs.json
+  static String get _manifestUrl =>
+      _baseUrl.endsWith('.json') ? _baseUrl : '$_baseUrl/packs.json';
+
   Future<List<Map<String, dynamic>>> fetchPacks() async {
     try {
-      // If config URL ends with .json, use it directly; otherwise append /packs.json
-      final url = _baseUrl.endsWith('.json') ? _baseUrl : '$_baseUrl/packs.json';
-      final response = await _client.get(Uri.parse(url));
+      final response = await _client.get(Uri.parse(_manifestUrl));
       if (response.statusCode == 200) {
         final data = jsonDecode(response.body);
         return List<Map<String, dynamic>>.from(data['packs']);
@@ -78,10 +80,14 @@ class PackDownloadService {
       return;
     }
 
-    final url = pack['url'] as String;
+    // Generated manifests use URLs relative to packs.json; absolute URLs pass through
+    final manifestUri = Uri.parse(_manifestUrl);
+    final url = manifestUri.resolve(pack['url'] as String).toString();
     final int parts = pack['parts'] ?? 1;
     final List<String>? explicitPartUrls = pack['part_urls'] != null 
-        ? List<String>.from(pack['part_urls']) 
+        ? List<String>.from(pack['part_urls'])
+            .map((u) => manifestUri.resolve(u).toString())
+            .toList()
         : null;
 
     try {
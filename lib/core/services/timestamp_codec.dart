@@ -0,0 +1,97 @@
+import 'dart:typed_data';
+
+/// Decoder for the compact verse timestamp format (assets/audio_timestamps.bin).
+/// The layout is documented in scripts/timestamp_codec.py, which also writes it.
+///
+/// Only the chapter index is parsed up front; chapters are decoded on demand.
+class TimestampFile {
+  static const _magic = [0x45, 0x59, 0x54, 0x53]; // 'EYTS'
+  static const _version = 1;
+  static const _headerSize = 12;
+  static const _recordSize = 8;
+  static const _kindContiguous = 0;
+  static const _kindPairs = 1;
+
+  final Uint8List _data;
+  final int _dataOffset;
+  // book * 1000 + chapter -> (segments, offset)
+  final Map<int, (int, int)> _index;
+
+  TimestampFile._(this._data, this._dataOffset, this._index);
+
+  factory TimestampFile(Uint8List data) {
+    final view = ByteData.sublistView(data);
+    for (var i = 0; i < _magic.length; i++) {
+      if (data[i] != _magic[i]) throw const FormatException('Not a timestamp file');
+    }
+    final version = view.getUint16(4, Endian.little);
+    if (version != _version) {
+      throw FormatException('Unsupported timestamp file version $version');
+    }
+    final count = view.getUint32(8, Endian.little);
+    final index = <int, (int, int)>{};
+    for (var i = 0; i < count; i++) {
+      final pos = _headerSize + i * _recordSize;
+      final book = data[pos];
+      final chapter = data[pos + 1];
+      final segments = view.getUint16(pos + 2, Endian.little);
+      final offset = view.getUint32(pos + 4, Endian.little);
+      index[book * 1000 + chapter] = (segments, offset);
+    }
+    return TimestampFile._(data, _headerSize + count * _recordSize, index);
+  }
+
+  int get chapterCount => _index.length;
+
+  bool contains(int book, int chapter) => _index.containsKey(book * 1000 + chapter);
+
+  /// [[begin, end], ...] in seconds, or an empty list if the chapter is absent.
+  List<List<double>> chapter(int book, int chapter) {
+    final entry = _index[book * 1000 + chapter];
+    if (entry == null) return [];
+    final (segments, offset) = entry;
+    if (segments == 0) return [];
+
+    var pos = _dataOffset + offset;
+    final kind = _data[pos++];
+
+    int readVarint() {
+      var value = 0;
+      var shift = 0;
+      while (true) {
+        final byte = _data[pos++];
+        value |= (byte & 0x7f) << shift;
+        if (byte < 0x80) return value;
+        shift += 7;
+      }
+    }
+
+    if (kind == _kindContiguous) {
+      // segments + 1 boundaries: absolute first value, then deltas
+      var value = readVarint();
+      var begin = value / 1000;
+      return List.generate(segments, (_) {
+        value += readVarint();
+        final end = value / 1000;
+        final segment = [begin, end];
+        begin = end;
+        return segment;
+      });
+    }
+    if (kind == _kindPairs) {
+      // zigzag deltas over [b0, e0, b1, e1, ...]
+      var value = 0;
+      double next() {
+        final z = readVarint();
+        value += (z & 1) == 0 ? z >> 1 : -(z >> 1) - 1;
+        return value / 1000;
+      }
+
+      return List.generate(segments, (_) {
+        final begin = next();
+        return [begin, next()];
+      });
+    }
+    throw FormatException('Unknown chapter encoding $kind');
+  }
+}
@@ -1,10 +1,13 @@
-import 'dart:convert';
 import 'package:flutter/services.dart';
 import 'package:injectable/injectable.dart';
 
+import 'timestamp_codec.dart';
+
 @singleton
 class WeightService {
-  Map<String, dynamic>? _timestamps;
+  static const _timestampsAsset = 'assets/audio_timestamps.bin';
+
+  TimestampFile? _timestamps;
 
   Future<void> init() async {
     await loadTimestamps();
@@ -13,9 +16,10 @@ class WeightService {
   Future<void> loadTimestamps() async {
     if (_timestamps != null) return;
     try {
-      final jsonString = await rootBundle.loadString('assets/audio_timestamps.json');
-      _timestamps = json.decode(jsonString);
-      print('✅ Timestamps loaded from assets/audio_timestamps.json');
+      // Binary format (scripts/build_timestamps_bin.py): only the chapter index is parsed here
+      final data = await rootBundle.load(_timestampsAsset);
+      _timestamps = TimestampFile(data.buffer.asUint8List(data.offsetInBytes, data.lengthInBytes));
+      print('✅ Timestamps loaded from $_timestampsAsset (${_timestamps!.chapterCount} chapters)');
     } catch (e) {
       print('❌ Error loading timestamps: $e');
     }
@@ -24,28 +28,13 @@ class WeightService {
   List<List<double>> getChapterTimestamps(int bookId, int chapter) {
     if (_timestamps == null) return [];
 
-    final bookData = _timestamps![bookId.toString()];
-    if (bookData == null) return [];
-
-    dynamic chapterData;
-    if (bookData is Map) {
-      chapterData = bookData[chapter.toString()];
-    } else if (bookData is List) {
-      // If it's a list, we assume it's for Chapter 1 (some NT data is flat)
-      if (chapter == 1) {
-        chapterData = bookData;
-      }
-    }
-
-    if (chapterData == null) {
+    if (!_timestamps!.contains(bookId, chapter)) {
       print('⚠️ [WeightService] No timestamps for Book $bookId Chapter $chapter');
       return [];
     }
 
     try {
-      return (chapterData as List).map((verse) {
-        return (verse as List).map((val) => (val as num).toDouble()).toList();
-      }).toList();
+      return _timestamps!.chapter(bookId, chapter);
     } catch (e) {
       print('❌ [WeightService] Parse error for $bookId:$chapter: $e');
       return [];
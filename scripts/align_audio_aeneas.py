@@ -1,155 +1,274 @@
 
+"""
+用 aeneas 把 data/hehemp3 的章节音频与经文强制对齐，生成 assets/audio_timestamps.json
+- 进程池并行 (默认 CPU 核数)，每章完成后追加写入日志 audio_timestamps.json.journal 并 fsync
+- 中断后重跑: 从已有 JSON + 日志恢复，只对齐剩下的章节
+- 经文一次性从数据库读入内存，直接构建 aeneas TextFile (不写临时文件);
+  每个 worker 进程只创建一次 RuntimeConfiguration，开启 tts_cache，同一章内重复的文本行只合成一次
+- --realign: 按语速给每章打分 (alignment_quality.py)，只把低置信度章节换参数并行重新对齐，
+  新结果置信度更高才采用
+- 结束时输出各阶段耗时 (读经文、构建任务、aeneas 对齐、生成结果、写日志、写最终文件)
+- 全部结束后把结果原子写入最终 JSON (紧凑格式) 和 App 使用的 audio_timestamps.bin，再删除日志
+用法: python scripts/align_audio_aeneas.py [--jobs 8]
+"""
+
+import argparse
 import os
-import sqlite3
 import json
-import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from aeneas.executetask import ExecuteTask
+from aeneas.language import Language
+from aeneas.runtimeconfiguration import RuntimeConfiguration
 from aeneas.task import Task
+from aeneas.textfile import TextFile, TextFragment
+
+from alignment_quality import (REPORT_PATH, corpus_baseline, load_texts, print_summary, score_all,
+                               score_chapter, write_report)
+from gen_weights import BIBLE_BOOKS
+from timestamp_codec import encode
+
+TASK_CONFIG = "task_language=cmn|is_text_type=plain|os_task_file_format=json"
+RUNTIME_CONFIG = "tts_cache=True"
+# --realign 重新对齐低置信度章节时的参数: 更大的 DTW 搜索范围、MFCC 忽略非语音帧、边界取静音中点
+REALIGN_TASK_CONFIG = TASK_CONFIG + "|task_adjust_boundary_algorithm=percent|task_adjust_boundary_percent_value=50"
+REALIGN_RUNTIME_CONFIG = RUNTIME_CONFIG + "|dtw_margin=120|mfcc_mask_nonspeech=True"
+
+# 每个 worker 进程一份，进程启动时创建一次 (init_worker)
+_RCONF = None
+
+def init_worker(runtime_config=RUNTIME_CONFIG):
+    global _RCONF
+    # tts_cache: 同一章内重复的文本行 (诗篇的叠句等) 只合成一次
+    _RCONF = RuntimeConfiguration(runtime_config)
 
-# Bible Books Metadata (id, name_zh, chapter_count)
-BIBLE_BOOKS = [
-    (1, "创世记", 50), (2, "出埃及记", 40), (3, "利未记", 27), (4, "民数记", 36), (5, "申命记", 34),
-    (6, "约书亚记", 24), (7, "士师记", 21), (8, "路得记", 4), (9, "撒母耳记上", 31), (10, "撒母耳记下", 24),
-    (11, "列王纪上", 22), (12, "列王纪下", 25), (13, "历代志上", 29), (14, "历代志下", 36), (15, "以斯拉记", 10),
-    (16, "尼希米记", 13), (17, "以斯帖记", 10), (18, "约伯记", 42), (19, "诗篇", 150), (20, "箴言", 31),
-    (21, "传道书", 12), (22, "雅歌", 8), (23, "以赛亚书", 66), (24, "耶利米书", 52), (25, "耶利米哀歌", 5),
-    (26, "以西结书", 48), (27, "但以理书", 12), (28, "何西阿书", 14), (29, "约珥书", 3), (30, "阿摩司书", 9),
-    (31, "俄巴底亚书", 1), (32, "约拿书", 4), (33, "弥迦书", 7), (34, "那鸿书", 3), (35, "哈巴谷书", 3),
-    (36, "西番雅书", 3), (37, "哈该书", 2), (38, "撒迦利亚书", 14), (39, "玛拉基书", 4), (40, "马太福音", 28),
-    (41, "马可福音", 16), (42, "路加福音", 24), (43, "约翰福音", 21), (44, "使徒行传", 28), (45, "罗马书", 16),
-    (46, "哥林多前书", 16), (47, "哥林多后书", 13), (48, "加拉太书", 6), (49, "以弗所书", 6), (50, "腓立比书", 4),
-    (51, "歌罗西书", 4), (52, "帖撒罗尼迦前书", 5), (53, "帖撒罗尼迦后书", 3), (54, "提摩太前书", 6), (55, "提摩太后书", 4),
-    (56, "提多书", 3), (57, "腓利门书", 1), (58, "希伯来书", 13), (59, "雅各书", 5), (60, "彼得前书", 5),
-    (61, "彼得后书", 3), (62, "约翰一书", 5), (63, "约翰二书", 1), (64, "约翰三书", 1), (65, "犹大书", 1),
-    (66, "启示录", 22)
-]
-
-def get_verses(db_path, book_id, chapter):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT verse, text FROM verses WHERE book_id = ? AND chapter = ? ORDER BY verse", (book_id, chapter))
-    verses = cursor.fetchall()
-    conn.close()
-    return [v[1] for v in verses]
-
-def align_chapter(audio_path, text_lines, output_format="json"):
-    # Create temp text file
-    temp_text_path = "temp_align.txt"
-    with open(temp_text_path, "w", encoding="utf-8") as f:
-        for line in text_lines:
-            f.write(line + "\n")
-
-    # Configure Task
-    config_string = "task_language=cmn|is_text_type=plain|os_task_file_format=json"
-    task = Task(config_string=config_string)
+def build_text_file(text_lines):
+    """直接在内存中构建 aeneas TextFile，不经过临时文件"""
+    text_file = TextFile()
+    for i, line in enumerate(text_lines, 1):
+        text_file.add_fragment(TextFragment(identifier=f"f{i:06d}", language=Language.CMN,
+                                            lines=[line], filtered_lines=[line]))
+    return text_file
+
+def align_chapter(audio_path, text_lines, stages, task_config=TASK_CONFIG):
+    """对齐一章 (在进程池中运行)，返回 [[begin, end], ...]，失败抛异常; 各阶段耗时记入 stages"""
+    start = time.perf_counter()
+    task = Task(config_string=task_config)
     task.audio_file_path_absolute = os.path.abspath(audio_path)
-    task.text_file_path_absolute = os.path.abspath(temp_text_path)
+    task.text_file = build_text_file(text_lines)
+    stages["setup"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # 解码、MFCC、合成参考语音、DTW 都在 aeneas 内部，无法再细分
+    ExecuteTask(task, rconf=_RCONF).execute()
+    stages["align"] = time.perf_counter() - start
 
-    # Run Task
+    start = time.perf_counter()
+    timestamps = [[float(frag.begin), float(frag.end)] for frag in task.sync_map_leaves()]
+    stages["sync_map"] = time.perf_counter() - start
+    return timestamps
+
+def align_job(book_id, chapter, audio_path, text_lines, task_config=TASK_CONFIG):
+    stages = {}
     try:
-        ExecuteTask(task).execute()
-        return task.sync_map_leaves()
+        timestamps, error = align_chapter(audio_path, text_lines, stages, task_config), None
     except Exception as e:
-        print(f"Error alignment: {e}")
-        return None
-    finally:
-        if os.path.exists(temp_text_path):
-            os.remove(temp_text_path)
+        timestamps, error = None, str(e)
+    return book_id, chapter, timestamps, error, stages
 
-def main():
-    db_path = "assets/chs/bible_chs.db"
-    output_file = "assets/audio_timestamps.json"
-    audio_base_dir = "data/hehemp3"
-    
-    # Load existing results if available
-    results = {}
-    if os.path.exists(output_file):
-        with open(output_file, 'r', encoding='utf-8') as f:
+class Journal:
+    """
+    追加写的 JSON-lines 对齐日志，每章完成后写一行并 fsync。
+    中断后重跑时从日志恢复; 写到一半的最后一行直接丢弃 (该章会重新对齐)。
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        entries = {}
+        if not os.path.exists(self.path):
+            return entries
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                # 截掉写到一半的最后一行，否则下一次追加会接在它后面
+                f.truncate(data.rfind(b"\n") + 1)
+        for line in data.decode("utf-8", "replace").splitlines():
             try:
-                results = json.load(f)
-                print(f"Loaded existing valid data for {len(results)} books.")
-            except json.JSONDecodeError:
-                print("Existing JSON is corrupt or empty, starting fresh.")
-                results = {}
-    
-    for book_id, book_name, total_chapters in BIBLE_BOOKS:
-        # Check if already processed
-        if str(book_id) in results:
-            print(f"Skipping {book_name} (Already processed)")
-            continue
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            entries[(entry["book"], entry["chapter"])] = entry["timestamps"]
+        return entries
+
+    def append(self, book_id, chapter, timestamps):
+        line = json.dumps({"book": str(book_id), "chapter": str(chapter), "timestamps": timestamps},
+                          separators=(",", ":")) + "\n"
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def load_results(output_file):
+    if not os.path.exists(output_file):
+        return {}
+    with open(output_file, "r", encoding="utf-8") as f:
+        try:
+            results = json.load(f)
+        except json.JSONDecodeError:
+            print("⚠️ Existing JSON is corrupt or empty, starting fresh.")
+            return {}
+    print(f"📂 Loaded existing data for {sum(len(c) for c in results.values())} chapters.")
+    return results
 
-        # Construct directory name: e.g. "01_创世记"
-        dir_name = f"{book_id:02d}_{book_name}"
-        book_dir = os.path.join(audio_base_dir, dir_name)
-        
+def compact(results, output_file):
+    """把合并后的结果原子写入最终 JSON (按书卷 / 章节编号排序，紧凑格式) 及其二进制版本"""
+    ordered = {book: {ch: results[book][ch] for ch in sorted(results[book], key=int)}
+               for book in sorted(results, key=int)}
+    tmp_path = output_file + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(ordered, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_path, output_file)
+
+    # App 使用的二进制格式 (timestamp_codec.py)
+    bin_path = os.path.splitext(output_file)[0] + ".bin"
+    with open(bin_path + ".tmp", "wb") as f:
+        f.write(encode(ordered))
+    os.replace(bin_path + ".tmp", bin_path)
+
+def collect_jobs(texts, audio_base_dir, results, only=None):
+    """
+    未对齐、且有音频和经文的章节 -> [(book_id, chapter, audio_path, text_lines), ...]
+    only: 只收集这些 (book_id, chapter)，不管是否已对齐 (--realign)
+    """
+    jobs = []
+    for book_id, book_name, total_chapters in BIBLE_BOOKS:
+        book_dir = os.path.join(audio_base_dir, f"{book_id:02d}_{book_name}")
         if not os.path.exists(book_dir):
-            # If directory missing, we just skip without error
             continue
-            
-        print(f"Aligning {book_name}...")
-        if str(book_id) not in results:
-            results[str(book_id)] = {}
-        
-        book_results = results[str(book_id)]
-        
+        done = results.get(str(book_id), {})
         for chapter in range(1, total_chapters + 1):
-            # Check if this chapter already processed
-            if str(chapter) in book_results:
+            if (only is None and str(chapter) in done) or (only is not None and (book_id, chapter) not in only):
                 continue
-
             audio_path = os.path.join(book_dir, f"{chapter}.mp3")
             if not os.path.exists(audio_path):
                 print(f"  Missing audio for {book_name} Chapter {chapter}")
                 continue
-                
-            # Get text
-            verses = get_verses(db_path, book_id, chapter)
-            if not verses:
+            text_lines = texts.get((book_id, chapter))
+            if not text_lines:
                 print(f"  No text for {book_name} Chapter {chapter}")
                 continue
-                
-            # Prepare text for alignment
-            chapter_title = f"{book_name} 第{chapter}章"
-            text_lines = [chapter_title] + verses
-            
-            # Run alignment
-            # Use unique temp file to avoid clashing
-            temp_text_path = f"temp_align_{book_id}_{chapter}.txt"
-            try:
-                with open(temp_text_path, "w", encoding="utf-8") as f:
-                    for line in text_lines:
-                        f.write(line + "\n")
-                
-                # Configure Task
-                config_string = "task_language=cmn|is_text_type=plain|os_task_file_format=json|is_text_file_encoding=utf-8"
-                task = Task(config_string=config_string)
-                task.audio_file_path_absolute = os.path.abspath(audio_path)
-                task.text_file_path_absolute = os.path.abspath(temp_text_path)
-
-                ExecuteTask(task).execute()
-                fragments = task.sync_map_leaves()
-                
-                if fragments:
-                    timestamps = []
-                    for i, frag in enumerate(fragments):
-                        timestamps.append([float(frag.begin), float(frag.end)])
-                    
-                    book_results[str(chapter)] = timestamps
-                    print(f"  Aligned Chapter {chapter}: {len(timestamps)} segments")
-                    
-                    # Save progress after each chapter to avoid loss
-                    with open(output_file, 'w', encoding='utf-8') as f:
-                        json.dump(results, f, ensure_ascii=False, indent=2)
-                else:
-                    print(f"  Failed to align Chapter {chapter}")
-            except Exception as e:
-                print(f"  Error aligning {book_name} Ch {chapter}: {e}")
-                # Keep temp file for debugging if it failed
-                continue
-            finally:
-                if os.path.exists(temp_text_path):
-                    os.remove(temp_text_path)
+            jobs.append((book_id, chapter, audio_path, text_lines))
+    return jobs
+
+def align_parallel(jobs, processes, totals, runtime_config=RUNTIME_CONFIG, task_config=TASK_CONFIG):
+    """进程池对齐，按完成顺序产出 (序号, book_id, chapter, timestamps, error); 各阶段耗时累加到 totals"""
+    with ProcessPoolExecutor(max_workers=processes, initializer=init_worker,
+                             initargs=(runtime_config,)) as executor:
+        futures = [executor.submit(align_job, *job, task_config) for job in jobs]
+        for i, future in enumerate(as_completed(futures), 1):
+            book_id, chapter, timestamps, error, stages = future.result()
+            for stage, seconds in stages.items():
+                totals[stage] = totals.get(stage, 0.0) + seconds
+            yield i, book_id, chapter, timestamps, error
+
+def realign_outliers(results, texts, args, journal, totals):
+    """评分后只对被标记的章节换参数重新对齐，置信度提高才采用"""
+    scores, summary = score_all(results, texts)
+    print_summary(scores, summary)
+    flagged = {(r['book'], r['chapter']): r for r in scores if r['flagged']}
+    jobs = collect_jobs(texts, args.audio, results, only=flagged)
+    if not jobs:
+        return
+    # 用原结果的全书基线给新结果打分，前后可比
+    baseline = corpus_baseline(results, texts)
+
+    print(f"🔁 Re-aligning {len(jobs)} flagged chapters with adjusted parameters")
+    improved = 0
+    for i, book_id, chapter, timestamps, error in align_parallel(
+            jobs, args.jobs, totals, REALIGN_RUNTIME_CONFIG, REALIGN_TASK_CONFIG):
+        before = flagged[(book_id, chapter)]
+        after = score_chapter(timestamps, texts[(book_id, chapter)], baseline) if timestamps else None
+        if after and (after['confidence'], -len(after['issues'])) > (before['confidence'], -len(before['issues'])):
+            improved += 1
+            journal.append(book_id, chapter, timestamps)
+            results[str(book_id)][str(chapter)] = timestamps
+            print(f"  ✅ [{i}/{len(jobs)}] Book {book_id} Chapter {chapter}: "
+                  f"confidence {before['confidence']:.2f} -> {after['confidence']:.2f}")
+        else:
+            reason = f"confidence {after['confidence']:.2f}" if after else error or "no fragments"
+            print(f"  ➖ [{i}/{len(jobs)}] Book {book_id} Chapter {chapter}: kept original ({reason})")
+    print(f"🔁 Re-alignment improved {improved}/{len(jobs)} chapters")
+
+def print_stage_timing(totals, chapters):
+    """worker 阶段 (setup / align / sync_map) 为各进程耗时之和，其余为主进程耗时"""
+    print("⏱️  Stage timing (total / per chapter):")
+    for stage in ("load_text", "setup", "align", "sync_map", "journal", "compact"):
+        if stage in totals:
+            per_chapter = totals[stage] / chapters * 1000 if chapters else 0.0
+            print(f"   {stage:<10} {totals[stage]:>9.2f}s  {per_chapter:>9.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Forced alignment of chapter audio against verse text (aeneas)")
+    parser.add_argument("--db", default="assets/chs/bible_chs.db", help="Bible text database")
+    parser.add_argument("--audio", default="data/hehemp3", help="Chapter MP3 tree (01_创世记/1.mp3)")
+    parser.add_argument("--output", default="assets/audio_timestamps.json", help="Timestamps JSON")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Parallel alignment processes")
+    parser.add_argument("--realign", action="store_true",
+                        help="Score all chapters and re-align low-confidence ones with adjusted parameters")
+    parser.add_argument("--report", nargs="?", const=REPORT_PATH,
+                        help=f"Write an alignment quality report (default path: {REPORT_PATH})")
+    args = parser.parse_args()
+
+    output_file = args.output
+    journal = Journal(output_file + ".journal")
+
+    # 已完成的结果 = 上次的 JSON + 中断前写进日志的章节
+    results = load_results(output_file)
+    recovered = journal.load()
+    for (book, chapter), timestamps in recovered.items():
+        results.setdefault(book, {})[chapter] = timestamps
+    if recovered:
+        print(f"♻️  Recovered {len(recovered)} chapters from {journal.path}")
+
+    stage_start = time.perf_counter()
+    texts = load_texts(args.db, BIBLE_BOOKS)
+    jobs = collect_jobs(texts, args.audio, results)
+    totals = {"load_text": time.perf_counter() - stage_start}
+
+    print(f"🚀 Aligning {len(jobs)} chapters with {args.jobs} processes")
+    start = time.perf_counter()
+    failed = 0
+    # 日志只在主进程写，worker 只负责计算
+    for i, book_id, chapter, timestamps, error in align_parallel(jobs, args.jobs, totals):
+        if timestamps:
+            stage_start = time.perf_counter()
+            journal.append(book_id, chapter, timestamps)
+            totals["journal"] = totals.get("journal", 0.0) + time.perf_counter() - stage_start
+            results.setdefault(str(book_id), {})[str(chapter)] = timestamps
+            print(f"  ✅ [{i}/{len(jobs)}] Book {book_id} Chapter {chapter}: {len(timestamps)} segments")
+        else:
+            failed += 1
+            print(f"  ❌ [{i}/{len(jobs)}] Book {book_id} Chapter {chapter}: {error or 'no fragments'}")
+    if args.realign:
+        realign_outliers(results, texts, args, journal, totals)
 
+    stage_start = time.perf_counter()
+    compact(results, output_file)
+    journal.remove()
+    totals["compact"] = time.perf_counter() - stage_start
+    print(f"\n🎉 Aligned {len(jobs) - failed}/{len(jobs)} chapters in {time.perf_counter() - start:.1f}s "
+          f"({failed} failed, rerun to retry)")
+    print_stage_timing(totals, len(jobs))
+    if args.report:
+        scores, summary = score_all(results, texts)
+        write_report(args.report, scores, summary)
+        print(f"📝 Quality report written: {args.report}")
     print(f"Completed. Data saved to {output_file}")
 
 if __name__ == "__main__":
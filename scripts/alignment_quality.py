@@ -0,0 +1,157 @@
+"""
+对齐结果质量评分: 不用逐章试听就能批量找出对齐错误的章节
+- 与 gen_weights.py 相同的代理量: 每节字数 ∝ 朗读时长，语速 = 字数 / 时长
+- 全部经文语速取对数后算中位数和 MAD，|稳健 z 分数| 超过阈值的节记为异常
+- 章节级问题: 段数与经文数不符、零长度段 (常见的 [0.0, 0.0] 标题段)、异常节比例过高
+- 章节置信度 = 1 - 异常节比例; 结果写入 JSON 报告，按置信度从低到高排列
+对被标记的章节重新对齐: python scripts/align_audio_aeneas.py --realign
+
+用法: python scripts/alignment_quality.py [--timestamps assets/audio_timestamps.json] [--report alignment_quality.json]
+"""
+
+import argparse
+import json
+import math
+import sqlite3
+import statistics
+
+from gen_weights import BIBLE_BOOKS
+
+DB_PATH = "assets/chs/bible_chs.db"
+TIMESTAMPS_PATH = "assets/audio_timestamps.json"
+REPORT_PATH = "alignment_quality.json"
+# |z| 超过此值的节视为异常 (3.5 为常用的稳健离群阈值)
+Z_THRESHOLD = 3.5
+# 异常节超过此比例时整章需要重新对齐
+MAX_OUTLIER_RATIO = 0.1
+# MAD 换算为正态分布标准差的系数
+MAD_SCALE = 1.4826
+
+def load_all_verses(db_path):
+    """一个连接、一次查询读出全部经文: {(book_id, chapter): [text, ...]}"""
+    conn = sqlite3.connect(db_path)
+    try:
+        verses = {}
+        for book_id, chapter, text in conn.execute(
+                "SELECT book_id, chapter, text FROM verses ORDER BY book_id, chapter, verse"):
+            verses.setdefault((book_id, chapter), []).append(text)
+        return verses
+    finally:
+        conn.close()
+
+def chapter_lines(book_name, chapter, verses):
+    """音频开头先读章节标题，之后逐节朗读; 与对齐时的文本行一一对应"""
+    return [f"{book_name} 第{chapter}章"] + verses
+
+def log_rates(segments, lines):
+    """每段的 log(字数 / 秒); 零长度段为 None"""
+    rates = []
+    for (begin, end), line in zip(segments, lines):
+        duration = end - begin
+        rates.append(math.log(len(line) / duration) if duration > 0 and line else None)
+    return rates
+
+def rate_baseline(all_rates):
+    """全部有效语速的 (中位数, 按正态换算的 MAD)"""
+    values = [r for r in all_rates if r is not None]
+    median = statistics.median(values)
+    mad = statistics.median(abs(r - median) for r in values) * MAD_SCALE
+    return median, mad or 1e-9
+
+def score_chapter(segments, lines, baseline, z_threshold=Z_THRESHOLD, max_outlier_ratio=MAX_OUTLIER_RATIO):
+    """返回 {'confidence', 'issues', 'outliers', 'flagged'}"""
+    median, mad = baseline
+    issues, outliers = [], []
+    if len(segments) != len(lines):
+        issues.append(f"segment_count_mismatch ({len(segments)} segments, {len(lines)} lines)")
+    for i, ((begin, end), rate) in enumerate(zip(segments, log_rates(segments, lines))):
+        # i == 0 为章节标题，其余 i 即节号
+        entry = {'verse': i, 'chars': len(lines[i]), 'begin': begin, 'end': end}
+        if rate is None:
+            outliers.append(dict(entry, reason='zero_length'))
+            continue
+        z = (rate - median) / mad
+        if abs(z) > z_threshold:
+            outliers.append(dict(entry, reason='too_fast' if z > 0 else 'too_slow',
+                                 chars_per_second=round(math.exp(rate), 2), z=round(z, 2)))
+    # 零长度的标题段只记录不计入比例，否则节数少的章节 (诗篇 117 只有 2 节) 会仅因标题被标记
+    checked = min(len(segments), len(lines)) - 1
+    ratio = sum(o['verse'] > 0 for o in outliers) / checked if checked > 0 else 1.0
+    if ratio > max_outlier_ratio:
+        issues.append(f"outlier_ratio {ratio:.0%}")
+    if any(o['reason'] == 'zero_length' and o['verse'] > 0 for o in outliers):
+        issues.append("zero_length_verse")
+    return {'confidence': round(1 - ratio, 4), 'issues': issues, 'outliers': outliers, 'flagged': bool(issues)}
+
+def _scored_chapters(timestamps, texts):
+    return [(int(book), int(chapter), segments)
+            for book, book_data in timestamps.items()
+            for chapter, segments in book_data.items()
+            if (int(book), int(chapter)) in texts]
+
+def corpus_baseline(timestamps, texts):
+    """全部章节经文 (不含标题段) 的语速基线"""
+    return rate_baseline([r for book, chapter, segments in _scored_chapters(timestamps, texts)
+                          for r in log_rates(segments[1:], texts[(book, chapter)][1:])])
+
+def score_all(timestamps, texts, z_threshold=Z_THRESHOLD, max_outlier_ratio=MAX_OUTLIER_RATIO):
+    """
+    timestamps: audio_timestamps.json 结构; texts: {(book, chapter): 对齐文本行}
+    返回 (按置信度升序的章节结果列表, 汇总)
+    """
+    chapters = _scored_chapters(timestamps, texts)
+    baseline = corpus_baseline(timestamps, texts)
+
+    results = []
+    for book, chapter, segments in chapters:
+        result = score_chapter(segments, texts[(book, chapter)], baseline, z_threshold, max_outlier_ratio)
+        results.append(dict(result, book=book, chapter=chapter))
+    results.sort(key=lambda r: (r['confidence'], r['book'], r['chapter']))
+
+    summary = {
+        'chapters': len(results),
+        'flagged': sum(r['flagged'] for r in results),
+        'outlier_segments': sum(len(r['outliers']) for r in results),
+        'zero_length_titles': sum(any(o['verse'] == 0 and o['reason'] == 'zero_length' for o in r['outliers'])
+                                  for r in results),
+        'median_chars_per_second': round(math.exp(baseline[0]), 2),
+        'z_threshold': z_threshold,
+    }
+    return results, summary
+
+def write_report(path, results, summary):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'summary': summary, 'chapters': results}, f, ensure_ascii=False, indent=2)
+
+def print_summary(results, summary, limit=10):
+    print(f"📊 {summary['chapters']} chapters, median {summary['median_chars_per_second']} chars/s, "
+          f"{summary['outlier_segments']} outlier segments ({summary['zero_length_titles']} zero-length titles)")
+    print(f"{'❌' if summary['flagged'] else '✅'} {summary['flagged']} chapters flagged for re-alignment")
+    for r in [r for r in results if r['flagged']][:limit]:
+        print(f"   Book {r['book']} Chapter {r['chapter']}: confidence {r['confidence']:.2f}, {'; '.join(r['issues'])}")
+
+def load_texts(db_path, books=BIBLE_BOOKS):
+    """{(book, chapter): 对齐文本行}"""
+    names = {book_id: name for book_id, name, _ in books}
+    return {(book, chapter): chapter_lines(names[book], chapter, verses)
+            for (book, chapter), verses in load_all_verses(db_path).items() if book in names}
+
+def main():
+    parser = argparse.ArgumentParser(description="Score verse alignment quality from speaking rate")
+    parser.add_argument("--db", default=DB_PATH, help="Bible text database")
+    parser.add_argument("--timestamps", default=TIMESTAMPS_PATH, help="Timestamps JSON")
+    parser.add_argument("--report", default=REPORT_PATH, help="JSON quality report")
+    parser.add_argument("--z", type=float, default=Z_THRESHOLD, help="Robust z-score threshold")
+    parser.add_argument("--max-outlier-ratio", type=float, default=MAX_OUTLIER_RATIO,
+                        help="Flag chapters with more outlier segments than this")
+    args = parser.parse_args()
+
+    with open(args.timestamps, 'r', encoding='utf-8') as f:
+        timestamps = json.load(f)
+    results, summary = score_all(timestamps, load_texts(args.db), args.z, args.max_outlier_ratio)
+    write_report(args.report, results, summary)
+    print_summary(results, summary)
+    print(f"📝 Report written: {args.report}")
+
+if __name__ == "__main__":
+    main()
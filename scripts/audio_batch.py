@@ -0,0 +1,268 @@
+"""
+统一的批量转码引擎 + CLI (档位定义见 audio_profiles.py)
+- 每个源文件启动一个 ffmpeg: 解码一次，asplit 分给所有需要重建的档位
+- 进程池并行 (默认 CPU 核数)，参数列表直接传给 subprocess，失败时保留 ffmpeg 错误输出
+- 增量构建: 构建数据库 (audio_build_db.py，data/.audio_build.jsonl) 记录源文件哈希、档位哈希、
+  输出哈希和时长; 只重建输出缺失 / 被截断、源文件内容或档位参数变化的章节，
+  已完成的输出按 stat 快速确认 (--verify 时重新哈希)
+- 先写 .partial 再原子替换，被杀掉的 ffmpeg 不会留下半截输出
+
+用法:
+  python scripts/audio_batch.py --profiles 6k,8k
+  python scripts/audio_batch.py --profiles 16k --output 16k=/tmp/opus_16k
+  python scripts/audio_batch.py --list                 # 列出档位及哈希
+  python scripts/audio_batch.py --profiles 6k --adopt  # 为已有输出补记录，不重新转码
+  python scripts/audio_batch.py --profiles 6k,8k --verify  # 重新哈希已完成的输出，损坏的重建
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from audio_build_db import BUILD_DB_PATH, BuildDB, describe_output, describe_source
+from audio_profiles import PROFILES, codec_args, filter_chain, get_profile, profile_hash, silence_detect
+
+SOURCE_DIR = "data/hehemp3"
+DEFAULT_PROFILES = ('6k', '8k')
+
+# outputs: [(profile_name, 输出路径, describe_output 结果), ...]
+TranscodeResult = namedtuple('TranscodeResult',
+                             'source source_info outputs ok returncode seconds cpu_seconds error')
+
+def build_command(source, outputs):
+    """
+    outputs: [(profile_name, 输出路径), ...]
+    一次解码，asplit 为每个档位各接一条滤镜链，再分别 -map 到各自的编码器。
+    """
+    n = len(outputs)
+    chains = []
+    if n > 1:
+        chains.append(f"[0:a]asplit={n}" + ''.join(f"[s{i}]" for i in range(n)))
+    for i, (name, path) in enumerate(outputs):
+        src_label = f"[s{i}]" if n > 1 else "[0:a]"
+        # 删静音的档位同时记录被删掉的静音段，供 remap_timestamps.py 换算经文时间戳
+        chains.append(f"{src_label}{filter_chain(get_profile(name), path + '.silence.partial')}[t{i}]")
+
+    cmd = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin", "-y", "-threads", "1",
+           "-i", source, "-filter_complex", ';'.join(chains)]
+    for i, (name, path) in enumerate(outputs):
+        # 显式指定 Ogg Opus 封装，.partial 扩展名不影响格式推断
+        cmd += ["-map", f"[t{i}]", *codec_args(get_profile(name)), "-f", "opus", path + ".partial"]
+    return cmd
+
+def run_ffmpeg(cmd):
+    """运行 ffmpeg，返回 (returncode, stderr, 子进程 CPU 秒数)"""
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    try:
+        proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        returncode, stderr = proc.returncode, proc.stderr.strip()
+    except OSError as e:
+        returncode, stderr = -1, str(e)
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    return returncode, stderr, cpu
+
+def parse_silence_log(path):
+    """
+    解析 ametadata 输出的 silencedetect 元数据，返回 [[start, end], ...] (源文件时间轴，秒)。
+    延续到文件末尾的静音没有 silence_end，end 记为 None。
+    """
+    segments = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            key, _, value = line.strip().partition('=')
+            if key == 'lavfi.silence_start':
+                segments.append([max(float(value), 0.0), None])
+            elif key == 'lavfi.silence_end' and segments and segments[-1][1] is None:
+                segments[-1][1] = float(value)
+    return segments
+
+def encode_source(source, outputs, separate=False):
+    """为一个源文件生成给定的输出 (在进程池中运行)，返回 TranscodeResult"""
+    for _, path in outputs:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    start = time.perf_counter()
+    # 编码前哈希源文件: 记录的是实际参与编码的内容
+    source_info = describe_source(source)
+    # separate=True 时按旧方式每个档位单独解码一次 (用于对比 CPU)
+    groups = [[o] for o in outputs] if separate else [outputs]
+    returncode, errors, cpu = 0, [], 0.0
+    for group in groups:
+        rc, stderr, group_cpu = run_ffmpeg(build_command(source, group))
+        cpu += group_cpu
+        if rc != 0:
+            returncode = rc
+            errors.append(stderr or f"ffmpeg exited with {rc}")
+
+    done = []
+    for name, path in outputs:
+        partial, silence_log = path + ".partial", path + ".silence.partial"
+        if returncode == 0 and os.path.exists(partial):
+            os.replace(partial, path)
+            info = describe_output(path)
+            if silence_detect(get_profile(name)):
+                info['removed_silence'] = parse_silence_log(silence_log) if os.path.exists(silence_log) else []
+            done.append((name, path, info))
+        elif os.path.exists(partial):
+            os.remove(partial)
+        if os.path.exists(silence_log):
+            os.remove(silence_log)
+
+    ok = returncode == 0 and len(done) == len(outputs)
+    return TranscodeResult(source, source_info, done, ok, returncode, time.perf_counter() - start, cpu,
+                           '\n'.join(errors) or None)
+
+def scan_tree(source_dir, targets):
+    """
+    targets: [(profile_name, output_dir), ...]
+    源目录结构原样映射到每个输出目录: 01_创世记/1.mp3 -> <output_dir>/01_创世记/1.opus
+    返回 [(source, [(profile_name, output_path), ...]), ...]
+    """
+    jobs = []
+    for root, dirs, files in os.walk(source_dir):
+        dirs.sort()
+        for file in sorted(files):
+            if not file.lower().endswith(".mp3"):
+                continue
+            source = os.path.join(root, file)
+            rel = os.path.splitext(os.path.relpath(source, source_dir))[0] + ".opus"
+            jobs.append((source, [(name, os.path.join(out_dir, rel)) for name, out_dir in targets]))
+    return jobs
+
+def plan(jobs, build_db, force=False, verify=False):
+    """过滤出需要重建的输出，返回 (待执行的 jobs, {原因: 数量})"""
+    pending, reasons = [], {}
+    for source, outputs in jobs:
+        todo = []
+        for name, path in outputs:
+            reason = 'forced' if force else build_db.check(path, name, source, verify)
+            reasons[reason or 'up_to_date'] = reasons.get(reason or 'up_to_date', 0) + 1
+            if reason:
+                todo.append((name, path))
+        if todo:
+            pending.append((source, todo))
+    return pending, reasons
+
+def adopt(jobs, build_db):
+    """把已存在但没有记录的输出按当前档位和源文件登记 (迁移旧产物，不重新转码)"""
+    count = 0
+    for source, outputs in jobs:
+        for name, path in outputs:
+            if build_db.check(path, name, source) == 'unrecorded':
+                build_db.record(path, name, source, build_db.describe_source(source), describe_output(path))
+                count += 1
+    build_db.compact()
+    return count
+
+def run_jobs(jobs, build_db=None, max_workers=None, separate=False, force=False, verify=False):
+    """执行转码，返回全部 TranscodeResult; 跳过已是最新的输出"""
+    build_db = build_db or BuildDB()
+    check_start = time.perf_counter()
+    pending, reasons = plan(jobs, build_db, force, verify)
+    summary = ', '.join(f"{k} {v}" for k, v in sorted(reasons.items()))
+    print(f"🔍 {len(jobs)} sources: {summary or 'nothing to do'} "
+          f"(checked in {time.perf_counter() - check_start:.2f}s)")
+    if not pending:
+        build_db.compact()
+        return []
+
+    max_workers = max_workers or os.cpu_count() or 1
+    print(f"🚀 Transcoding {len(pending)} sources ({'separate decodes' if separate else 'single decode'}, "
+          f"{max_workers} processes)")
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(encode_source, source, outputs, separate) for source, outputs in pending]
+        for i, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            results.append(result)
+            for name, path, info in result.outputs:
+                build_db.record(path, name, result.source, result.source_info, info)
+            if not result.ok:
+                print(f"\n❌ Failed: {result.source}\n{result.error}")
+            else:
+                tiers = ', '.join(name for name, _, _ in result.outputs)
+                print(f"✅ {result.source} -> {tiers} ({result.cpu_seconds:.1f} CPU-s)")
+            if i % 50 == 0:
+                print(f"⏳ {i}/{len(pending)}")
+
+    build_db.compact()
+    failed = [r for r in results if not r.ok]
+    cpu = sum(r.cpu_seconds for r in results)
+    print(f"\n🎉 Transcoding done in {time.perf_counter() - start:.1f}s")
+    print(f"✅ Converted: {len(results) - len(failed)}  ❌ Failed: {len(failed)}")
+    print(f"⏱️  ffmpeg CPU: {cpu:.1f}s total, {cpu / len(results):.2f}s per source")
+    return results
+
+def parse_outputs(values):
+    overrides = {}
+    for value in values:
+        name, sep, path = value.partition('=')
+        if not sep:
+            raise argparse.ArgumentTypeError(f"expected PROFILE=DIR, got {value!r}")
+        overrides[name] = path
+    return overrides
+
+def main(argv=None, default_profiles=DEFAULT_PROFILES, default_source=SOURCE_DIR):
+    parser = argparse.ArgumentParser(description="Batch transcode MP3 chapters with registered audio profiles")
+    parser.add_argument("--source", default=default_source, help="Source tree of MP3 chapters")
+    parser.add_argument("--profiles", default=','.join(default_profiles),
+                        help=f"Comma-separated profiles (available: {', '.join(PROFILES)})")
+    parser.add_argument("--output", action="append", default=[], metavar="PROFILE=DIR",
+                        help="Override a profile's output directory (repeatable)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Parallel ffmpeg processes")
+    parser.add_argument("--force", action="store_true", help="Rebuild outputs even if they are up to date")
+    parser.add_argument("--verify", action="store_true",
+                        help="Re-hash completed outputs instead of trusting size/mtime; rebuild mismatches")
+    parser.add_argument("--adopt", action="store_true",
+                        help="Record existing unrecorded outputs as built with the current profile and exit")
+    parser.add_argument("--separate", action="store_true",
+                        help="Decode once per profile (previous behaviour, for CPU comparison)")
+    parser.add_argument("--build-db", default=BUILD_DB_PATH, help="JSON-lines build database")
+    parser.add_argument("--report", help="Write per-file results as JSON")
+    parser.add_argument("--list", action="store_true", help="List registered profiles and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, p in PROFILES.items():
+            print(f"{name:<18} {profile_hash(p)}  {p['output_dir'] or '-':<28} {p['description']}")
+        return []
+
+    names = [n.strip() for n in args.profiles.split(',') if n.strip()]
+    try:
+        profiles = {name: get_profile(name) for name in names}
+        overrides = parse_outputs(args.output)
+    except (ValueError, argparse.ArgumentTypeError) as e:
+        parser.error(str(e))
+    targets = []
+    for name, p in profiles.items():
+        out_dir = overrides.get(name, p['output_dir'])
+        if not out_dir:
+            parser.error(f"profile {name} has no default output directory, use --output {name}=DIR")
+        targets.append((name, out_dir))
+
+    if not os.path.isdir(args.source):
+        print(f"❌ Source directory not found: {args.source}")
+        return []
+
+    build_db = BuildDB(args.build_db)
+    jobs = scan_tree(args.source, targets)
+    if args.adopt:
+        print(f"📝 Recorded {adopt(jobs, build_db)} existing outputs")
+        return []
+
+    results = run_jobs(jobs, build_db, args.jobs, args.separate, args.force, args.verify)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump([r._asdict() for r in sorted(results)], f, ensure_ascii=False, indent=2)
+        print(f"📝 Report written: {args.report}")
+    return results
+
+if __name__ == "__main__":
+    main()
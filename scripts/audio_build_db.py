@@ -0,0 +1,145 @@
+"""
+音频转码的增量构建数据库 (JSON-lines，默认 data/.audio_build.jsonl)
+每个输出一条记录: 档位及其哈希、源文件 SHA-256 / 大小 / mtime、输出 SHA-256 / 大小 / mtime、时长，
+删静音的档位还有被删掉的静音段 (removed_silence)。
+
+判断是否需要重建 (check):
+- 输出缺失 / 过小、无记录、档位哈希不同           -> 重建
+- 源文件 stat 变化: 重新哈希，内容真的变了才重建 (只是 touch 过则刷新记录)
+- 输出 stat 变化: 重新哈希，与记录不符 (被截断 / 改写) 则重建
+- stat 都没变: 直接认为最新，不读文件 (--verify 时强制重新哈希输出)
+追加写入，同一输出以最后一条为准; 过期行过多时压缩重写。
+"""
+
+import hashlib
+import json
+import os
+import time
+
+from audio_container import opus_duration_ms
+from audio_profiles import profile_hash
+from pack_manifest import sha256_file
+
+BUILD_DB_PATH = "data/.audio_build.jsonl"
+# 小于此大小的输出视为上次中断留下的坏文件
+MIN_OUTPUT_SIZE = 1024
+
+def describe_source(path):
+    st = os.stat(path)
+    return {'sha256': sha256_file(path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+def describe_output(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    st = os.stat(path)
+    return {
+        'sha256': hashlib.sha256(data).hexdigest(),
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'duration_ms': opus_duration_ms(data),
+    }
+
+def _stat_matches(path, info):
+    st = os.stat(path)
+    return st.st_size == info.get('size') and st.st_mtime_ns == info.get('mtime_ns')
+
+class BuildDB:
+    def __init__(self, path=BUILD_DB_PATH):
+        self.path = path
+        self.records = {}
+        self._lines = 0
+        # (路径, 大小, mtime) -> sha256，同一个源文件对应多个档位时只哈希一次
+        self._source_hashes = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._lines += 1
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # 上次写到一半被中断的最后一行
+                        continue
+                    self.records[record['output']] = record
+
+    def get(self, output):
+        return self.records.get(os.path.normpath(output))
+
+    def _append(self, record):
+        self.records[record['output']] = record
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._lines += 1
+
+    def record(self, output, profile_name, source, source_info, output_info):
+        record = {
+            'output': os.path.normpath(output),
+            'profile': profile_name,
+            'profile_hash': profile_hash(profile_name),
+            'source': os.path.normpath(source),
+            'source_sha256': source_info['sha256'],
+            'source_size': source_info['size'],
+            'source_mtime_ns': source_info['mtime_ns'],
+            'output_sha256': output_info['sha256'],
+            'output_size': output_info['size'],
+            'output_mtime_ns': output_info['mtime_ns'],
+            'duration_ms': output_info['duration_ms'],
+            'built_at': int(time.time()),
+        }
+        if 'removed_silence' in output_info:
+            # 删静音档位: 被删掉的静音段 (源文件时间轴)，remap_timestamps.py 据此换算时间戳
+            record['removed_silence'] = output_info['removed_silence']
+        self._append(record)
+
+    def describe_source(self, path):
+        """同 describe_source()，但同一源文件 (大小 / mtime 未变) 只哈希一次"""
+        st = os.stat(path)
+        key = (os.path.normpath(path), st.st_size, st.st_mtime_ns)
+        if key not in self._source_hashes:
+            self._source_hashes[key] = sha256_file(path)
+        return {'sha256': self._source_hashes[key], 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+    def check(self, output, profile_name, source, verify=False):
+        """输出需要重建的原因，已是最新时返回 None"""
+        if not os.path.exists(output) or os.path.getsize(output) < MIN_OUTPUT_SIZE:
+            return 'missing'
+        record = self.get(output)
+        if record is None or 'output_sha256' not in record:
+            return 'unrecorded'
+        if record['profile_hash'] != profile_hash(profile_name):
+            return 'profile_changed'
+        if record['source'] != os.path.normpath(source):
+            return 'source_moved'
+
+        refreshed = dict(record)
+        source_stat = {'size': record['source_size'], 'mtime_ns': record['source_mtime_ns']}
+        if not _stat_matches(source, source_stat):
+            info = self.describe_source(source)
+            if info['sha256'] != record['source_sha256']:
+                return 'source_changed'
+            refreshed.update(source_size=info['size'], source_mtime_ns=info['mtime_ns'])
+
+        output_stat = {'size': record['output_size'], 'mtime_ns': record['output_mtime_ns']}
+        if verify or not _stat_matches(output, output_stat):
+            if sha256_file(output) != record['output_sha256']:
+                return 'output_corrupt'
+            st = os.stat(output)
+            refreshed.update(output_size=st.st_size, output_mtime_ns=st.st_mtime_ns)
+
+        if refreshed != record:
+            # 内容未变，只是 stat 变了: 记下新的 stat，下次无需再哈希
+            self._append(refreshed)
+        return None
+
+    def compact(self, min_garbage=1000):
+        """过期行超过有效记录数 (且至少 min_garbage 行) 时重写文件"""
+        garbage = self._lines - len(self.records)
+        if garbage < max(min_garbage, len(self.records)):
+            return False
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for output in sorted(self.records):
+                f.write(json.dumps(self.records[output], ensure_ascii=False) + '\n')
+        os.replace(tmp_path, self.path)
+        self._lines = len(self.records)
+        return True
@@ -0,0 +1,163 @@
+"""
+按章节随机访问的音频容器 (.eyac)
+把 data/opus_6k 或 data/opus_8k 下 1189 个章节的 Opus 文件拼成一个文件，
+文件头后紧跟紧凑的二进制索引，客户端一次 Range 请求取到索引后即可按章节 Range 下载。
+
+文件布局 (小端):
+  头部   20 字节  magic 'EYAC', version u16, flags u16, count u32, data_offset u64
+  索引   28 字节 * count，按 (book, chapter) 排序
+         book u8, chapter u8, pad 2, offset u64, length u32, duration_ms u32, sha256[:8]
+  数据   各章节 Opus 原始字节依次排列 (offset 为文件内绝对偏移)
+"""
+
+import hashlib
+import os
+import struct
+from collections import namedtuple
+
+MAGIC = b'EYAC'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIQ')
+RECORD = struct.Struct('<BBxxQII8s')
+# 客户端首次请求取这么多字节基本可以覆盖头部和整张索引 (1189 章约 33KB)
+INDEX_PREFETCH_SIZE = HEADER.size + RECORD.size * 1200
+
+ChapterEntry = namedtuple('ChapterEntry', 'book chapter offset length duration_ms digest')
+
+def opus_duration_ms(data):
+    """
+    从 Ogg Opus 数据计算时长: 最后一页的 granule position 减去 OpusHead 的 pre-skip，
+    按 48kHz 计。无需 ffprobe。
+    """
+    head = data.find(b'OpusHead')
+    if head < 0:
+        return 0
+    pre_skip = struct.unpack_from('<H', data, head + 10)[0]
+    last_page = data.rfind(b'OggS')
+    if last_page < 0 or last_page + 14 > len(data):
+        return 0
+    granule = struct.unpack_from('<q', data, last_page + 6)[0]
+    if granule <= pre_skip:
+        return 0
+    return (granule - pre_skip) * 1000 // 48000
+
+def parse_header(buf):
+    """校验头部并返回 (count, data_offset); 任何格式错误都抛 ValueError"""
+    if len(buf) < HEADER.size:
+        raise ValueError(f"Header truncated: need {HEADER.size} bytes, got {len(buf)}")
+    magic, version, _flags, count, data_offset = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC:
+        raise ValueError("Not an audio container")
+    if version != VERSION:
+        raise ValueError(f"Unsupported audio container version {version}")
+    return count, data_offset
+
+def parse_index(buf):
+    """从 (至少包含头部和索引的) 字节串解析出 {(book, chapter): ChapterEntry} 和 data_offset"""
+    count, data_offset = parse_header(buf)
+    need = HEADER.size + RECORD.size * count
+    if len(buf) < need:
+        raise ValueError(f"Index truncated: need {need} bytes, got {len(buf)}")
+
+    entries = {}
+    for book, chapter, offset, length, duration_ms, digest in RECORD.iter_unpack(buf[HEADER.size:need]):
+        entries[(book, chapter)] = ChapterEntry(book, chapter, offset, length, duration_ms, digest)
+    return entries, data_offset
+
+def write_container(path, chapters):
+    """
+    chapters: [(book, chapter, file_path), ...]
+    先写占位头部和索引，再流式追加数据，最后回填索引。返回条目列表。
+    """
+    chapters = sorted(chapters)
+    data_offset = HEADER.size + RECORD.size * len(chapters)
+    entries = []
+    tmp_path = path + '.partial'
+    with open(tmp_path, 'wb') as f:
+        f.write(b'\0' * data_offset)
+        for book, chapter, file_path in chapters:
+            with open(file_path, 'rb') as src:
+                data = src.read()
+            offset = f.tell()
+            f.write(data)
+            entries.append(ChapterEntry(book, chapter, offset, len(data),
+                                        opus_duration_ms(data), hashlib.sha256(data).digest()[:8]))
+
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(entries), data_offset))
+        for e in entries:
+            f.write(RECORD.pack(e.book, e.chapter, e.offset, e.length, e.duration_ms, e.digest))
+    os.replace(tmp_path, path)
+    return entries
+
+class AudioContainer:
+    """
+    容器读取器: 打开时只读头部和索引，之后按章节 pread，线程安全。
+        with AudioContainer('server/packs/voice_6k.eyac') as c:
+            data = c.read(43, 3)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = os.open(path, os.O_RDONLY)
+        try:
+            self.stat = os.fstat(self._fd)
+            count, _ = parse_header(os.pread(self._fd, HEADER.size, 0))
+            # count 来自文件内容: 先按文件大小校验，损坏的文件不能触发超大读取
+            index_size = HEADER.size + RECORD.size * count
+            if index_size > self.stat.st_size:
+                raise ValueError(f"Index truncated: {count} entries need {index_size} bytes, "
+                                 f"file has {self.stat.st_size}")
+            self.entries, self.data_offset = parse_index(os.pread(self._fd, index_size, 0))
+            for e in self.entries.values():
+                if e.offset < index_size or e.offset + e.length > self.stat.st_size:
+                    raise ValueError(f"Entry {e.book}:{e.chapter} lies outside the file")
+        except Exception:
+            os.close(self._fd)
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def fileno(self):
+        return self._fd
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def entry(self, book, chapter):
+        return self.entries.get((book, chapter))
+
+    def read(self, book, chapter, verify=False):
+        e = self.entries.get((book, chapter))
+        if e is None:
+            return None
+        data = os.pread(self._fd, e.length, e.offset)
+        if verify and hashlib.sha256(data).digest()[:8] != e.digest:
+            raise ValueError(f"Checksum mismatch for {book}:{chapter}")
+        return data
+
+    def index_bytes(self):
+        """头部 + 索引的原始字节 (提供给客户端一次取回)"""
+        return os.pread(self._fd, HEADER.size + RECORD.size * len(self.entries), 0)
+
+    def verify(self):
+        """逐章校验哈希，返回损坏的 (book, chapter) 列表"""
+        bad = []
+        for key in sorted(self.entries):
+            try:
+                self.read(*key, verify=True)
+            except ValueError:
+                bad.append(key)
+        return bad
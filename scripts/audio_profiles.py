@@ -0,0 +1,129 @@
+"""
+音频转码档位注册表 (唯一数据源)
+所有转码脚本 (audio_batch.py 及委托给它的 transcode_audio.py、batch_convert_opus.py、
+convert_audio_opus*.py、test_audio_low_bitrate*.py) 都从这里取 ffmpeg 参数。
+
+- 档位用声明式字段描述 (码率、采样率、DTX、滤镜...)，codec_args() / filter_chain() 生成 ffmpeg 参数
+- profile_hash() 只对影响编码结果的字段求哈希: 修改参数后旧输出会被识别为过期并重建
+"""
+
+import hashlib
+import json
+
+# 常用滤镜
+HIGHPASS = "highpass=f=80"
+# 去掉中间超过 1 秒的静音 (6k 档)
+TRIM_SILENCE = "silenceremove=stop_periods=-1:stop_duration=1:stop_threshold=-50dB"
+# 同时修剪开头静音 (低码率对比样本 v1)
+TRIM_SILENCE_WITH_START = ("silenceremove=start_periods=1:start_duration=0.1:start_threshold=-50dB:"
+                           "stop_periods=-1:stop_duration=1:stop_threshold=-50dB")
+
+# 参与 profile_hash 的字段; output_dir / description 改动不触发重建
+ENCODING_FIELDS = ('codec', 'bitrate', 'vbr', 'sample_rate', 'channels', 'application',
+                   'frame_duration', 'compression_level', 'dtx', 'filters', 'strip_metadata')
+
+def profile(bitrate, sample_rate=None, channels=1, application='voip', frame_duration=None,
+            compression_level=10, dtx=False, vbr=None, filters=(), strip_metadata=True,
+            output_dir=None, description=''):
+    return {
+        'codec': 'libopus',
+        'bitrate': bitrate,
+        'vbr': vbr,
+        'sample_rate': sample_rate,
+        'channels': channels,
+        'application': application,
+        'frame_duration': frame_duration,
+        'compression_level': compression_level,
+        'dtx': dtx,
+        'filters': list(filters),
+        'strip_metadata': strip_metadata,
+        'output_dir': output_dir,
+        'description': description,
+    }
+
+PROFILES = {
+    # App 内置的两个语音包档位
+    '6k': profile('6k', 8000, frame_duration=60, dtx=True, filters=[HIGHPASS, TRIM_SILENCE],
+                  output_dir="data/opus_6k", description="6kbps @ 8kHz narrowband, long silences removed"),
+    '8k': profile('8k', 16000, frame_duration=60, dtx=True, filters=[HIGHPASS],
+                  output_dir="data/opus_8k", description="8kbps @ 16kHz wideband"),
+    # 原 convert_audio_opus_low.py: 名为 "16k"，以前却写进 data/opus_6k
+    '16k': profile('16k', 16000, vbr='on',
+                   output_dir="data/opus_16k", description="16kbps VBR @ 16kHz speech"),
+    # 原 convert_audio_opus.py
+    '24k': profile('24k', channels=None, application=None, compression_level=None, strip_metadata=False,
+                   output_dir="data/bible_assets/audio_opus", description="24kbps general purpose"),
+
+    # 低码率对比样本 (test_audio_low_bitrate*.py)
+    'sample_narrow_12k': profile('12k', 8000, vbr='on', dtx=True, filters=[TRIM_SILENCE_WITH_START],
+                                 description="v1: 12kbps @ 8kHz, DTX, trimmed"),
+    'sample_narrow_8k': profile('8k', 8000, vbr='on', dtx=True, filters=[TRIM_SILENCE_WITH_START],
+                                description="v1: 8kbps @ 8kHz, DTX, trimmed"),
+    'sample_narrow_6k': profile('6k', 8000, vbr='on', dtx=True, filters=[TRIM_SILENCE_WITH_START],
+                                description="v1: 6kbps @ 8kHz, DTX, trimmed"),
+    'sample_wide_12k': profile('12k', 16000, dtx=True, description="v2: 12kbps @ 16kHz, DTX"),
+    'sample_wide_8k': profile('8k', 16000, dtx=True, description="v2/v3: 8kbps @ 16kHz, DTX"),
+    'sample_wide_6k': profile('6k', 16000, dtx=True, description="v2: 6kbps @ 16kHz, DTX"),
+    'sample_base_6k': profile('6k', 8000, dtx=True, description="v3: 6kbps @ 8kHz, DTX"),
+}
+
+def get_profile(name):
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown audio profile {name!r} (available: {', '.join(PROFILES)})") from None
+
+def codec_args(p):
+    """编码器参数 (放在对应输出文件之前)"""
+    args = ["-c:a", p['codec'], "-b:a", p['bitrate']]
+    if p['vbr']:
+        args += ["-vbr", p['vbr']]
+    if p['sample_rate']:
+        args += ["-ar", str(p['sample_rate'])]
+    if p['channels']:
+        args += ["-ac", str(p['channels'])]
+    if p['application']:
+        args += ["-application", p['application']]
+    if p['frame_duration']:
+        args += ["-frame_duration", str(p['frame_duration'])]
+    if p['compression_level'] is not None:
+        args += ["-compression_level", str(p['compression_level'])]
+    if p['dtx']:
+        args += ["-dtx", "1"]
+    if p['strip_metadata']:
+        args += ["-map_metadata", "-1"]
+    return args + ["-vn"]
+
+def _escape_filter_value(value):
+    # 滤镜选项值一层转义，filtergraph 再一层
+    value = value.replace('\\', '\\\\').replace(':', '\\:').replace("'", "\\'")
+    for ch in '\\\'[],;':
+        value = value.replace(ch, '\\' + ch)
+    return value
+
+def silence_detect(p):
+    """
+    与档位中 silenceremove (stop 模式) 阈值 / 时长一致的 silencedetect 参数，档位不删静音时返回 None。
+    silencedetect 放在 silenceremove 前面，检测到的静音段就是被删掉的部分 (误差在几十毫秒内)。
+    """
+    for f in p['filters']:
+        if f.startswith('silenceremove='):
+            opts = dict(o.split('=', 1) for o in f[len('silenceremove='):].split(':'))
+            if 'stop_duration' in opts:
+                return f"silencedetect=n={opts.get('stop_threshold', '-60dB')}:d={opts['stop_duration']}"
+    return None
+
+def filter_chain(p, silence_log=None):
+    """silence_log: 把被 silenceremove 删掉的静音段 (silencedetect 元数据) 写到这个文件"""
+    filters = list(p['filters'])
+    detect = silence_detect(p) if silence_log else None
+    if detect:
+        i = next(i for i, f in enumerate(filters) if f.startswith('silenceremove='))
+        filters[i:i] = [detect, f"ametadata=mode=print:file={_escape_filter_value(silence_log)}"]
+    return ','.join(filters) or 'anull'
+
+def profile_hash(p):
+    if isinstance(p, str):
+        p = get_profile(p)
+    canonical = json.dumps({k: p[k] for k in ENCODING_FIELDS}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:12]
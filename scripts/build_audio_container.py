@@ -0,0 +1,112 @@
+"""
+从 data/opus_6k / data/opus_8k 构建按章节随机访问的音频容器 (server/packs/voice_6k.eyac 等)
+用法:
+  python scripts/build_audio_container.py                # 构建全部
+  python scripts/build_audio_container.py --quality 6k   # 只构建 6k
+  python scripts/build_audio_container.py --verify       # 构建后逐章校验哈希
+  python scripts/build_audio_container.py --bench        # 对比容器随机读与逐个打开文件
+"""
+
+import argparse
+import os
+import random
+import re
+import time
+
+from audio_container import AudioContainer, write_container
+
+TARGET_DIR = "server/packs"
+SOURCES = {
+    '6k': ("data/opus_6k", "voice_6k.eyac"),
+    '8k': ("data/opus_8k", "voice_8k.eyac"),
+}
+# 目录名 "01_创世记"，文件名 "1.opus"
+BOOK_DIR_PATTERN = re.compile(r'^(\d+)_')
+BENCH_READS = 2000
+
+def scan_chapters(source_dir):
+    """返回 [(book, chapter, path), ...]"""
+    chapters = []
+    for book_dir in sorted(os.listdir(source_dir)):
+        m = BOOK_DIR_PATTERN.match(book_dir)
+        book_path = os.path.join(source_dir, book_dir)
+        if not m or not os.path.isdir(book_path):
+            continue
+        book = int(m.group(1))
+        for file in os.listdir(book_path):
+            stem, ext = os.path.splitext(file)
+            if ext == '.opus' and stem.isdigit():
+                chapters.append((book, int(stem), os.path.join(book_path, file)))
+    return sorted(chapters)
+
+def build(quality, verify=False):
+    source_dir, name = SOURCES[quality]
+    if not os.path.isdir(source_dir):
+        print(f"⚠️ Source directory not found: {source_dir}")
+        return None
+
+    chapters = scan_chapters(source_dir)
+    if not chapters:
+        print(f"⚠️ No chapters found in {source_dir}")
+        return None
+
+    os.makedirs(TARGET_DIR, exist_ok=True)
+    out_path = os.path.join(TARGET_DIR, name)
+    start = time.perf_counter()
+    entries = write_container(out_path, chapters)
+    size_mb = os.path.getsize(out_path) / 1024 / 1024
+    hours = sum(e.duration_ms for e in entries) / 3600000
+    print(f"✅ {out_path}: {len(entries)} chapters, {size_mb:.1f} MB, {hours:.1f} h audio "
+          f"({time.perf_counter() - start:.1f}s)")
+
+    if verify:
+        with AudioContainer(out_path) as c:
+            bad = c.verify()
+        if bad:
+            print(f"❌ {len(bad)} chapters failed verification: {bad[:10]}")
+        else:
+            print(f"   ✅ All {len(entries)} chapters verified")
+    return out_path, chapters
+
+def bench(container_path, chapters, reads=BENCH_READS):
+    """随机章节读取: 容器 pread vs 逐个 open/read 源文件"""
+    rng = random.Random(0)
+    sample = [rng.choice(chapters) for _ in range(reads)]
+
+    start = time.perf_counter()
+    c = AudioContainer(container_path)
+    open_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    total = 0
+    for book, chapter, _ in sample:
+        total += len(c.read(book, chapter))
+    container_s = time.perf_counter() - start
+    c.close()
+
+    start = time.perf_counter()
+    for _, _, path in sample:
+        with open(path, 'rb') as f:
+            f.read()
+    files_s = time.perf_counter() - start
+
+    mb = total / 1024 / 1024
+    print(f"📊 {os.path.basename(container_path)}: index load {open_ms:.2f} ms, {reads} random reads ({mb:.1f} MB)")
+    print(f"   container pread : {container_s * 1000 / reads:.3f} ms/read, {mb / container_s:.0f} MB/s")
+    print(f"   separate files  : {files_s * 1000 / reads:.3f} ms/read, {mb / files_s:.0f} MB/s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Build random-access audio containers")
+    parser.add_argument("--quality", choices=sorted(SOURCES), action="append",
+                        help="Quality tier to build (default: all)")
+    parser.add_argument("--verify", action="store_true", help="Re-read every chapter and check its hash")
+    parser.add_argument("--bench", action="store_true", help="Benchmark random chapter reads")
+    args = parser.parse_args()
+
+    for quality in args.quality or sorted(SOURCES):
+        result = build(quality, verify=args.verify)
+        if result and args.bench:
+            bench(*result)
+
+if __name__ == "__main__":
+    main()
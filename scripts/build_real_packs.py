@@ -1,5 +1,11 @@
 import os
+import time
 import zipfile
+import argparse
+
+from pack_manifest import iter_source_files, sha256_file
+from pack_resources import DEFAULT_CODEC, entry_compression
+from pack_zip_writer import write_zip
 
 # 配置路径
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -15,10 +21,14 @@ VOICE_6K_DIR = os.path.join(PROJECT_ROOT, 'data', 'bible_assets', '6k')
 # 3. 8k 语音包 (data/bible_assets/8k)
 VOICE_8K_DIR = os.path.join(PROJECT_ROOT, 'data', 'bible_assets', '8k')
 
-def create_zip(source, output_filename):
+def pack_method(arcname):
+    """与 pack_resources 相同的逐条目策略: Opus / 图片等已压缩格式 store，其余 deflate"""
+    return entry_compression(arcname, DEFAULT_CODEC)
+
+def create_zip(source, output_filename, jobs=1):
     output_path = os.path.join(PACKS_DIR, output_filename)
     print(f"📦 Packaging {output_filename}...")
-    
+
     if not os.path.exists(source):
         print(f"⚠️  Source not found: {source}")
         dummy_content = f"Placeholder for {output_filename}. Source {source} missing."
@@ -27,32 +37,44 @@ def create_zip(source, output_filename):
         print(f"⚠️  Created placeholder pack.")
         return
 
-    with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        if os.path.isfile(source):
-            zipf.write(source, os.path.basename(source))
-            print(f"   Added 1 file.")
-        else:
-            count = 0
-            for root, dirs, files in os.walk(source):
-                for file in files:
-                    if file.startswith('.'): continue
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, source)
-                    zipf.write(file_path, arcname)
-                    count += 1
-            print(f"   Added {count} files.")
-            
+    start = time.perf_counter()
+    count = write_zip(output_path, iter_source_files(source), jobs=jobs, method=pack_method)
+    print(f"   Added {count} files ({'serial' if jobs <= 1 else f'{jobs} processes'}, "
+          f"{time.perf_counter() - start:.1f}s).")
+
     size_mb = os.path.getsize(output_path) / 1024 / 1024
     print(f"✅ Created {output_path} ({size_mb:.2f} MB)")
 
+def compare_serial(source, output_filename):
+    """用串行模式重新打包一次，确认并行输出逐字节一致"""
+    output_path = os.path.join(PACKS_DIR, output_filename)
+    if not os.path.exists(source) or not os.path.exists(output_path):
+        return
+    serial_path = output_path + '.serial'
+    write_zip(serial_path, iter_source_files(source), jobs=1, method=pack_method)
+    same = sha256_file(serial_path) == sha256_file(output_path)
+    os.remove(serial_path)
+    print(f"   {'✅' if same else '❌'} {output_filename}: parallel output "
+          f"{'matches' if same else 'DIFFERS from'} serial build")
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build resource packs")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1,
+                        help="Compression processes (1 = serial)")
+    parser.add_argument("--compare-serial", action="store_true",
+                        help="Rebuild each pack serially and check the outputs are byte-identical")
+    args = parser.parse_args()
+
     if not os.path.exists(PACKS_DIR):
         os.makedirs(PACKS_DIR)
 
     print("🚀 Building packs...")
-    
-    create_zip(CHT_DB_PATH, 'lang_cht.zip')
-    create_zip(VOICE_6K_DIR, 'voice_6k.zip')
-    create_zip(VOICE_8K_DIR, 'voice_8k.zip')
-    
+
+    for source, name in ((CHT_DB_PATH, 'lang_cht.zip'),
+                         (VOICE_6K_DIR, 'voice_6k.zip'),
+                         (VOICE_8K_DIR, 'voice_8k.zip')):
+        create_zip(source, name, jobs=args.jobs)
+        if args.compare_serial:
+            compare_serial(source, name)
+
     print("\n🎉 All packs built in scripts/packs/")
@@ -0,0 +1,92 @@
+"""
+把 assets/audio_timestamps.json 转成 App 使用的二进制格式 assets/audio_timestamps.bin (格式见 timestamp_codec.py)
+用法:
+  python scripts/build_timestamps_bin.py                 # 转换
+  python scripts/build_timestamps_bin.py --verify        # 转换后解码比对 (误差 <= 0.5 ms)
+  python scripts/build_timestamps_bin.py --bench         # 对比 JSON 与二进制的大小和解析耗时
+  python scripts/build_timestamps_bin.py --input assets/audio_timestamps_6k.json   # 换算后的档位时间戳
+"""
+
+import argparse
+import gzip
+import json
+import os
+import time
+
+from timestamp_codec import TimestampFile, decode, encode
+
+INPUT_PATH = "assets/audio_timestamps.json"
+# 取整到毫秒的最大误差
+TOLERANCE = 0.0005 + 1e-9
+BENCH_ROUNDS = 20
+
+def verify(timestamps, data):
+    """逐章逐节比对，返回不一致的 (book, chapter) 列表"""
+    decoded = decode(data)
+    bad = []
+    for book, chapters in timestamps.items():
+        for chapter, segments in chapters.items():
+            got = decoded.get(book, {}).get(chapter)
+            if got is None or len(got) != len(segments) or any(
+                    abs(a - b) > TOLERANCE for seg, dec in zip(segments, got) for a, b in zip(seg, dec)):
+                bad.append((book, chapter))
+    return bad
+
+def best_of(fn, rounds=BENCH_ROUNDS):
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def bench(json_path, bin_path):
+    with open(json_path, 'rb') as f:
+        json_bytes = f.read()
+    with open(bin_path, 'rb') as f:
+        bin_bytes = f.read()
+    compact_bytes = json.dumps(json.loads(json_bytes), separators=(',', ':')).encode('utf-8')
+
+    print("📊 Size (raw / gzip -9):")
+    for label, data in (("JSON (as shipped)", json_bytes), ("JSON (compact)", compact_bytes), ("binary", bin_bytes)):
+        print(f"   {label:<18} {len(data) / 1024:>8.1f} KB / {len(gzip.compress(data, 9)) / 1024:>7.1f} KB")
+
+    print(f"📊 Parse time (best of {BENCH_ROUNDS}):")
+    print(f"   json.loads            {best_of(lambda: json.loads(json_bytes)):>8.2f} ms")
+    print(f"   binary, full decode   {best_of(lambda: decode(bin_bytes)):>8.2f} ms")
+    print(f"   binary, index only    {best_of(lambda: TimestampFile(bin_bytes)):>8.2f} ms")
+    f = TimestampFile(bin_bytes)
+    print(f"   binary, one chapter   {best_of(lambda: f.chapter(19, 119)) * 1000:>8.1f} µs")
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert verse timestamps JSON to the compact binary format")
+    parser.add_argument("--input", default=INPUT_PATH, help="Timestamps JSON")
+    parser.add_argument("--output", help="Binary output (default: input with .bin extension)")
+    parser.add_argument("--verify", action="store_true", help="Decode the output and compare with the input")
+    parser.add_argument("--bench", action="store_true", help="Compare size and parse time with the JSON")
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.input)[0] + ".bin"
+    with open(args.input, 'r', encoding='utf-8') as f:
+        timestamps = json.load(f)
+
+    data = encode(timestamps)
+    tmp_path = output + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, output)
+    chapters = sum(len(c) for c in timestamps.values())
+    print(f"✅ {output}: {chapters} chapters, {len(data) / 1024:.1f} KB "
+          f"({os.path.getsize(args.input) / 1024:.1f} KB JSON)")
+
+    if args.verify:
+        bad = verify(timestamps, data)
+        if bad:
+            print(f"❌ {len(bad)} chapters differ after round trip: {bad[:10]}")
+        else:
+            print(f"   ✅ Round trip OK for all {chapters} chapters")
+    if args.bench:
+        bench(args.input, output)
+
+if __name__ == "__main__":
+    main()
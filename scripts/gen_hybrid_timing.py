@@ -0,0 +1,192 @@
+"""
+融合字数权重 (gen_weights.py) 与 aeneas 对齐结果 (audio_timestamps.json)，为每一章生成经文时间轴
+  -> assets/audio_timing.json (与 audio_timestamps.json 同结构) + audio_timing.bin (timestamp_codec.py)
+
+- 每行时长与 audio_weights_*.json 同源: gen_weights.line_cost，模型由 gen_weights.fit_timestamps
+  在未被标记的对齐章节上拟合 (gen_weights.py --model fitted 用的是同一个拟合)
+- 语速: 每本书 (同一朗读者) 的高置信度段实际时长 / 模型预测时长 作为该书的语速系数，
+  样本不足的书系数为 1
+- 锚点: 对齐结果中非异常段 (alignment_quality.py 评分) 的起止时间，加上章节开头 0 和音频总长
+- 两个锚点之间按预测时长比例分配 (即权重插值); 最后一个锚点之后直接按预测时长排列
+- 完全没有对齐结果的章节只有首尾两个锚点，退化为按权重分配
+章节音频时长取自未删静音的 Opus 档位 (Ogg granule，无需 ffprobe)，没有音频时按预测时长估算。
+
+用法: python scripts/gen_hybrid_timing.py [--audio-dir data/opus_8k] [--report hybrid_timing_report.json]
+"""
+
+import argparse
+import json
+import os
+
+from alignment_quality import DB_PATH, TIMESTAMPS_PATH, corpus_baseline, load_texts, score_chapter
+from audio_container import opus_duration_ms
+from build_audio_container import scan_chapters
+from gen_weights import fit_timestamps, line_cost
+from timestamp_codec import encode
+
+OUTPUT_PATH = "assets/audio_timing.json"
+AUDIO_DIR = "data/opus_8k"
+# 每本书至少这么多高置信度段才单独估计语速
+MIN_FIT_SEGMENTS = 30
+
+def line_durations(lines, model, scale=1.0):
+    """lines: [标题, 第 1 节, ...] -> 每行预测时长 (秒)"""
+    return [scale * line_cost(line, model, is_title=i == 0) for i, line in enumerate(lines)]
+
+def chapter_anchors(segments, lines, baseline):
+    """高置信度段的边界 -> {边界序号: 秒}; 第 i 段是边界 i 到 i + 1"""
+    if not segments or len(segments) != len(lines):
+        return {}, None
+    score = score_chapter(segments, lines, baseline)
+    bad = {o['verse'] for o in score['outliers']}
+    anchors = {}
+    for i, (begin, end) in enumerate(segments):
+        if i not in bad:
+            anchors.setdefault(i, begin)
+            anchors[i + 1] = end
+    return anchors, score
+
+def monotonic(anchors):
+    """丢掉会让时间倒退的锚点 (按边界序号顺序保留不减的时间)"""
+    kept, last = {}, float('-inf')
+    for index in sorted(anchors):
+        if anchors[index] >= last:
+            kept[index] = last = anchors[index]
+    return kept
+
+def fuse_chapter(predicted, anchors, duration=None):
+    """
+    predicted: 每行预测时长 [标题, 第 1 节, ...]; anchors: {边界序号: 秒}
+    duration: 章节音频总长，作为最后一个边界的锚点
+    返回 [[begin, end], ...]
+    """
+    n = len(predicted)
+    anchors = dict(anchors)
+    anchors.setdefault(0, 0.0)
+    if duration is not None and duration >= max(anchors.values()):
+        anchors[n] = duration
+    anchors = monotonic(anchors)
+
+    indices = sorted(anchors)
+    boundaries = [None] * (n + 1)
+    for index in indices:
+        boundaries[index] = anchors[index]
+    # 锚点之间按预测时长比例插值
+    for left, right in zip(indices, indices[1:]):
+        span = anchors[right] - anchors[left]
+        total = sum(predicted[left:right])
+        t = anchors[left]
+        for i in range(left, right - 1):
+            t += span * predicted[i] / total if total else span / (right - left)
+            boundaries[i + 1] = t
+    # 最后一个锚点之后按预测时长外推
+    for i in range(indices[-1], n):
+        boundaries[i + 1] = boundaries[i] + predicted[i]
+    return [[round(boundaries[i], 3), round(boundaries[i + 1], 3)] for i in range(n)]
+
+def audio_durations(audio_dir):
+    """{(book, chapter): 秒}"""
+    durations = {}
+    if not audio_dir or not os.path.isdir(audio_dir):
+        return durations
+    for book, chapter, path in scan_chapters(audio_dir):
+        with open(path, 'rb') as f:
+            ms = opus_duration_ms(f.read())
+        if ms:
+            durations[(book, chapter)] = ms / 1000
+    return durations
+
+def fit_rates(timestamps, texts, baseline):
+    """
+    在未被标记的对齐章节上拟合 gen_weights 模型，再按书估计语速系数
+    返回 (model, {book: 系数}, 拟合统计)
+    """
+    trusted, samples = {}, {}
+    for book, chapters in timestamps.items():
+        for chapter, segments in chapters.items():
+            lines = texts.get((int(book), int(chapter)))
+            if not lines or len(lines) != len(segments):
+                continue
+            score = score_chapter(segments, lines, baseline)
+            if score['flagged']:
+                continue
+            trusted.setdefault(book, {})[chapter] = segments
+            bad = {o['verse'] for o in score['outliers']}
+            # 标题段常为零长度，只用经文段估计语速
+            samples.setdefault(int(book), []).extend(
+                (lines[i], end - begin) for i, (begin, end) in enumerate(segments) if i > 0 and i not in bad)
+
+    model, stats = fit_timestamps(((book, chapter, lines[1:]) for (book, chapter), lines in sorted(texts.items())),
+                                  trusted)
+    scales = {}
+    for book, book_samples in samples.items():
+        if len(book_samples) < MIN_FIT_SEGMENTS:
+            continue
+        predicted = sum(line_cost(text, model) for text, _ in book_samples)
+        if predicted > 0:
+            scales[book] = sum(seconds for _, seconds in book_samples) / predicted
+    return model, scales, stats
+
+def generate(timestamps, texts, durations):
+    """返回 (时间轴, 每章报告, 模型)"""
+    baseline = corpus_baseline(timestamps, texts)
+    model, scales, _ = fit_rates(timestamps, texts, baseline)
+
+    timing, report = {}, []
+    for (book, chapter), lines in sorted(texts.items()):
+        segments = timestamps.get(str(book), {}).get(str(chapter))
+        anchors, score = chapter_anchors(segments, lines, baseline)
+        scale = scales.get(book, 1.0)
+        fused = fuse_chapter(line_durations(lines, model, scale), anchors, durations.get((book, chapter)))
+        timing.setdefault(str(book), {})[str(chapter)] = fused
+
+        # 边界 0 (章节开头) 总是已知，只统计经文的边界
+        coverage = sum(i in anchors for i in range(1, len(lines) + 1)) / len(lines)
+        method = 'aligned' if coverage == 1 else 'hybrid' if anchors else 'estimated'
+        report.append({'book': book, 'chapter': chapter, 'method': method, 'anchor_coverage': round(coverage, 3),
+                       'confidence': score['confidence'] if score else None,
+                       'audio_duration': durations.get((book, chapter)),
+                       'rate': {'scale': round(scale, 4), 'per_book': book in scales}})
+    return timing, report, model
+
+def main():
+    parser = argparse.ArgumentParser(description="Fuse char-count weights with aligned timestamps for every chapter")
+    parser.add_argument("--db", default=DB_PATH, help="Bible text database")
+    parser.add_argument("--timestamps", default=TIMESTAMPS_PATH, help="Aligned timestamps JSON")
+    parser.add_argument("--audio-dir", default=AUDIO_DIR, help="Untrimmed Opus tree for chapter durations")
+    parser.add_argument("--output", default=OUTPUT_PATH, help="Unified timing JSON (a .bin is written next to it)")
+    parser.add_argument("--report", help="Write per-chapter fusion details as JSON")
+    args = parser.parse_args()
+
+    with open(args.timestamps, 'r', encoding='utf-8') as f:
+        timestamps = json.load(f)
+    texts = load_texts(args.db)
+    durations = audio_durations(args.audio_dir)
+    if not durations:
+        print(f"⚠️ No chapter audio in {args.audio_dir}, chapter lengths are estimated from the speaking rate")
+
+    timing, report, model = generate(timestamps, texts, durations)
+
+    tmp_path = args.output + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(timing, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, args.output)
+    bin_path = os.path.splitext(args.output)[0] + '.bin'
+    with open(bin_path + '.tmp', 'wb') as f:
+        f.write(encode(timing))
+    os.replace(bin_path + '.tmp', bin_path)
+
+    counts = {}
+    for entry in report:
+        counts[entry['method']] = counts.get(entry['method'], 0) + 1
+    per_book = len({e['book'] for e in report if e['rate']['per_book']})
+    print("📐 Line model: " + ", ".join(f"{name} {value:.3f}s" for name, value in model.items()))
+    print(f"✅ {args.output} (+ {os.path.basename(bin_path)}): {len(report)} chapters — "
+          f"{', '.join(f'{m} {n}' for m, n in sorted(counts.items()))}; speaking rate fitted for {per_book} books")
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📝 Report written: {args.report}")
+
+if __name__ == "__main__":
+    main()
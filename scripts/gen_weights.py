@@ -1,6 +1,25 @@
+"""
+生成按字数估算的经文时间权重 assets/chs/audio_weights_chs.json、assets/cht/audio_weights_cht.json
+每章一个累计比例数组: weights[i] = (标题 + 第 1..i+1 节的估算时长) / 全章估算时长
+
+- 每个数据库一次流式查询，按 (book, chapter) 在内存中分组; 累计和一次性向量化计算 (NumPy 可选)
+- --model fitted: 用已对齐的 audio_timestamps.json 最小二乘拟合
+    时长 = 字 * w_char + 停顿标点 * w_pause + 数字 * w_digit + 标题 * w_title + 每行 w_line
+  代替单纯的字数; 模型只拟合一次，CHS 与 CHT 在同一次运行中生成
+用法: python scripts/gen_weights.py [--model fitted] [--timestamps assets/audio_timestamps.json]
+"""
+
+import argparse
 import sqlite3
 import json
 import os
+import statistics
+from itertools import accumulate, groupby
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 # Bible Books Metadata (id, name_zh, chapter_count)
 BIBLE_BOOKS = [
@@ -20,74 +39,183 @@ BIBLE_BOOKS = [
     (66, "启示录", 22)
 ]
 
+BOOK_NAMES = {book_id: name for book_id, name, _ in BIBLE_BOOKS}
+
+DATABASES = [
+    ("assets/chs/bible_chs.db", "assets/chs/audio_weights_chs.json"),
+    # CHT 音频同样来自 CHS 朗读 (标题用 CHS 书名)，沿用同一模型
+    ("assets/cht/bible_cht.db", "assets/cht/audio_weights_cht.json"),
+]
+TIMESTAMPS_PATH = "assets/audio_timestamps.json"
+# 朗读时会停顿的标点
+PAUSE_MARKS = set("，。、；：！？,.;:!?—…")
+FEATURES = ('chars', 'pauses', 'digits', 'title', 'line')
+# 纯字数模型 (原有行为): 每个字符 (含标点) 权重 1
+CHAR_MODEL = {'chars': 1.0, 'pauses': 1.0, 'digits': 1.0, 'title': 0.0, 'line': 0.0}
+# 拟合时残差超过 MAD 的这么多倍视为对齐错误，剔除后重新拟合
+OUTLIER_MADS = 3.5
+
 def get_book_name(book_id):
-    for bid, name, _ in BIBLE_BOOKS:
-        if bid == book_id:
-            return name
-    return ""
+    return BOOK_NAMES.get(book_id, "")
+
+def title_text(book_id, chapter):
+    # Replicate the title format likely read in the audio: "书名 第N章"
+    book_name = get_book_name(book_id)
+    return f"{book_name} 第{chapter}章" if book_name else ""
+
+def line_features(text, is_title=False):
+    pauses = sum(ch in PAUSE_MARKS for ch in text)
+    digits = sum(ch.isdigit() for ch in text)
+    chars = len(text) - pauses - digits
+    return [chars, pauses, digits, 1 if is_title and text else 0, 1 if text else 0]
+
+def line_cost(text, model, is_title=False):
+    return sum(model[name] * value for name, value in zip(FEATURES, line_features(text, is_title)))
+
+def iter_chapters(db_path):
+    """一次查询流式读取，按 (book_id, chapter) 分组: 产出 (book_id, chapter, [text, ...])"""
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT book_id, chapter, text FROM verses ORDER BY book_id, chapter, verse")
+        for (book_id, chapter), group in groupby(rows, key=lambda r: (r[0], r[1])):
+            yield book_id, chapter, [text for _, _, text in group]
+    finally:
+        conn.close()
+
+def cumulative_weights(title_costs, verse_costs, chapter_sizes):
+    """
+    所有章节拼成一个数组一次算累计和，再按章节切开并归一化。
+    title_costs[k]: 第 k 章标题的估算时长; verse_costs: 全部经文依次排列; chapter_sizes[k]: 第 k 章节数
+    """
+    if not chapter_sizes:
+        return []
+    if np is not None:
+        costs = np.asarray(verse_costs, dtype=np.float64)
+        sizes = np.asarray(chapter_sizes)
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        running = np.cumsum(costs)
+        # 每章的累计和从 0 开始: 减去该章之前所有经文的和
+        before = np.repeat(running[starts] - costs[starts], sizes)
+        titles = np.repeat(np.asarray(title_costs, dtype=np.float64), sizes)
+        cumulative = running - before + titles
+        totals = np.repeat(cumulative[starts + sizes - 1], sizes)
+        weights = np.divide(cumulative, totals, out=np.zeros_like(cumulative), where=totals > 0)
+        weights = np.round(weights, 6).tolist()
+        return [weights[start:start + size] for start, size in zip(starts.tolist(), chapter_sizes)]
+
+    result, pos = [], 0
+    for title_cost, size in zip(title_costs, chapter_sizes):
+        cumulative = list(accumulate(verse_costs[pos:pos + size], initial=title_cost))[1:]
+        total = cumulative[-1]
+        result.append([round(c / total, 6) if total > 0 else 0.0 for c in cumulative])
+        pos += size
+    return result
+
+def _solve(rows, targets):
+    """最小二乘解 (NumPy 不可用时用正规方程 + 高斯消元)"""
+    if np is not None:
+        return np.linalg.lstsq(np.asarray(rows, dtype=np.float64), np.asarray(targets), rcond=None)[0].tolist()
+    n = len(rows[0])
+    # [A^T A | A^T y]
+    m = [[sum(r[i] * r[j] for r in rows) for j in range(n)] + [sum(r[i] * y for r, y in zip(rows, targets))]
+         for i in range(n)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(m[r][col]))
+        if abs(m[pivot][col]) < 1e-12:
+            continue
+        m[col], m[pivot] = m[pivot], m[col]
+        for r in range(n):
+            if r != col and m[r][col]:
+                factor = m[r][col] / m[col][col]
+                m[r] = [a - factor * b for a, b in zip(m[r], m[col])]
+    return [m[i][n] / m[i][i] if abs(m[i][i]) >= 1e-12 else 0.0 for i in range(n)]
+
+def fit_model(db_path, timestamps_path):
+    """用已对齐的时间戳拟合各特征的时长系数，返回 (model, 统计信息)"""
+    with open(timestamps_path, 'r', encoding='utf-8') as f:
+        timestamps = json.load(f)
+    return fit_timestamps(iter_chapters(db_path), timestamps)
+
+def fit_timestamps(chapters, timestamps):
+    """
+    chapters: [(book_id, chapter, [text, ...]), ...]; timestamps: audio_timestamps.json 结构
+    只用 timestamps 中出现的章节 (调用方可先剔除低置信度章节)，返回 (model, 统计信息)
+    """
+    rows, targets = [], []
+    for book_id, chapter, verses in chapters:
+        segments = timestamps.get(str(book_id), {}).get(str(chapter))
+        if not segments or len(segments) != len(verses) + 1:
+            continue
+        title = line_features(title_text(book_id, chapter), is_title=True)
+        for i, (text, (begin, end)) in enumerate(zip(verses, segments[1:])):
+            features = line_features(text)
+            if i == 0 and segments[0][1] - segments[0][0] <= 0:
+                # 标题段为零长度时标题读音被算进第 1 节
+                features = [a + b for a, b in zip(features, title)]
+            elif i == 0:
+                rows.append(title)
+                targets.append(segments[0][1] - segments[0][0])
+            if end > begin:
+                rows.append(features)
+                targets.append(end - begin)
+    if len(rows) < len(FEATURES) * 10:
+        raise ValueError("Not enough aligned verses to fit the weighting model")
 
-def generate_weights(db_path, output_json):
+    coef = _solve(rows, targets)
+    # 剔除对齐错误造成的离群样本后重新拟合
+    residuals = [y - sum(c * x for c, x in zip(coef, r)) for r, y in zip(rows, targets)]
+    mad = statistics.median(abs(e) for e in residuals) or 1e-9
+    kept = [i for i, e in enumerate(residuals) if abs(e) <= OUTLIER_MADS * mad * 1.4826]
+    coef = _solve([rows[i] for i in kept], [targets[i] for i in kept])
+    # 时长系数不可能为负
+    model = {name: max(value, 0.0) for name, value in zip(FEATURES, coef)}
+
+    def mean_error(m):
+        return statistics.mean(abs(targets[i] - sum(m[name] * x for name, x in zip(FEATURES, rows[i])))
+                               for i in kept)
+    # 纯字数模型按同一总时长缩放后比较
+    scale = sum(targets[i] for i in kept) / sum(sum(CHAR_MODEL[n] * x for n, x in zip(FEATURES, rows[i]))
+                                               for i in kept)
+    stats = {'samples': len(rows), 'used': len(kept), 'mean_abs_error': mean_error(model),
+             'char_model_mean_abs_error': mean_error({n: v * scale for n, v in CHAR_MODEL.items()})}
+    return model, stats
+
+def generate_weights(db_path, output_json, model=CHAR_MODEL):
     if not os.path.exists(db_path):
         print(f"Skipping {db_path} as it does not exist.")
         return
 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # Get all book/chapter pairs
-    cursor.execute("SELECT DISTINCT book_id, chapter FROM verses ORDER BY book_id, chapter")
-    indices = cursor.fetchall()
-    
-    data = {}
-    for book_id, chapter in indices:
-        cursor.execute("SELECT text FROM verses WHERE book_id = ? AND chapter = ? ORDER BY verse", (book_id, chapter))
-        verses = cursor.fetchall()
-        
-        if not verses:
-            continue
-            
-        char_counts = [len(v[0]) for v in verses]
-        
-        # Calculate title offset (e.g. "创世记 第1章")
-        # Note: We use a simplified length estimation.
-        # Ideally this should match the actual audio duration ratio, but char count is a good proxy for TTS/reading speed.
-        book_name = get_book_name(book_id)
-        if not book_name:
+    keys, title_costs, verse_costs, sizes = [], [], [], []
+    for book_id, chapter, verses in iter_chapters(db_path):
+        if not get_book_name(book_id):
             print(f"Warning: Unknown book_id {book_id}")
-            title_len = 0
-        else:
-            # Replicate the title format likely read in the audio
-            # Usually: "BookName Chapter N" -> "书名 第N章"
-            title_text = f"{book_name} 第{chapter}章"
-            title_len = len(title_text)
-            
-        total = sum(char_counts) + title_len
-        
-        if total == 0:
-            weights = [0.0] * len(char_counts)
-        else:
-            cumulative = title_len
-            weights = []
-            for count in char_counts:
-                cumulative += count
-                weights.append(round(cumulative / total, 6))
-        
-        if str(book_id) not in data:
-            data[str(book_id)] = {}
-        data[str(book_id)][str(chapter)] = weights
-        
-    conn.close()
-    
+        keys.append((book_id, chapter))
+        title_costs.append(line_cost(title_text(book_id, chapter), model, is_title=True))
+        verse_costs.extend(line_cost(text, model) for text in verses)
+        sizes.append(len(verses))
+
+    data = {}
+    for (book_id, chapter), weights in zip(keys, cumulative_weights(title_costs, verse_costs, sizes)):
+        data.setdefault(str(book_id), {})[str(chapter)] = weights
+
     with open(output_json, 'w', encoding='utf-8') as f:
         json.dump(data, f)
-    
+
     print(f"Generated {output_json}")
 
 if __name__ == "__main__":
-    generate_weights("assets/chs/bible_chs.db", "assets/chs/audio_weights_chs.json")
-    # CHT db might have different book names if we supported it fully, but for CHT audio weights we are focusing on CHS logic for now as requested? 
-    # Actually the user only asked for CHS weights adjustment based on "Heheven" audio which is usually CHS.
-    # The original script generated both. Let's keep generating both but be aware CHT might need its own book names if strictly CHT audio is used.
-    # However, usually users use CHS audio even for CHT text or vice versa in some apps, or CHT audio has similar title structure.
-    # We will apply the same logic.
-    generate_weights("assets/cht/bible_cht.db", "assets/cht/audio_weights_cht.json")
+    parser = argparse.ArgumentParser(description="Generate per-verse cumulative audio weights for CHS and CHT")
+    parser.add_argument("--model", choices=["chars", "fitted"], default="chars",
+                        help="chars: plain character count; fitted: least-squares model from aligned timestamps")
+    parser.add_argument("--timestamps", default=TIMESTAMPS_PATH, help="Aligned timestamps used by --model fitted")
+    args = parser.parse_args()
+
+    model = CHAR_MODEL
+    if args.model == "fitted":
+        model, stats = fit_model(DATABASES[0][0], args.timestamps)
+        print(f"📐 Fitted on {stats['used']}/{stats['samples']} aligned lines: "
+              + ", ".join(f"{name} {value:.3f}s" for name, value in model.items()))
+        print(f"   mean abs error {stats['mean_abs_error']:.2f}s per verse "
+              f"(char count only: {stats['char_model_mean_abs_error']:.2f}s)")
+    for db_path, output_json in DATABASES:
+        generate_weights(db_path, output_json, model)
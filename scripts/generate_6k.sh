@@ -4,7 +4,7 @@
 cd "$(dirname "$0")/.."
 
 echo "🎵 Starting 6k Opus conversion..."
-python3 scripts/convert_audio_opus_low.py \
+python3 scripts/audio_batch.py \
     --source data/hehemp3 \
-    --output data/opus_6k
-
+    --profiles 6k \
+    --output 6k=data/opus_6k
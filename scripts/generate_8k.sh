@@ -4,7 +4,7 @@
 cd "$(dirname "$0")/.."
 
 echo "🎵 Starting 8k Opus conversion..."
-python3 scripts/batch_convert_opus.py \
+python3 scripts/audio_batch.py \
     --source data/hehemp3 \
-    --output data/opus_8k \
-    --mode 8k
+    --profiles 8k \
+    --output 8k=data/opus_8k
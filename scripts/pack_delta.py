@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+资源包增量更新 (delta) 构建工具
+用法:
+  python scripts/pack_delta.py OLD.zip.gz NEW.zip.gz OUT.delta [--verify]
+
+- 文件级对比: 按 zip 条目的 CRC32 + 大小找出新增 / 删除 / 修改的文件
+- 大文件 (数据库等) 生成 rsync 式滚动校验和二进制补丁，只传输变化的块;
+  补丁不划算时退回为整文件替换
+- 输出为一个 zip: delta.json (清单) + files/ (整文件) + patches/ (二进制补丁)
+- apply_delta() 把 delta 应用到 App 解压后的包目录，--verify 用于构建时自检
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import zipfile
+import zlib
+from contextlib import contextmanager
+from itertools import accumulate
+
+DELTA_FORMAT = 1
+PATCH_MAGIC = b'EYDP'
+# SQLite 默认页大小，单条经文修改通常只影响少数页
+BLOCK_SIZE = 4096
+# 小于该大小的文件直接整文件替换
+PATCH_MIN_SIZE = 64 * 1024
+# 补丁字面量超过新文件该比例时放弃补丁 (同时限制纯 Python 滚动计算的耗时)
+MAX_LITERAL_RATIO = 0.5
+# 已压缩格式直接存储，不再 deflate
+STORED_EXTENSIONS = ('.opus', '.mp3', '.gz', '.zip')
+
+_MOD = 0xFFFF
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def read_varint(data, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+def weak_checksum(block):
+    """rsync 弱校验和 (a, b)，可按字节滚动更新"""
+    a = sum(block) & _MOD
+    b = sum(accumulate(block)) & _MOD
+    return a, b
+
+def make_patch(old, new, block_size=BLOCK_SIZE, max_literal_ratio=MAX_LITERAL_RATIO):
+    """
+    生成把 old 变成 new 的补丁 (zlib 压缩后的字节)，字面量过多时返回 None。
+    操作序列: C <offset> <length> 从旧文件复制; D <length> <bytes> 直接写入
+    """
+    table = {}
+    for offset in range(0, len(old) - block_size + 1, block_size):
+        block = old[offset:offset + block_size]
+        a, b = weak_checksum(block)
+        table.setdefault((b << 16) | a, {}).setdefault(hashlib.md5(block).digest(), offset)
+
+    ops = []
+    n = len(new)
+    max_literal = int(n * max_literal_ratio)
+    literal_total = 0
+    pos = 0
+    literal_start = 0
+
+    def emit_literal(end):
+        if end > literal_start:
+            ops.append(('D', literal_start, end))
+
+    def emit_copy(offset):
+        if ops and ops[-1][0] == 'C' and ops[-1][1] + ops[-1][2] == offset:
+            ops[-1] = ('C', ops[-1][1], ops[-1][2] + block_size)
+        else:
+            ops.append(('C', offset, block_size))
+
+    if table and n >= block_size:
+        a, b = weak_checksum(new[0:block_size])
+        while pos + block_size <= n:
+            candidates = table.get((b << 16) | a)
+            if candidates:
+                offset = candidates.get(hashlib.md5(new[pos:pos + block_size]).digest())
+                if offset is not None:
+                    literal_total += pos - literal_start
+                    emit_literal(pos)
+                    emit_copy(offset)
+                    pos += block_size
+                    literal_start = pos
+                    if pos + block_size <= n:
+                        a, b = weak_checksum(new[pos:pos + block_size])
+                    continue
+
+            if literal_total + (pos - literal_start) > max_literal:
+                return None
+            if pos + block_size < n:
+                out_byte = new[pos]
+                a = (a - out_byte + new[pos + block_size]) & _MOD
+                b = (b - block_size * out_byte + a) & _MOD
+            pos += 1
+
+    literal_total += n - literal_start
+    if literal_total > max_literal:
+        return None
+    emit_literal(n)
+
+    out = bytearray(PATCH_MAGIC)
+    out.append(DELTA_FORMAT)
+    write_varint(out, n)
+    for op in ops:
+        if op[0] == 'C':
+            out += b'C'
+            write_varint(out, op[1])
+            write_varint(out, op[2])
+        else:
+            out += b'D'
+            write_varint(out, op[2] - op[1])
+            out += new[op[1]:op[2]]
+    return zlib.compress(bytes(out), 9)
+
+def apply_patch(old, patch):
+    data = zlib.decompress(patch)
+    if data[:4] != PATCH_MAGIC:
+        raise ValueError("Not a pack delta patch")
+    size, pos = read_varint(data, 5)
+    out = bytearray()
+    while pos < len(data):
+        op = data[pos:pos + 1]
+        pos += 1
+        if op == b'C':
+            offset, pos = read_varint(data, pos)
+            length, pos = read_varint(data, pos)
+            out += old[offset:offset + length]
+        elif op == b'D':
+            length, pos = read_varint(data, pos)
+            out += data[pos:pos + length]
+            pos += length
+        else:
+            raise ValueError(f"Bad patch op {op!r}")
+    if len(out) != size:
+        raise ValueError(f"Patched size {len(out)} != expected {size}")
+    return bytes(out)
+
+@contextmanager
+def open_pack(path):
+    """打开 .zip 或 .zip.gz 资源包; gzip 先流式解压到临时文件 (zipfile 需要随机访问)"""
+    if not path.endswith('.gz'):
+        with zipfile.ZipFile(path) as zf:
+            yield zf
+        return
+    with tempfile.TemporaryFile() as tmp:
+        with gzip.open(path, 'rb') as f_in:
+            shutil.copyfileobj(f_in, tmp, 1024 * 1024)
+        tmp.seek(0)
+        with zipfile.ZipFile(tmp) as zf:
+            yield zf
+
+def pack_entries(zf):
+    return {info.filename: info for info in zf.infolist() if not info.is_dir()}
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+def build_delta(old_path, new_path, out_path, from_version=None, to_version=None):
+    """对比两个版本的资源包并写出 delta 文件，返回 delta.json 内容"""
+    with open_pack(old_path) as old_zf, open_pack(new_path) as new_zf:
+        old_entries = pack_entries(old_zf)
+        new_entries = pack_entries(new_zf)
+
+        added = sorted(set(new_entries) - set(old_entries))
+        removed = sorted(set(old_entries) - set(new_entries))
+        changed = sorted(
+            name for name in set(old_entries) & set(new_entries)
+            if (old_entries[name].CRC, old_entries[name].file_size)
+            != (new_entries[name].CRC, new_entries[name].file_size)
+        )
+
+        manifest = {
+            'format': DELTA_FORMAT,
+            'from': from_version,
+            'to': to_version,
+            'added': [],
+            'removed': removed,
+            'changed': [],
+        }
+
+        tmp_path = out_path + '.tmp'
+        os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as out_zf:
+            def write_full(name, data):
+                compress = zipfile.ZIP_STORED if name.lower().endswith(STORED_EXTENSIONS) else zipfile.ZIP_DEFLATED
+                out_zf.writestr(zipfile.ZipInfo('files/' + name, new_entries[name].date_time), data, compress)
+
+            for name in added:
+                data = new_zf.read(name)
+                write_full(name, data)
+                manifest['added'].append({'name': name, 'size': len(data), 'sha256': sha256_bytes(data)})
+
+            for name in changed:
+                new_data = new_zf.read(name)
+                record = {'name': name, 'size': len(new_data), 'sha256': sha256_bytes(new_data)}
+                patch = None
+                if len(new_data) >= PATCH_MIN_SIZE:
+                    old_data = old_zf.read(name)
+                    patch = make_patch(old_data, new_data)
+                    if patch is not None and len(patch) >= len(zlib.compress(new_data, 6)):
+                        patch = None
+                if patch is not None:
+                    out_zf.writestr('patches/' + name, patch, zipfile.ZIP_STORED)
+                    record.update(method='patch', base_sha256=sha256_bytes(old_data), patch_size=len(patch))
+                else:
+                    write_full(name, new_data)
+                    record['method'] = 'full'
+                manifest['changed'].append(record)
+
+            out_zf.writestr('delta.json', json.dumps(manifest, ensure_ascii=False, indent=2))
+        os.replace(tmp_path, out_path)
+
+    patched = sum(1 for c in manifest['changed'] if c['method'] == 'patch')
+    print(f"🧩 Delta {os.path.basename(out_path)}: +{len(added)} -{len(removed)} "
+          f"~{len(changed)} ({patched} patched), {os.path.getsize(out_path)} bytes")
+    return manifest
+
+def apply_delta(delta_path, target_dir):
+    """把 delta 应用到已解压的包目录 (与 App 端逻辑一致)，校验每个结果的 SHA-256"""
+    with zipfile.ZipFile(delta_path) as zf:
+        manifest = json.loads(zf.read('delta.json'))
+
+        for name in manifest['removed']:
+            path = os.path.join(target_dir, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+        for record in manifest['added'] + manifest['changed']:
+            path = os.path.join(target_dir, record['name'])
+            if record.get('method') == 'patch':
+                with open(path, 'rb') as f:
+                    base = f.read()
+                if sha256_bytes(base) != record['base_sha256']:
+                    raise ValueError(f"Base file mismatch for {record['name']}")
+                data = apply_patch(base, zf.read('patches/' + record['name']))
+            else:
+                data = zf.read('files/' + record['name'])
+            if sha256_bytes(data) != record['sha256']:
+                raise ValueError(f"Checksum mismatch for {record['name']}")
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+    return manifest
+
+def verify_delta(old_path, new_path, delta_path):
+    """解压旧包 -> 应用 delta -> 与新包逐文件比较"""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with open_pack(old_path) as zf:
+            zf.extractall(tmp_dir)
+        apply_delta(delta_path, tmp_dir)
+        with open_pack(new_path) as zf:
+            expected = pack_entries(zf)
+            for name, info in expected.items():
+                with open(os.path.join(tmp_dir, name), 'rb') as f:
+                    if f.read() != zf.read(info):
+                        return False
+        actual = {
+            os.path.relpath(os.path.join(root, file), tmp_dir).replace(os.sep, '/')
+            for root, _, files in os.walk(tmp_dir) for file in files
+        }
+        return actual == set(expected)
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a delta between two resource pack versions")
+    parser.add_argument("old", help="Old pack (.zip or .zip.gz)")
+    parser.add_argument("new", help="New pack (.zip or .zip.gz)")
+    parser.add_argument("out", help="Output .delta file")
+    parser.add_argument("--verify", action="store_true", help="Apply the delta to the old pack and compare")
+    args = parser.parse_args()
+
+    build_delta(args.old, args.new, args.out)
+    if args.verify:
+        if verify_delta(args.old, args.new, args.out):
+            print("✅ Delta verified")
+        else:
+            print("❌ Delta verification failed")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+资源包清单 (server/api/packs.json) 生成工具
+- 流式计算 SHA-256，多个分片并行哈希 (hashlib 在大块 update 时释放 GIL)
+- 记录每个包 / 分片的大小、SHA-256、解压后大小、内容版本号和相对 URL
+- 构建缓存: 源目录指纹 (相对路径 + 大小 + mtime) 未变化且产物仍在时跳过重新打包
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+HASH_CHUNK_SIZE = 1024 * 1024
+MANIFEST_FORMAT = 2
+# 清单位于 /api/packs.json，包文件在服务根目录，URL 相对于清单解析
+URL_PREFIX = "../"
+
+def sha256_file(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+def hash_files_parallel(paths, max_workers=None):
+    """返回 {path: sha256}，每个文件一个线程流式读取"""
+    paths = list(paths)
+    if not paths:
+        return {}
+    max_workers = max_workers or min(len(paths), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return dict(zip(paths, executor.map(sha256_file, paths)))
+
+def iter_source_files(source):
+    """按确定顺序列出源文件 (跳过 .DS_Store 等隐藏文件)，返回 (abs_path, arcname)"""
+    if os.path.isfile(source):
+        yield source, os.path.basename(source)
+        return
+    for root, dirs, files in os.walk(source):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        for file in sorted(files):
+            if file.startswith('.'):
+                continue
+            file_path = os.path.join(root, file)
+            yield file_path, os.path.relpath(file_path, source)
+
+def source_fingerprint(source):
+    """源目录指纹及解压后总大小; 只用 stat，不读文件内容"""
+    h = hashlib.sha256()
+    total = 0
+    for file_path, arcname in iter_source_files(source):
+        st = os.stat(file_path)
+        h.update(f"{arcname}\0{st.st_size}\0{st.st_mtime_ns}\n".encode('utf-8'))
+        total += st.st_size
+    return h.hexdigest(), total
+
+def part_paths(artifact_path, parts):
+    if parts <= 1:
+        return []
+    return [f"{artifact_path}.part{i + 1}" for i in range(parts)]
+
+def build_pack_entry(pack, artifact_path, uncompressed_size, chunk_index=None):
+    """
+    哈希产物及其分片，生成清单中的一条记录。
+    chunk_index 为 split_pack.split_archive() 的结果时，额外列出按条目切分的独立分片。
+    """
+    parts = pack.get('parts', 1)
+    pieces = part_paths(artifact_path, parts)
+    digests = hash_files_parallel([artifact_path] + pieces)
+
+    sha256 = digests[artifact_path]
+    name = os.path.basename(artifact_path)
+    entry = {
+        'id': pack['id'],
+        'name': pack['name'],
+        'description': pack['description'],
+        # 内容寻址: 产物字节不变则版本号不变
+        'version': sha256[:12],
+        'url': URL_PREFIX + name,
+        'sha256': sha256,
+        'size': os.path.getsize(artifact_path),
+        'uncompressed_size': uncompressed_size,
+    }
+    if pieces:
+        entry['parts'] = parts
+        entry['part_urls'] = [URL_PREFIX + os.path.basename(p) for p in pieces]
+        entry['part_files'] = [
+            {
+                'url': URL_PREFIX + os.path.basename(p),
+                'sha256': digests[p],
+                'size': os.path.getsize(p),
+            }
+            for p in pieces
+        ]
+    if chunk_index:
+        base_dir = os.path.dirname(artifact_path)
+        index_path = os.path.splitext(artifact_path)[0] + '.index.json'
+        entry['index_url'] = URL_PREFIX + os.path.basename(index_path)
+        entry['index_sha256'] = sha256_file(index_path)
+        entry['chunks'] = [
+            {
+                'url': URL_PREFIX + part['file'],
+                'sha256': part['sha256'],
+                'size': part['size'],
+                'entries': len(part['entries']),
+                'first': part['entries'][0]['name'],
+                'last': part['entries'][-1]['name'],
+            }
+            for part in chunk_index['parts']
+            if os.path.exists(os.path.join(base_dir, part['file']))
+        ]
+    return entry
+
+def artifacts_intact(entry, artifact_path):
+    """缓存记录对应的产物文件仍存在且大小一致 (廉价检查，不重新哈希)"""
+    files = [(artifact_path, entry['size'])]
+    for part in entry.get('part_files', []) + entry.get('chunks', []):
+        files.append((os.path.join(os.path.dirname(artifact_path), os.path.basename(part['url'])), part['size']))
+    return all(os.path.exists(p) and os.path.getsize(p) == size for p, size in files)
+
+def load_json(path, default):
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        print(f"⚠️ Ignoring unreadable {path}")
+        return default
+
+def write_json_atomic(path, data, indent=2):
+    # pack_server 会轮询清单，先写临时文件再替换，避免读到写了一半的 JSON
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+        f.write('\n')
+    os.replace(tmp_path, path)
+
+def write_manifest(entries, manifest_path):
+    write_json_atomic(manifest_path, {'format': MANIFEST_FORMAT, 'packs': entries})
+    print(f"📝 Manifest written: {manifest_path} ({len(entries)} packs)")
@@ -1,7 +1,24 @@
 import os
 import shutil
-import gzip
+import time
 import zipfile
+import argparse
+
+from pack_delta import build_delta
+from pack_manifest import (
+    URL_PREFIX,
+    artifacts_intact,
+    build_pack_entry,
+    iter_source_files,
+    load_json,
+    sha256_file,
+    source_fingerprint,
+    write_json_atomic,
+    write_manifest,
+)
+from pack_zip_writer import write_zip
+from split_pack import part_name, split_archive, split_file
+from precompress_assets import precompress_dir
 
 # Configuration
 SOURCE_CHT_DIR = "assets/cht"
@@ -9,63 +26,235 @@ SOURCE_OPUS_6K = "data/opus_6k"
 SOURCE_OPUS_8K = "data/opus_8k"
 
 TARGET_DIR = "server/packs"
+MANIFEST_PATH = "server/api/packs.json"
+# 记录每个包上次构建时的源指纹和清单条目，未变化的包直接跳过
+BUILD_CACHE_PATH = os.path.join(TARGET_DIR, ".build_cache.json")
+# 旧版本产物保留在 history/<id>/<version>.zip，用于生成到新版本的增量包
+HISTORY_DIR = os.path.join(TARGET_DIR, "history")
+DELTAS_DIR = os.path.join(TARGET_DIR, "deltas")
+MAX_HISTORY_VERSIONS = 3
+
+# 单遍打包: 已是压缩格式的文件 store，其余按所选编码压缩
+# App 端 archive 包只保证支持 store / deflate，bzip2 / lzma 仅用于本地对比压缩率
+STORED_EXTENSIONS = ('.opus', '.mp3', '.ttf', '.otf', '.png', '.jpg', '.gz', '.zip')
+CODECS = {
+    "deflate": zipfile.ZIP_DEFLATED,
+    "bzip2": zipfile.ZIP_BZIP2,
+    "lzma": zipfile.ZIP_LZMA,
+}
+COMPRESS_LEVELS = {zipfile.ZIP_DEFLATED: 9, zipfile.ZIP_BZIP2: 9}
+DEFAULT_CODEC = "deflate"
+# 发布用的 deflate 走 pack_zip_writer 多进程压缩 (输出与串行一致); bzip2 / lzma 仅本地对比，仍用 zipfile 串行
+DEFAULT_JOBS = os.cpu_count() or 1
+
+PACKS = [
+    {
+        "id": "lang_cht",
+        "name": "繁体中文",
+        "description": "Traditional Chinese Bible Database",
+        "source": SOURCE_CHT_DIR,
+        "target": "lang_cht.zip",
+    },
+    {
+        "id": "voice_6k",
+        "name": "基础语音包",
+        "description": "Opus 6kbps Audio Pack",
+        "source": SOURCE_OPUS_6K,
+        "target": "voice_6k.zip",
+        "parts": 2,
+        "chunk_mb": 32,
+    },
+    {
+        "id": "voice_8k",
+        "name": "高级语音包",
+        "description": "Opus 8kbps Audio Pack",
+        "source": SOURCE_OPUS_8K,
+        "target": "voice_8k.zip",
+        "parts": 3,
+        "chunk_mb": 32,
+    },
+]
 
 def ensure_dir(path):
     if not os.path.exists(path):
         os.makedirs(path)
 
-def compress_file_gzip(src_path, dst_path):
-    print(f"📦 Compressing {src_path} -> {dst_path} ...")
-    with open(src_path, 'rb') as f_in:
-        with gzip.open(dst_path, 'wb') as f_out:
-            shutil.copyfileobj(f_in, f_out)
-    print(f"✅ Done: {dst_path}")
-
-def zip_folder(folder_path, zip_path):
-    print(f"🤐 Zipping {folder_path} -> {zip_path} ...")
-    with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for root, dirs, files in os.walk(folder_path):
-            for file in files:
-                if file.startswith('.'): continue # Skip .DS_Store
-                file_path = os.path.join(root, file)
-                arcname = os.path.relpath(file_path, folder_path)
-                zipf.write(file_path, arcname)
-    print(f"✅ Zipped: {zip_path}")
-
-def pack_folder_gzip(folder_path, target_gz_path):
-    # Temp zip
-    temp_zip = folder_path.rstrip('/') + ".temp.zip"
-    zip_folder(folder_path, temp_zip)
-    
-    # Compress zip to gz
-    compress_file_gzip(temp_zip, target_gz_path)
-    
-    # Cleanup
-    os.remove(temp_zip)
+def entry_compression(arcname, codec):
+    """已压缩格式 (Opus / 字体) 直接存储，文本和数据库用所选编码压缩"""
+    if arcname.lower().endswith(STORED_EXTENSIONS):
+        return zipfile.ZIP_STORED
+    return CODECS[codec]
 
-def main():
-    ensure_dir(TARGET_DIR)
+def pack_folder_zip(folder_path, target_path, codec=DEFAULT_CODEC, jobs=DEFAULT_JOBS):
+    """
+    单遍流式打包: 每个文件直接写入最终 zip (不再 先 zip 再整体 gzip)，
+    按扩展名统计耗时和压缩率; deflate 时 jobs 个进程并行压缩
+    """
+    parallel = codec == "deflate" and jobs > 1
+    print(f"🤐 Packing {folder_path} -> {target_path} ({codec}"
+          f"{f', {jobs} processes' if parallel else ''}) ...")
+    stats = {}
+    start_all = time.perf_counter()
 
-    # 1. Pack CHT Resources (DB + Font)
-    if os.path.exists(SOURCE_CHT_DIR):
-        target_cht_gz = os.path.join(TARGET_DIR, "lang_cht.zip.gz")
-        pack_folder_gzip(SOURCE_CHT_DIR, target_cht_gz)
-    else:
-        print(f"⚠️ Warning: {SOURCE_CHT_DIR} not found.")
+    def record(arcname, compress_type, raw, packed, seconds):
+        ext = os.path.splitext(arcname)[1].lower() or "(none)"
+        s = stats.setdefault(ext, {"files": 0, "raw": 0, "packed": 0, "seconds": 0.0,
+                                   "method": "store" if compress_type == zipfile.ZIP_STORED else codec})
+        s["files"] += 1
+        s["raw"] += raw
+        s["packed"] += packed
+        s["seconds"] += seconds
 
-    # 2. Pack Opus 6k
-    if os.path.exists(SOURCE_OPUS_6K):
-        target_6k_gz = os.path.join(TARGET_DIR, "voice_6k.zip.gz")
-        pack_folder_gzip(SOURCE_OPUS_6K, target_6k_gz)
+    # 服务器可能正在提供旧文件，写完后原子替换
+    partial_path = target_path + ".partial"
+    # Sorted walk, skipping .DS_Store etc., so archives are reproducible
+    files = iter_source_files(folder_path)
+    if codec == "deflate":
+        write_zip(partial_path, files, jobs=jobs, method=lambda arcname: entry_compression(arcname, codec),
+                  level=COMPRESS_LEVELS[zipfile.ZIP_DEFLATED],
+                  on_entry=lambda e: record(e['arcname'], e['method'], e['size'], len(e['data']), e['seconds']))
     else:
-        print(f"⚠️ Warning: {SOURCE_OPUS_6K} not found.")
+        with zipfile.ZipFile(partial_path, 'w') as zipf:
+            for file_path, arcname in files:
+                compress_type = entry_compression(arcname, codec)
+                start = time.perf_counter()
+                zipf.write(file_path, arcname, compress_type=compress_type,
+                           compresslevel=COMPRESS_LEVELS.get(compress_type))
+                info = zipf.getinfo(arcname)
+                record(arcname, compress_type, info.file_size, info.compress_size, time.perf_counter() - start)
+    os.replace(partial_path, target_path)
 
-    # 3. Pack Opus 8k
-    if os.path.exists(SOURCE_OPUS_8K):
-        target_8k_gz = os.path.join(TARGET_DIR, "voice_8k.zip.gz")
-        pack_folder_gzip(SOURCE_OPUS_8K, target_8k_gz)
-    else:
-        print(f"⚠️ Warning: {SOURCE_OPUS_8K} not found.")
+    print(f"   {'type':<8} {'method':<8} {'files':>6} {'raw MB':>9} {'packed MB':>10} {'ratio':>6} {'sec':>7}")
+    for ext, s in sorted(stats.items(), key=lambda item: -item[1]["raw"]):
+        ratio = s["packed"] / s["raw"] if s["raw"] else 1.0
+        print(f"   {ext:<8} {s['method']:<8} {s['files']:>6} {s['raw'] / 1048576:>9.2f} "
+              f"{s['packed'] / 1048576:>10.2f} {ratio:>6.1%} {s['seconds']:>7.2f}")
+    print(f"✅ Packed: {target_path} ({os.path.getsize(target_path) / 1048576:.2f} MB, "
+          f"{time.perf_counter() - start_all:.2f}s)")
+    return stats
+
+def remove_stale_chunks(target):
+    """上次构建的分片可能更多，先删掉 <base>.p<N>.zip，避免残留旧分片"""
+    i = 1
+    while os.path.exists(part_name(target, i)):
+        os.remove(part_name(target, i))
+        i += 1
+
+def archive_previous(pack, entry, target):
+    """
+    把即将被覆盖的旧版本产物硬链接 (跨文件系统时复制) 进 history，只保留最近 MAX_HISTORY_VERSIONS 个。
+    旧产物留在原处继续提供下载，直到 pack_folder_zip 用新包原子替换它; 构建失败时旧包不受影响
+    """
+    history_dir = os.path.join(HISTORY_DIR, pack["id"])
+    ensure_dir(history_dir)
+    ext = os.path.basename(target).split(".", 1)[1]
+    archived = os.path.join(history_dir, f"{entry['version']}.{ext}")
+    tmp_path = archived + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    try:
+        os.link(target, tmp_path)
+    except OSError:
+        shutil.copy2(target, tmp_path)
+    os.replace(tmp_path, archived)
+
+    versions = sorted(
+        (os.path.join(history_dir, name) for name in os.listdir(history_dir)),
+        key=os.path.getmtime, reverse=True,
+    )
+    for stale in versions[MAX_HISTORY_VERSIONS:]:
+        os.remove(stale)
+
+def build_pack_deltas(pack, entry, target):
+    """为 history 中每个旧版本生成 旧 -> 新 的增量包，返回清单中的 deltas 列表"""
+    history_dir = os.path.join(HISTORY_DIR, pack["id"])
+    delta_dir = os.path.join(DELTAS_DIR, pack["id"])
+    # 旧的增量包指向过期版本，全部重建
+    shutil.rmtree(delta_dir, ignore_errors=True)
+    if not os.path.isdir(history_dir):
+        return []
+
+    deltas = []
+    for name in sorted(os.listdir(history_dir)):
+        from_version = name.split(".", 1)[0]
+        if from_version == entry["version"]:
+            continue
+        delta_path = os.path.join(delta_dir, f"{from_version}_{entry['version']}.delta")
+        build_delta(os.path.join(history_dir, name), target, delta_path,
+                    from_version=from_version, to_version=entry["version"])
+        deltas.append({
+            "from": from_version,
+            "url": f"{URL_PREFIX}delta/{pack['id']}/{from_version}/{entry['version']}",
+            "size": os.path.getsize(delta_path),
+            "sha256": sha256_file(delta_path),
+        })
+    return deltas
+
+def build_pack(pack, cache, force=False, codec=DEFAULT_CODEC, jobs=DEFAULT_JOBS):
+    """打包 (必要时) 并返回清单条目; 源不存在时返回 None"""
+    source = pack["source"]
+    target = os.path.join(TARGET_DIR, pack["target"])
+    cached = cache.get(pack["id"])
+    if not os.path.exists(source):
+        print(f"⚠️ Warning: {source} not found.")
+        # 本机没有源数据时保留上次构建的产物，避免清单里丢包
+        if cached and artifacts_intact(cached["entry"], target):
+            return cached["entry"]
+        return None
+
+    parts = pack.get("parts", 1)
+    fingerprint, uncompressed_size = source_fingerprint(source)
+
+    if (not force and cached
+            and cached.get("source") == fingerprint
+            and cached.get("parts") == parts
+            and artifacts_intact(cached["entry"], target)):
+        print(f"⏭️  {pack['id']} unchanged, skipping rebuild")
+        return cached["entry"]
+
+    if cached and os.path.exists(target):
+        archive_previous(pack, cached["entry"], target)
+
+    pack_folder_zip(source, target, codec, jobs)
+    if parts > 1:
+        # 旧版 App: 按字节切分，全部下载拼接后再解压
+        split_file(target, parts)
+    chunk_index = None
+    if pack.get("chunk_mb"):
+        # 新版: 按条目边界切分的独立 zip + 索引，可并行下载 / 解压
+        remove_stale_chunks(target)
+        chunk_index = split_archive(target, int(pack["chunk_mb"] * 1024 * 1024))
+
+    entry = build_pack_entry(pack, target, uncompressed_size, chunk_index)
+    deltas = build_pack_deltas(pack, entry, target)
+    if deltas:
+        entry["deltas"] = deltas
+    cache[pack["id"]] = {"source": fingerprint, "parts": parts, "entry": entry}
+    print(f"🔑 {pack['id']} v{entry['version']} ({entry['size']} bytes, sha256 {entry['sha256'][:16]}…)")
+    return entry
+
+def main():
+    parser = argparse.ArgumentParser(description="Build resource packs and packs.json manifest")
+    parser.add_argument("--force", action="store_true", help="Rebuild packs even if sources are unchanged")
+    parser.add_argument("--codec", choices=sorted(CODECS), default=DEFAULT_CODEC,
+                        help="Codec for compressible entries (text / database)")
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS,
+                        help="Compression processes for deflate packs (1 = serial)")
+    args = parser.parse_args()
+
+    ensure_dir(TARGET_DIR)
+    cache = load_json(BUILD_CACHE_PATH, {})
+
+    entries = []
+    for pack in PACKS:
+        entry = build_pack(pack, cache, force=args.force, codec=args.codec, jobs=args.jobs)
+        if entry:
+            entries.append(entry)
+
+    write_json_atomic(BUILD_CACHE_PATH, cache)
+    write_manifest(entries, MANIFEST_PATH)
+    # 分片索引等 JSON 预压缩，pack_server 按 Accept-Encoding 直接发送
+    precompress_dir(TARGET_DIR)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,143 @@
+"""
+可并行的确定性 zip 写入器
+- compress_entry() 是纯函数: 读取一个文件并返回压缩结果，可直接丢进进程池
+- ZipAssembler 按给定顺序把已压缩的条目拼成 zip (本地头 + 数据 + 中央目录)
+- 串行和并行模式走完全相同的 compress_entry，输出逐字节一致
+"""
+
+import os
+import struct
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+READ_CHUNK_SIZE = 1024 * 1024
+# 不写 ZIP64: 单包 / 单条目超过 4GB 时直接报错
+ZIP_LIMIT = 0xFFFFFFFF
+
+_LOCAL_HEADER = struct.Struct('<IHHHHHIIIHH')
+_CENTRAL_HEADER = struct.Struct('<IHHHHHHIIIHHHHHII')
+_END_RECORD = struct.Struct('<IHHHHIIH')
+_VERSION = 20
+_MADE_BY_UNIX = 3 << 8
+_UTF8_FLAG = 0x800
+
+def dos_datetime(mtime):
+    # 与 zipfile 相同: 本地时间，秒精度 2s，1980 年以前按 1980-01-01 计
+    year, month, day, hour, minute, second = time.localtime(mtime)[:6]
+    if year < 1980:
+        year, month, day, hour, minute, second = 1980, 1, 1, 0, 0, 0
+    dos_date = (year - 1980) << 9 | month << 5 | day
+    dos_time = hour << 11 | minute << 5 | (second // 2)
+    return dos_time, dos_date
+
+def compress_entry(file_path, arcname, method=ZIP_DEFLATED, level=9):
+    """读取并压缩单个文件，返回 ZipAssembler.add() 所需的全部字段"""
+    start = time.perf_counter()
+    st = os.stat(file_path)
+    crc = 0
+    size = 0
+    chunks = []
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15) if method == ZIP_DEFLATED else None
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            chunks.append(compressor.compress(chunk) if compressor else chunk)
+    if compressor:
+        chunks.append(compressor.flush())
+    return {
+        'arcname': arcname,
+        'method': method,
+        'crc': crc,
+        'size': size,
+        'data': b''.join(chunks),
+        'mtime': st.st_mtime,
+        'mode': st.st_mode,
+        # 该条目的读取 + 压缩耗时 (并行时为 worker 内的耗时)
+        'seconds': time.perf_counter() - start,
+    }
+
+class ZipAssembler:
+    def __init__(self, path):
+        self.path = path
+        self._f = open(path, 'wb')
+        self._central = []
+
+    def add(self, entry):
+        """写入一个条目，返回 (本地头偏移, 本地头 + 数据的总长度)"""
+        name = entry['arcname'].replace(os.sep, '/').encode('utf-8')
+        flags = 0 if name.isascii() else _UTF8_FLAG
+        dos_time, dos_date = dos_datetime(entry['mtime'])
+        compressed_size = len(entry['data'])
+        offset = self._f.tell()
+        if max(offset, compressed_size, entry['size']) > ZIP_LIMIT:
+            raise ValueError(f"{entry['arcname']}: pack exceeds 4GB, ZIP64 is not supported")
+
+        self._f.write(_LOCAL_HEADER.pack(
+            0x04034B50, _VERSION, flags, entry['method'], dos_time, dos_date,
+            entry['crc'], compressed_size, entry['size'], len(name), 0))
+        self._f.write(name)
+        self._f.write(entry['data'])
+
+        self._central.append(_CENTRAL_HEADER.pack(
+            0x02014B50, _MADE_BY_UNIX | _VERSION, _VERSION, flags, entry['method'],
+            dos_time, dos_date, entry['crc'], compressed_size, entry['size'],
+            len(name), 0, 0, 0, 0, (entry['mode'] & 0xFFFF) << 16, offset) + name)
+        return offset, self._f.tell() - offset
+
+    def close(self):
+        cd_offset = self._f.tell()
+        for record in self._central:
+            self._f.write(record)
+        cd_size = self._f.tell() - cd_offset
+        count = len(self._central)
+        if count > 0xFFFF or cd_offset > ZIP_LIMIT:
+            raise ValueError("Too many entries for a non-ZIP64 archive")
+        self._f.write(_END_RECORD.pack(0x06054B50, 0, 0, count, count, cd_size, cd_offset, 0))
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._f.close()
+
+def write_zip(zip_path, files, jobs=1, method=ZIP_DEFLATED, level=9, on_entry=None):
+    """
+    files: [(file_path, arcname), ...]，按此顺序写入。
+    method: 压缩方式，或 arcname -> 压缩方式 的函数 (逐条目选择，如已压缩格式 store)
+    on_entry: 可选回调，每写入一个条目以 compress_entry 的结果调用一次 (用于统计)
+    jobs > 1 时在进程池中压缩，结果仍按原顺序拼装，输出与 jobs=1 完全相同。
+    """
+    files = list(files)
+    methods = [method(a) if callable(method) else method for _, a in files]
+    with ZipAssembler(zip_path) as zf:
+        if jobs <= 1 or len(files) <= 1:
+            for (file_path, arcname), m in zip(files, methods):
+                entry = compress_entry(file_path, arcname, m, level)
+                zf.add(entry)
+                if on_entry:
+                    on_entry(entry)
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                n = len(files)
+                results = executor.map(
+                    compress_entry,
+                    [p for p, _ in files], [a for _, a in files],
+                    methods, [level] * n,
+                    chunksize=max(1, n // (jobs * 8)),
+                )
+                for entry in results:
+                    zf.add(entry)
+                    if on_entry:
+                        on_entry(entry)
+    return len(files)
@@ -0,0 +1,117 @@
+"""
+为 server/packs 下的文本资源 (audio_timestamps.json、词典、权重等) 预先生成压缩副本
+  foo.json -> foo.json.gz / foo.json.br / foo.json.zst
+pack_server 按 Accept-Encoding 直接发送对应副本，运行时零压缩开销。
+
+- gzip 始终生成 (mtime=0，同一内容输出稳定)
+- brotli / zstandard 为可选依赖 (pip install brotli zstandard)，未安装时跳过对应格式
+- 副本比源文件新则跳过; 压缩后不比原文件小的格式不保留
+用法: python scripts/precompress_assets.py [--dir server/packs] [--force]
+"""
+
+import argparse
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+TARGET_DIR = "server/packs"
+# 需要预压缩的文本类扩展名 (音频 / zip / 数据库本身已压缩或不适合)
+TEXT_ASSET_EXTENSIONS = {'.json', '.txt', '.csv', '.tsv', '.xml', '.svg', '.html', '.js', '.css'}
+# Content-Encoding -> 副本后缀
+ENCODING_SUFFIXES = {'br': '.br', 'zstd': '.zst', 'gzip': '.gz'}
+# 太小的文件压缩收益抵不过一次 stat
+MIN_SIZE = 1024
+
+def _compressors():
+    compressors = {'gzip': lambda data: gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        compressors['br'] = lambda data: brotli.compress(data, quality=11)
+    if zstandard is not None:
+        compressors['zstd'] = lambda data: zstandard.ZstdCompressor(level=19).compress(data)
+    return compressors
+
+def is_text_asset(path):
+    return os.path.splitext(path)[1].lower() in TEXT_ASSET_EXTENSIONS
+
+def iter_text_assets(root):
+    for dirpath, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        for file in sorted(files):
+            path = os.path.join(dirpath, file)
+            if not file.startswith('.') and is_text_asset(path) and os.path.getsize(path) >= MIN_SIZE:
+                yield path
+
+def write_atomic(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def precompress_file(path, compressors, force=False):
+    """生成 path 的各压缩副本，返回 {encoding: 副本大小或 None (已是最新 / 不划算)}"""
+    src_mtime = os.stat(path).st_mtime_ns
+    data = None
+    results = {}
+    for encoding, compress in compressors.items():
+        out_path = path + ENCODING_SUFFIXES[encoding]
+        if not force and os.path.exists(out_path) and os.stat(out_path).st_mtime_ns >= src_mtime:
+            results[encoding] = None
+            continue
+        if data is None:
+            with open(path, 'rb') as f:
+                data = f.read()
+        compressed = compress(data)
+        if len(compressed) >= len(data):
+            if os.path.exists(out_path):
+                os.remove(out_path)
+            results[encoding] = None
+            continue
+        write_atomic(out_path, compressed)
+        results[encoding] = len(compressed)
+    return results
+
+def remove_orphans(root):
+    """删除源文件已不存在的压缩副本"""
+    removed = 0
+    suffixes = tuple(ENCODING_SUFFIXES.values())
+    for dirpath, _, files in os.walk(root):
+        for file in files:
+            if file.endswith(suffixes):
+                source = os.path.join(dirpath, os.path.splitext(file)[0])
+                if is_text_asset(source) and not os.path.exists(source):
+                    os.remove(os.path.join(dirpath, file))
+                    removed += 1
+    return removed
+
+def precompress_dir(root=TARGET_DIR, force=False):
+    if not os.path.isdir(root):
+        print(f"⚠️ Directory not found: {root}")
+        return
+    compressors = _compressors()
+    print(f"🗜️  Precompressing text assets in {root} ({', '.join(compressors)})")
+    for path in iter_text_assets(root):
+        results = precompress_file(path, compressors, force)
+        written = {enc: size for enc, size in results.items() if size is not None}
+        if written:
+            original = os.path.getsize(path)
+            sizes = ', '.join(f"{enc} {size / original:.0%}" for enc, size in written.items())
+            print(f"   {os.path.relpath(path, root)}: {original / 1024:.1f} KB -> {sizes}")
+    removed = remove_orphans(root)
+    if removed:
+        print(f"   🧹 Removed {removed} stale compressed copies")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate .gz/.br/.zst siblings for text assets")
+    parser.add_argument("--dir", default=TARGET_DIR, help="Directory to scan (recursively)")
+    parser.add_argument("--force", action="store_true", help="Recompress even if siblings are up to date")
+    args = parser.parse_args()
+    precompress_dir(args.dir, args.force)
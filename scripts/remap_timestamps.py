@@ -0,0 +1,118 @@
+"""
+把按原始 MP3 对齐的 assets/audio_timestamps.json 换算到删过静音的档位 (6k) 的时间轴
+  assets/audio_timestamps.json + 构建数据库中的 removed_silence -> assets/audio_timestamps_6k.json
+转码时 audio_batch.py 已用 silencedetect 记录下每章被 silenceremove 删掉的静音段，
+这里只做换算，不需要对每个档位重新跑对齐。
+
+换算规则: t' = t - (t 之前被删掉的静音总长); 落在被删静音段内的时间点收缩到该段起点。
+没有静音记录的章节 (转码早于本功能或用 --adopt 登记) 原样保留并列出，
+用 audio_batch.py --force 重新转码该档位即可补上。
+
+用法:
+  python scripts/remap_timestamps.py                 # 6k
+  python scripts/remap_timestamps.py --profile 6k --output-dir /tmp/opus_6k --out /tmp/ts_6k.json
+"""
+
+import argparse
+import bisect
+import json
+import os
+
+from audio_build_db import BUILD_DB_PATH, BuildDB
+from audio_profiles import get_profile, silence_detect
+from validate_audio import TIMESTAMPS_PATH, chapter_key, tier_timestamps_path
+
+DEFAULT_PROFILE = '6k'
+
+class SilenceMap:
+    """源文件时间轴 -> 删静音后时间轴"""
+
+    def __init__(self, segments):
+        self.starts, self.ends, self.removed_before = [], [], []
+        removed = 0.0
+        for start, end in sorted(segments, key=lambda s: s[0]):
+            end = float('inf') if end is None else end
+            self.starts.append(start)
+            self.ends.append(end)
+            self.removed_before.append(removed)
+            removed += end - start
+
+    def __call__(self, t):
+        i = bisect.bisect_right(self.starts, t) - 1
+        if i < 0:
+            return t
+        if t < self.ends[i]:
+            # 落在被删除的静音段内
+            return self.starts[i] - self.removed_before[i]
+        return t - self.removed_before[i] - (self.ends[i] - self.starts[i])
+
+def remap_chapter(segments, silence):
+    mapping = SilenceMap(silence)
+    return [[round(mapping(begin), 3), round(mapping(end), 3)] for begin, end in segments]
+
+def chapter_silences(build_db, profile_name, output_dir):
+    """{(book, chapter): removed_silence}，只取该档位、该输出目录下带静音记录的章节"""
+    prefix = os.path.normpath(output_dir) + os.sep
+    silences = {}
+    for output, record in build_db.records.items():
+        if record['profile'] != profile_name or not output.startswith(prefix) or 'removed_silence' not in record:
+            continue
+        key = chapter_key(output)
+        if key:
+            silences[key] = record['removed_silence']
+    return silences
+
+def remap(timestamps, silences):
+    """返回 (换算后的时间戳, 缺少静音记录的章节列表)"""
+    result, missing = {}, []
+    for book, chapters in timestamps.items():
+        result[book] = {}
+        for chapter, segments in chapters.items():
+            silence = silences.get((book, chapter))
+            if silence is None:
+                missing.append((book, chapter))
+                result[book][chapter] = segments
+            else:
+                result[book][chapter] = remap_chapter(segments, silence)
+    return result, missing
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Remap verse timestamps onto a silence-trimmed audio tier")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, help="Audio profile whose outputs were trimmed")
+    parser.add_argument("--output-dir", help="Profile output directory (default: the profile's own)")
+    parser.add_argument("--timestamps", default=TIMESTAMPS_PATH, help="Timestamps aligned against the source MP3s")
+    parser.add_argument("--out", help="Remapped timestamps (default: assets/audio_timestamps_<profile>.json)")
+    parser.add_argument("--build-db", default=BUILD_DB_PATH, help="JSON-lines build database")
+    args = parser.parse_args(argv)
+
+    try:
+        p = get_profile(args.profile)
+    except ValueError as e:
+        parser.error(str(e))
+    if not silence_detect(p):
+        print(f"✅ Profile {args.profile} does not remove silence, {args.timestamps} applies unchanged")
+        return
+    output_dir = args.output_dir or p['output_dir']
+    out_path = args.out or tier_timestamps_path(args.timestamps, args.profile)
+
+    with open(args.timestamps, 'r', encoding='utf-8') as f:
+        timestamps = json.load(f)
+    silences = chapter_silences(BuildDB(args.build_db), args.profile, output_dir)
+    result, missing = remap(timestamps, silences)
+
+    tmp_path = out_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, out_path)
+
+    removed = sum((end or start) - start for key in silences for start, end in silences[key])
+    chapters = sum(len(c) for c in timestamps.values())
+    print(f"✅ {out_path}: {chapters - len(missing)}/{chapters} chapters remapped, "
+          f"{removed / 60:.1f} min of silence removed")
+    if missing:
+        print(f"⚠️ {len(missing)} chapters have no silence record and were copied unchanged: "
+              f"{', '.join('/'.join(k) for k in missing[:10])}{' ...' if len(missing) > 10 else ''}")
+        print(f"   Rebuild them with: python scripts/audio_batch.py --profiles {args.profile} --force")
+
+if __name__ == "__main__":
+    main()
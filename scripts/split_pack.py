@@ -1,5 +1,20 @@
 import os
 import sys
+import json
+import time
+import struct
+import hashlib
+import zipfile
+import argparse
+
+from pack_manifest import sha256_file
+from pack_zip_writer import ZipAssembler
+
+INDEX_FORMAT = 1
+# 本地文件头 30 字节 + 中央目录记录 46 字节 (不含文件名)
+LOCAL_HEADER_SIZE = 30
+CENTRAL_HEADER_SIZE = 46
+END_RECORD_SIZE = 22
 
 def split_file(file_path, num_parts):
     if not os.path.exists(file_path):
@@ -35,16 +50,111 @@ def split_file(file_path, num_parts):
             
     print("Done.")
 
+def read_raw_entry(fp, info):
+    """直接读取条目的压缩数据 (不解压、不重新压缩)"""
+    fp.seek(info.header_offset)
+    header = fp.read(LOCAL_HEADER_SIZE)
+    name_len, extra_len = struct.unpack('<HH', header[26:30])
+    fp.seek(info.header_offset + LOCAL_HEADER_SIZE + name_len + extra_len)
+    return fp.read(info.compress_size)
+
+def part_name(zip_path, index):
+    # voice_6k.zip -> voice_6k.p1.zip (与旧的按字节切分 .part1 区分，每个分片都是完整 zip)
+    base, ext = os.path.splitext(zip_path)
+    return f"{base}.p{index}{ext}"
+
+def split_archive(zip_path, part_size):
+    """
+    按 zip 条目边界切分: 每个分片是可独立解压的 zip，目标大小 part_size 字节
+    (单个条目超过 part_size 时独占一个分片)。条目顺序保持不变，App 可以先解压
+    前面的分片开始播放。写出 <base>.index.json，记录每个条目在分片内的偏移、长度和哈希。
+    返回索引内容。
+    """
+    if not os.path.exists(zip_path):
+        print(f"Error: File '{zip_path}' not found.")
+        return None
+
+    print(f"Splitting '{zip_path}' on entry boundaries (~{part_size} bytes per part)...")
+    start = time.perf_counter()
+
+    with zipfile.ZipFile(zip_path) as zf, open(zip_path, 'rb') as fp:
+        # 先按估算大小分组，再逐个分片写出
+        groups = [[]]
+        current = END_RECORD_SIZE
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            name_len = len(info.filename.encode('utf-8'))
+            cost = LOCAL_HEADER_SIZE + CENTRAL_HEADER_SIZE + 2 * name_len + info.compress_size
+            if groups[-1] and current + cost > part_size:
+                groups.append([])
+                current = END_RECORD_SIZE
+            groups[-1].append(info)
+            current += cost
+
+        parts = []
+        for i, infos in enumerate(groups):
+            path = part_name(zip_path, i + 1)
+            entries = []
+            with ZipAssembler(path) as out:
+                for info in infos:
+                    data = read_raw_entry(fp, info)
+                    offset, length = out.add({
+                        'arcname': info.filename,
+                        'method': info.compress_type,
+                        'crc': info.CRC,
+                        'size': info.file_size,
+                        'data': data,
+                        'mtime': time.mktime(info.date_time + (0, 0, -1)),
+                        'mode': info.external_attr >> 16,
+                    })
+                    entries.append({
+                        'name': info.filename,
+                        'offset': offset,
+                        'length': length,
+                        'data_offset': offset + length - len(data),
+                        'compressed_size': len(data),
+                        'size': info.file_size,
+                        'method': info.compress_type,
+                        'crc32': info.CRC,
+                        # 解压后内容的哈希，App 解压完可直接校验
+                        'sha256': hashlib.sha256(zf.read(info)).hexdigest(),
+                    })
+
+            parts.append({
+                'file': os.path.basename(path),
+                'size': os.path.getsize(path),
+                'sha256': sha256_file(path),
+                'entries': entries,
+            })
+            print(f"  Wrote {os.path.basename(path)} ({parts[-1]['size']} bytes, {len(entries)} entries)")
+
+    index = {
+        'format': INDEX_FORMAT,
+        'source': os.path.basename(zip_path),
+        'part_size': part_size,
+        'parts': parts,
+    }
+    index_path = os.path.splitext(zip_path)[0] + '.index.json'
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+    print(f"Done: {len(parts)} parts, index {os.path.basename(index_path)} "
+          f"({time.perf_counter() - start:.1f}s).")
+    return index
+
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python split_pack.py <file_path> <num_parts>")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Split a pack into parts")
+    parser.add_argument("file_path", help="Pack file to split")
+    parser.add_argument("num_parts", nargs="?", type=int,
+                        help="Legacy mode: cut into N equal byte ranges (.part1, .part2 ...)")
+    parser.add_argument("--part-mb", type=float,
+                        help="Split a zip on entry boundaries into ~N MB standalone zips with an index")
+    args = parser.parse_args()
 
-    file_path = sys.argv[1]
-    try:
-        num_parts = int(sys.argv[2])
-    except ValueError:
-        print("Error: number of parts must be an integer.")
+    if args.part_mb:
+        split_archive(args.file_path, int(args.part_mb * 1024 * 1024))
+    elif args.num_parts:
+        split_file(args.file_path, args.num_parts)
+    else:
+        parser.print_usage()
         sys.exit(1)
-
-    split_file(file_path, num_parts)
@@ -9,53 +9,27 @@
   - 模式: VBR, VOIP, Mono
 """
 
-import subprocess
 from pathlib import Path
 
+from audio_batch import run_jobs
+from audio_build_db import BUILD_DB_PATH, BuildDB
+
 INPUT_FILE = Path("data/bible_assets/audio_full/01_Genesis/01.mp3")
 OUTPUT_DIR = Path("data/audio_test")
 
-# 比特率配置
+# 比特率配置 (参数见 audio_profiles.py 中的 sample_narrow_* 档位)
 BITRATES = ["12k", "8k", "6k"]
 
-# FFmpeg 基础命令
-# -af silenceremove=start_periods=1:start_duration=0.1:start_threshold=-50dB:stop_periods=1:stop_duration=1:stop_threshold=-50dB
-# 解释:
-# start_periods=1: 移除开头的一段静音
-# stop_periods=1: 移除结尾的一段静音 (注意: silenceremove 对结尾静音的处理有时比较微妙，这里尝试通用参数)
-SILENCE_FILTER = "silenceremove=start_periods=1:start_duration=0.1:start_threshold=-50dB:stop_periods=-1:stop_duration=1:stop_threshold=-50dB"
+def sample_build_db(output_dir):
+    """样本的构建记录放在样本目录，不写进正式转码共用的 data/.audio_build.jsonl"""
+    return BuildDB(str(Path(output_dir) / Path(BUILD_DB_PATH).name))
 
-def convert_sample(bitrate):
-    output_file = OUTPUT_DIR / f"Genesis_01_{bitrate}_narrow_dtx.opus"
-    
-    cmd = [
-        "ffmpeg", "-y",
-        "-i", str(INPUT_FILE),
-        "-c:a", "libopus",
-        "-b:a", bitrate,
-        "-vbr", "on",
-        "-compression_level", "10",
-        "-application", "voip",
-        "-ar", "8000",          # Narrowband
-        "-ac", "1",             # Mono
-        "-map_metadata", "-1",  # Strip metadata
-        "-dtx", "1",            # Enable DTX
-        "-af", SILENCE_FILTER,  # Silence removal
-        "-vn",
-        "-loglevel", "warning",
-        str(output_file)
-    ]
-    
-    print(f"⏳ 正在转换 {bitrate} 版本...")
-    try:
-        start_size = INPUT_FILE.stat().st_size
-        subprocess.run(cmd, check=True)
-        end_size = output_file.stat().st_size
-        compression_ratio = (1 - end_size / start_size) * 100
-        print(f"✅ 完成: {output_file.name}")
-        print(f"   体积: {start_size/1024:.1f}KB -> {end_size/1024:.1f}KB (优化率: {compression_ratio:.1f}%)")
-    except subprocess.CalledProcessError as e:
-        print(f"❌ 转换失败: {e}")
+def report_size(output_file):
+    start_size = INPUT_FILE.stat().st_size
+    end_size = output_file.stat().st_size
+    compression_ratio = (1 - end_size / start_size) * 100
+    print(f"✅ 完成: {output_file.name}")
+    print(f"   体积: {start_size/1024:.1f}KB -> {end_size/1024:.1f}KB (优化率: {compression_ratio:.1f}%)")
 
 def main():
     if not INPUT_FILE.exists():
@@ -66,8 +40,12 @@ def main():
     print(f"📂 输出目录: {OUTPUT_DIR}")
     print("-" * 50)
     
-    for br in BITRATES:
-        convert_sample(br)
+    # 一次解码同时生成三个码率
+    outputs = [(f"sample_narrow_{br}", OUTPUT_DIR / f"Genesis_01_{br}_narrow_dtx.opus") for br in BITRATES]
+    run_jobs([(str(INPUT_FILE), [(name, str(path)) for name, path in outputs])], build_db=sample_build_db(OUTPUT_DIR))
+    for _, path in outputs:
+        if path.exists():
+            report_size(path)
         
     print("-" * 50)
     print("🎉 所有测试样本生成完毕")
@@ -0,0 +1,140 @@
+"""
+经文时间戳的紧凑二进制格式 (.eyts)，替代带缩进的 assets/audio_timestamps.json
+App 端解码见 lib/core/services/timestamp_codec.dart。
+
+文件布局 (小端):
+  头部   12 字节  magic 'EYTS', version u16, flags u16, count u32
+  索引   8 字节 * count，按 (book, chapter) 排序
+         book u8, chapter u8, segments u16, offset u32 (相对数据区起点)
+  数据   每章: kind u8，然后是毫秒值的 varint 序列
+         kind 0 (连续，end == 下一节 begin): segments + 1 个边界，首个为绝对值，其余为增量 (无符号)
+         kind 1 (不连续或非递增): 2 * segments 个值 [b0, e0, b1, e1, ...]，相邻差值 zigzag 编码
+时间取整到毫秒。
+"""
+
+import struct
+from collections import namedtuple
+
+MAGIC = b'EYTS'
+VERSION = 1
+HEADER = struct.Struct('<4sHHI')
+RECORD = struct.Struct('<BBHI')
+KIND_CONTIGUOUS = 0
+KIND_PAIRS = 1
+
+ChapterIndex = namedtuple('ChapterIndex', 'book chapter segments offset')
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varint(buf, pos):
+    value = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+def _zigzag(n):
+    return n * 2 if n >= 0 else -n * 2 - 1
+
+def _unzigzag(n):
+    return n >> 1 if not n & 1 else -(n >> 1) - 1
+
+def encode_chapter(segments):
+    """[[begin, end], ...] (秒) -> 一章的数据字节"""
+    ms = [(round(begin * 1000), round(end * 1000)) for begin, end in segments]
+    out = bytearray()
+    if not ms:
+        out.append(KIND_CONTIGUOUS)
+        return bytes(out)
+    boundaries = [ms[0][0]] + [end for _, end in ms]
+    contiguous = all(ms[i][1] == ms[i + 1][0] for i in range(len(ms) - 1))
+    monotonic = all(a <= b for a, b in zip(boundaries, boundaries[1:]))
+    if contiguous and monotonic and boundaries[0] >= 0:
+        out.append(KIND_CONTIGUOUS)
+        _write_varint(out, boundaries[0])
+        for prev, cur in zip(boundaries, boundaries[1:]):
+            _write_varint(out, cur - prev)
+    else:
+        out.append(KIND_PAIRS)
+        prev = 0
+        for value in (v for pair in ms for v in pair):
+            _write_varint(out, _zigzag(value - prev))
+            prev = value
+    return bytes(out)
+
+def decode_chapter(buf, offset, segments):
+    """从 buf[offset:] 解出 segments 节，返回 [[begin, end], ...] (秒)"""
+    kind, pos = buf[offset], offset + 1
+    if segments == 0:
+        return []
+    if kind == KIND_CONTIGUOUS:
+        value, pos = _read_varint(buf, pos)
+        boundaries = [value]
+        for _ in range(segments):
+            delta, pos = _read_varint(buf, pos)
+            value += delta
+            boundaries.append(value)
+        return [[boundaries[i] / 1000, boundaries[i + 1] / 1000] for i in range(segments)]
+    if kind == KIND_PAIRS:
+        values, value = [], 0
+        for _ in range(segments * 2):
+            delta, pos = _read_varint(buf, pos)
+            value += _unzigzag(delta)
+            values.append(value / 1000)
+        return [[values[i], values[i + 1]] for i in range(0, len(values), 2)]
+    raise ValueError(f"Unknown chapter encoding {kind}")
+
+def encode(timestamps):
+    """{"book": {"chapter": [[begin, end], ...]}} (audio_timestamps.json 结构) -> bytes"""
+    chapters = sorted((int(book), int(chapter), segments)
+                      for book, book_data in timestamps.items()
+                      for chapter, segments in book_data.items())
+    index, data = bytearray(), bytearray()
+    for book, chapter, segments in chapters:
+        index += RECORD.pack(book, chapter, len(segments), len(data))
+        data += encode_chapter(segments)
+    return HEADER.pack(MAGIC, VERSION, 0, len(chapters)) + bytes(index) + bytes(data)
+
+class TimestampFile:
+    """只解析索引，章节按需解码"""
+
+    def __init__(self, data):
+        magic, version, _flags, count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a timestamp file")
+        if version != VERSION:
+            raise ValueError(f"Unsupported timestamp file version {version}")
+        self.data = data
+        self.data_offset = HEADER.size + RECORD.size * count
+        self.index = {}
+        for record in RECORD.iter_unpack(data[HEADER.size:self.data_offset]):
+            entry = ChapterIndex(*record)
+            self.index[(entry.book, entry.chapter)] = entry
+
+    @classmethod
+    def open(cls, path):
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+    def chapter(self, book, chapter):
+        entry = self.index.get((book, chapter))
+        if entry is None:
+            return []
+        return decode_chapter(self.data, self.data_offset + entry.offset, entry.segments)
+
+    def to_dict(self):
+        """还原成 audio_timestamps.json 的结构 (字符串键)"""
+        result = {}
+        for book, chapter in sorted(self.index):
+            result.setdefault(str(book), {})[str(chapter)] = self.chapter(book, chapter)
+        return result
+
+def decode(data):
+    return TimestampFile(data).to_dict()
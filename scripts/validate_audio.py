@@ -0,0 +1,235 @@
+"""
+转码输出校验: 逐章检查 Opus 输出能否正常解码、时长是否与源 MP3 及 audio_timestamps.json 对得上
+- Ogg 结构检查 (纯 Python): OggS 页连续、最后一页带 EOS 标志 -> 发现被截断的文件; granule 得出时长
+- ffprobe 读取源 MP3 时长 (每个源文件只探测一次，多个档位共用); --decode 时再用 ffmpeg 完整解码一遍
+- 带 silenceremove 的档位 (6k) 时长本来就会变短，此时不报时长不符; 时间戳优先用
+  remap_timestamps.py 换算后的 audio_timestamps_6k.json，末尾超出音频长度会报 timestamps_overrun
+- 线程池并行 (默认 CPU 核数，工作都在 ffprobe / ffmpeg 子进程里)，结果写入 JSON 报告
+
+用法:
+  python scripts/validate_audio.py                          # 校验 6k、8k
+  python scripts/validate_audio.py --profiles 6k --decode --report validate_6k.json
+"""
+
+import argparse
+import json
+import os
+import re
+import struct
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from audio_batch import SOURCE_DIR, scan_tree
+from audio_container import opus_duration_ms
+from audio_profiles import PROFILES, get_profile
+
+DEFAULT_PROFILES = ('6k', '8k')
+TIMESTAMPS_PATH = "assets/audio_timestamps.json"
+REPORT_PATH = "audio_validation.json"
+# Opus 编码前后补零 / 帧对齐造成的正常误差 (秒)
+DURATION_TOLERANCE = 0.25
+# 目录名 "01_创世记"
+BOOK_DIR_PATTERN = re.compile(r'^(\d+)_')
+OGG_PAGE_HEADER = struct.Struct('<4sBBqIIIB')
+
+def check_ogg(data):
+    """检查 Ogg 页结构，返回问题列表 (空列表表示结构完整)"""
+    if data.find(b'OpusHead', 0, 512) < 0:
+        return ['not_opus']
+    pos, last_flags = 0, None
+    while pos < len(data):
+        if pos + OGG_PAGE_HEADER.size > len(data):
+            return ['truncated']
+        capture, _version, flags, _granule, _serial, _seq, _crc, segments = OGG_PAGE_HEADER.unpack_from(data, pos)
+        if capture != b'OggS':
+            return ['corrupt_page']
+        body = pos + OGG_PAGE_HEADER.size + segments
+        if body > len(data):
+            return ['truncated']
+        pos = body + sum(data[pos + OGG_PAGE_HEADER.size:body])
+        last_flags = flags
+    if pos > len(data):
+        return ['truncated']
+    if not last_flags & 0x04:
+        # 正常结束的流最后一页带 end-of-stream 标志，被杀掉的 ffmpeg 写不到这一页
+        return ['missing_eos']
+    return []
+
+def ffprobe_duration(path):
+    """返回 (时长秒数或 None, 错误信息或 None)"""
+    cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "json", path]
+    try:
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    except OSError as e:
+        return None, str(e)
+    if proc.returncode != 0:
+        return None, proc.stderr.strip() or f"ffprobe exited with {proc.returncode}"
+    try:
+        return float(json.loads(proc.stdout)['format']['duration']), None
+    except (ValueError, KeyError):
+        return None, "no duration in ffprobe output"
+
+def decode_errors(path):
+    """完整解码一遍，返回 ffmpeg 报告的错误 (无错误返回 None)"""
+    cmd = ["ffmpeg", "-v", "error", "-nostdin", "-i", path, "-f", "null", "-"]
+    try:
+        proc = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    except OSError as e:
+        return str(e)
+    if proc.returncode != 0 or proc.stderr.strip():
+        return proc.stderr.strip() or f"ffmpeg exited with {proc.returncode}"
+    return None
+
+def chapter_key(output):
+    """<output_dir>/01_创世记/3.opus -> ('1', '3')，与 audio_timestamps.json 的键一致"""
+    book_dir = os.path.basename(os.path.dirname(output))
+    m = BOOK_DIR_PATTERN.match(book_dir)
+    stem = os.path.splitext(os.path.basename(output))[0]
+    if not m or not stem.isdigit():
+        return None
+    return str(int(m.group(1))), stem
+
+def tier_timestamps_path(timestamps_path, profile_name):
+    """删静音档位的换算后时间戳 (remap_timestamps.py 生成): assets/audio_timestamps_6k.json"""
+    stem, ext = os.path.splitext(timestamps_path)
+    return f"{stem}_{profile_name}{ext}"
+
+def load_timestamp_ends(path=TIMESTAMPS_PATH):
+    """{(book, chapter): 最后一节的结束时间}"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return {(book, chapter): max(end for _, end in segments)
+            for book, chapters in data.items()
+            for chapter, segments in chapters.items() if segments}
+
+def trims_silence(profile_name):
+    return any(f.startswith('silenceremove') for f in get_profile(profile_name)['filters'])
+
+def validate_output(name, path, source_duration, timestamp_end, decode=False):
+    entry = {'output': path, 'profile': name, 'issues': [], 'duration': None,
+             'source_duration': source_duration, 'timestamp_end': timestamp_end}
+    if not os.path.exists(path):
+        entry['issues'].append('missing')
+        return entry
+    with open(path, 'rb') as f:
+        data = f.read()
+    entry['size'] = len(data)
+    entry['issues'] += check_ogg(data)
+    if entry['issues']:
+        return entry
+    entry['duration'] = duration = opus_duration_ms(data) / 1000
+    if duration <= 0:
+        entry['issues'].append('empty')
+        return entry
+    if decode:
+        error = decode_errors(path)
+        if error:
+            entry['issues'].append('decode_error')
+            entry['error'] = error
+    if source_duration is not None:
+        if trims_silence(name):
+            if duration > source_duration + DURATION_TOLERANCE:
+                entry['issues'].append('longer_than_source')
+        elif abs(duration - source_duration) > DURATION_TOLERANCE:
+            entry['issues'].append('duration_mismatch')
+    if timestamp_end is not None and timestamp_end > duration + DURATION_TOLERANCE:
+        entry['issues'].append('timestamps_overrun')
+    return entry
+
+def validate_source(source, outputs, timestamp_ends, decode=False):
+    """一个源文件及其各档位输出; 源时长只探测一次"""
+    start = time.perf_counter()
+    source_duration, source_error = ffprobe_duration(source) if os.path.exists(source) else (None, 'missing')
+    entries = []
+    for name, path in outputs:
+        entry = validate_output(name, path, source_duration, timestamp_ends[name].get(chapter_key(path)), decode)
+        entry['source'] = source
+        if source_error:
+            entry['source_error'] = source_error
+        entries.append(entry)
+    return entries, time.perf_counter() - start
+
+def validate(jobs, timestamp_ends, max_workers=None, decode=False):
+    """并行校验，返回 (按输出路径排序的条目, 耗时秒数)"""
+    max_workers = max_workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    entries = []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(validate_source, source, outputs, timestamp_ends, decode)
+                   for source, outputs in jobs]
+        for i, future in enumerate(as_completed(futures), 1):
+            entries += future.result()[0]
+            if i % 200 == 0:
+                print(f"⏳ {i}/{len(futures)}")
+    return sorted(entries, key=lambda e: e['output']), time.perf_counter() - start
+
+def summarize(entries):
+    summary = {'files': len(entries), 'ok': 0, 'issues': {}}
+    for entry in entries:
+        if not entry['issues']:
+            summary['ok'] += 1
+        for issue in entry['issues']:
+            summary['issues'][issue] = summary['issues'].get(issue, 0) + 1
+    return summary
+
+# 只是提示、不算失败的问题
+WARNINGS = {'timestamps_overrun'}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate transcoded Opus chapters against sources and timestamps")
+    parser.add_argument("--source", default=SOURCE_DIR, help="Source tree of MP3 chapters")
+    parser.add_argument("--profiles", default=','.join(DEFAULT_PROFILES),
+                        help=f"Comma-separated profiles (available: {', '.join(PROFILES)})")
+    parser.add_argument("--output", action="append", default=[], metavar="PROFILE=DIR",
+                        help="Override a profile's output directory (repeatable)")
+    parser.add_argument("--timestamps", default=TIMESTAMPS_PATH, help="Verse timestamps JSON")
+    parser.add_argument("--decode", action="store_true", help="Fully decode every output with ffmpeg")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Parallel probes")
+    parser.add_argument("--report", default=REPORT_PATH, help="JSON report path")
+    args = parser.parse_args(argv)
+
+    overrides = dict(value.partition('=')[::2] for value in args.output)
+    try:
+        targets = [(name, overrides.get(name) or get_profile(name)['output_dir'])
+                   for name in (n.strip() for n in args.profiles.split(',')) if name]
+    except ValueError as e:
+        parser.error(str(e))
+    if not os.path.isdir(args.source):
+        print(f"❌ Source directory not found: {args.source}")
+        return 1
+
+    jobs = scan_tree(args.source, targets)
+    # 删静音的档位优先用换算过的时间戳
+    base_ends = load_timestamp_ends(args.timestamps)
+    timestamp_ends = {}
+    for name, _ in targets:
+        tier_path = tier_timestamps_path(args.timestamps, name)
+        use_tier = trims_silence(name) and os.path.exists(tier_path)
+        timestamp_ends[name] = load_timestamp_ends(tier_path) if use_tier else base_ends
+    print(f"🔍 Validating {len(jobs) * len(targets)} outputs ({', '.join(n for n, _ in targets)}, "
+          f"{args.jobs} workers{', full decode' if args.decode else ''})")
+    entries, seconds = validate(jobs, timestamp_ends, args.jobs, args.decode)
+
+    summary = summarize(entries)
+    summary['seconds'] = round(seconds, 2)
+    summary['files_per_second'] = round(len(entries) / seconds, 1) if seconds else None
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump({'profiles': [n for n, _ in targets], 'summary': summary,
+                   'files': entries}, f, ensure_ascii=False, indent=2)
+
+    print(f"\n✅ OK: {summary['ok']}/{summary['files']} ({summary['files_per_second']} files/s)")
+    for issue, count in sorted(summary['issues'].items()):
+        print(f"{'⚠️' if issue in WARNINGS else '❌'} {issue}: {count}")
+    unprobed = {e['source'] for e in entries if 'source_error' in e}
+    if unprobed:
+        print(f"⚠️ {len(unprobed)} sources could not be probed, source durations not compared")
+    print(f"📝 Report written: {args.report}")
+    failed = any(set(e['issues']) - WARNINGS for e in entries)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
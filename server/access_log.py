@@ -0,0 +1,49 @@
+"""
+结构化 JSON 访问日志
+- 请求线程只把日志记录放进内存队列 (QueueHandler)，由 QueueListener 后台线程负责格式化和写出，
+  stdout 被管道阻塞或磁盘变慢时也不会拖住下载
+- 每行一个 JSON 对象，方便 jq / 日志收集器处理
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+LOGGER_NAME = 'pack_server.access'
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname.lower(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        else:
+            entry['message'] = record.getMessage()
+        return json.dumps(entry, ensure_ascii=False, separators=(',', ':'))
+
+def setup_access_log(path=None):
+    """
+    配置访问日志: path 为 None 时写 stdout，否则追加到文件。
+    返回 (logger, listener)，退出前调用 listener.stop() 把队列中剩余日志写完。
+    """
+    if path:
+        handler = logging.FileHandler(path, encoding='utf-8')
+    else:
+        handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=False)
+    listener.start()
+
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    return logger, listener
@@ -0,0 +1,211 @@
+"""
+按章节提供音频: /audio/{quality}/{book}/{chapter}
+- 优先从打包好的容器 (packs/voice_{quality}.eyac) 按索引 pread，没有容器时回退到 data/opus_{quality} 目录
+- 热门章节 (诗篇、约翰福音) 放在按字节数限制大小的内存 LRU 中
+- 命中 / 未命中 / 淘汰计数供 /api/audio-cache 查看，用于估算主日早上的缓存大小
+- 每个缓存项记录来源文件的 (mtime, size)，命中时 stat 一次; 文件被重新转码 / 打包后自动重新读取
+"""
+
+import hashlib
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+
+_SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts')
+if _SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, _SCRIPTS_DIR)
+from audio_container import AudioContainer
+
+AUDIO_CACHE_BYTES = 64 * 1024 * 1024
+# 单个章节超过此大小不进缓存，避免一个长章节挤掉大量热门短章节
+MAX_ITEM_BYTES = 4 * 1024 * 1024
+QUALITIES = ('6k', '8k')
+CONTAINER_NAME = 'voice_{quality}.eyac'
+TREE_NAME = 'opus_{quality}'
+_BOOK_DIR = re.compile(r'^(\d+)_')
+
+def file_stamp(path):
+    """(mtime_ns, size)，文件不存在时为 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+class ChapterAudio:
+    __slots__ = ('data', 'etag', 'source', 'path', 'stamp')
+
+    def __init__(self, data, etag, source, path, stamp):
+        self.data = data
+        self.etag = etag
+        self.source = source
+        # 来源文件 (容器或章节 .opus) 及读取时的 (mtime_ns, size)
+        self.path = path
+        self.stamp = stamp
+
+    def fresh(self):
+        return file_stamp(self.path) == self.stamp
+
+class LRUCache:
+    """按字节数限制容量的线程安全 LRU"""
+
+    def __init__(self, max_bytes=AUDIO_CACHE_BYTES, max_item_bytes=MAX_ITEM_BYTES):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = min(max_item_bytes, max_bytes)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, fresh=None):
+        """fresh: 可选的校验函数 (在锁外调用)，返回 False 时丢弃该项并按未命中计"""
+        with self._lock:
+            item = self._items.get(key)
+        if item is not None and fresh is not None and not fresh(item):
+            self.discard(key, item)
+            item = None
+        with self._lock:
+            if item is None:
+                self.misses += 1
+                return None
+            if key in self._items:
+                self._items.move_to_end(key)
+            self.hits += 1
+            return item
+
+    def discard(self, key, item):
+        """移除 key，仅当它仍是 item (期间可能已被其他线程替换)"""
+        with self._lock:
+            if self._items.get(key) is item:
+                del self._items[key]
+                self.bytes -= len(item.data)
+
+    def put(self, key, item):
+        size = len(item.data)
+        if size > self.max_item_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old.data)
+            self._items[key] = item
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.bytes -= len(evicted.data)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._items),
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+class ChapterStore:
+    def __init__(self, packs_dir, audio_root, cache_bytes=AUDIO_CACHE_BYTES):
+        self.packs_dir = packs_dir
+        self.audio_root = audio_root
+        self.cache = LRUCache(cache_bytes)
+        self._containers = {}
+        self._book_dirs = {}
+        self._lock = threading.Lock()
+
+    def get(self, quality, book, chapter):
+        """返回 ChapterAudio，找不到时返回 None"""
+        if quality not in QUALITIES:
+            return None
+        key = (quality, book, chapter)
+        item = self.cache.get(key, fresh=ChapterAudio.fresh)
+        if item is not None:
+            return item
+
+        item = self._load_from_container(quality, book, chapter) or self._load_from_tree(quality, book, chapter)
+        if item is not None:
+            self.cache.put(key, item)
+        return item
+
+    def _container(self, quality):
+        """打开 (或在容器文件被重建后重新打开) 对应音质的容器"""
+        path = os.path.join(self.packs_dir, CONTAINER_NAME.format(quality=quality))
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            current = self._containers.get(quality)
+            if current and current[0] == stamp:
+                return current
+            try:
+                container = AudioContainer(path)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Cannot open audio container {path}: {e}")
+                return None
+            if current:
+                current[1].close()
+                # 容器已重建，旧缓存内容可能过期
+                self.cache.clear()
+            self._containers[quality] = (stamp, container)
+            return self._containers[quality]
+
+    def _load_from_container(self, quality, book, chapter):
+        opened = self._container(quality)
+        if opened is None:
+            return None
+        stamp, container = opened
+        entry = container.entry(book, chapter)
+        if entry is None:
+            return None
+        data = container.read(book, chapter)
+        return ChapterAudio(data, f'"{entry.digest.hex()}"', 'container', container.path, stamp)
+
+    def _book_dir(self, quality, book):
+        key = (quality, book)
+        if key not in self._book_dirs:
+            tree = os.path.join(self.audio_root, TREE_NAME.format(quality=quality))
+            found = None
+            if os.path.isdir(tree):
+                for name in os.listdir(tree):
+                    m = _BOOK_DIR.match(name)
+                    if m and int(m.group(1)) == book:
+                        found = os.path.join(tree, name)
+                        break
+            if found is None:
+                # 目录不存在时不缓存，构建完成后无需重启
+                return None
+            self._book_dirs[key] = found
+        return self._book_dirs[key]
+
+    def _load_from_tree(self, quality, book, chapter):
+        book_dir = self._book_dir(quality, book)
+        if book_dir is None:
+            return None
+        path = os.path.join(book_dir, f"{chapter}.opus")
+        try:
+            with open(path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                data = f.read()
+        except OSError:
+            return None
+        return ChapterAudio(data, f'"{hashlib.sha256(data).hexdigest()[:16]}"', 'tree', path, (st.st_mtime_ns, st.st_size))
+
+    def stats(self):
+        stats = self.cache.stats()
+        stats['containers'] = sorted(self._containers)
+        return stats
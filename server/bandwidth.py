@@ -0,0 +1,117 @@
+"""
+上行带宽整形与公平排队
+- 全局令牌桶: 所有下载合计不超过 rate 字节/秒 (burst 为桶容量)
+- 两个优先级: 小请求 (清单、单章音频等，响应不超过 small_bytes) 总是先于大包传输拿到令牌
+- 同一优先级内按客户端 IP 轮转分配，一台手机开多个连接也只拿到一份带宽
+- 发送线程在每个数据块之前调用 acquire()，令牌不足时阻塞等待
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+
+PRIORITY_SMALL = 0
+PRIORITY_BULK = 1
+PRIORITY_NAMES = ('small', 'bulk')
+# 整形开启时每次申请的块大小，越小调度越公平但系统调用越多
+CHUNK_SIZE = 64 * 1024
+SMALL_RESPONSE_BYTES = 256 * 1024
+
+class _Waiter:
+    __slots__ = ('client', 'nbytes', 'granted', 'since')
+
+    def __init__(self, client, nbytes):
+        self.client = client
+        self.nbytes = nbytes
+        self.granted = False
+        self.since = time.monotonic()
+
+class BandwidthScheduler:
+    def __init__(self, rate=0, burst=None, small_bytes=SMALL_RESPONSE_BYTES, chunk_size=CHUNK_SIZE):
+        """rate 为字节/秒，0 表示不限速 (acquire 直接返回)"""
+        self.rate = rate
+        self.chunk_size = chunk_size
+        self.burst = max(burst or rate // 4, chunk_size)
+        self.small_bytes = small_bytes
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        # 每个优先级: {client: deque[_Waiter]}，OrderedDict 的顺序即轮转顺序
+        self._queues = [OrderedDict() for _ in PRIORITY_NAMES]
+        self._cond = threading.Condition()
+        self.granted_bytes = [0] * len(PRIORITY_NAMES)
+        self.wait_seconds = [0.0] * len(PRIORITY_NAMES)
+        self.max_wait = [0.0] * len(PRIORITY_NAMES)
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+    def priority_for(self, length):
+        return PRIORITY_SMALL if length <= self.small_bytes else PRIORITY_BULK
+
+    def acquire(self, client, nbytes, priority=PRIORITY_BULK):
+        """阻塞直到可以发送 nbytes (调用方保证 nbytes <= chunk_size 或接受一次性超额)"""
+        if not self.enabled or nbytes <= 0:
+            return
+        waiter = _Waiter(client, min(nbytes, self.burst))
+        with self._cond:
+            self._queues[priority].setdefault(client, deque()).append(waiter)
+            while True:
+                delay = self._dispatch()
+                if waiter.granted:
+                    break
+                self._cond.wait(delay)
+            waited = time.monotonic() - waiter.since
+            self.granted_bytes[priority] += nbytes
+            self.wait_seconds[priority] += waited
+            self.max_wait[priority] = max(self.max_wait[priority], waited)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _dispatch(self):
+        """在锁内按优先级 + 客户端轮转发放令牌; 返回下次值得重试的等待时间"""
+        self._refill()
+        granted_any = False
+        while True:
+            queue = next((q for q in self._queues if q), None)
+            if queue is None:
+                break
+            client, waiters = next(iter(queue.items()))
+            waiter = waiters[0]
+            if self._tokens < waiter.nbytes:
+                if granted_any:
+                    self._cond.notify_all()
+                return (waiter.nbytes - self._tokens) / self.rate
+            self._tokens -= waiter.nbytes
+            waiter.granted = True
+            granted_any = True
+            waiters.popleft()
+            # 该客户端排到队尾，下一块轮到其他客户端
+            del queue[client]
+            if waiters:
+                queue[client] = waiters
+        if granted_any:
+            self._cond.notify_all()
+        return None
+
+    def stats(self):
+        with self._cond:
+            self._refill()
+            queues = {}
+            for name, queue in zip(PRIORITY_NAMES, self._queues):
+                queues[name] = {client: len(waiters) for client, waiters in queue.items()}
+            return {
+                'enabled': self.enabled,
+                'rate_bytes_per_s': self.rate,
+                'burst_bytes': self.burst,
+                'small_response_bytes': self.small_bytes,
+                'tokens': int(self._tokens),
+                'waiting': {name: sum(q.values()) for name, q in queues.items()},
+                'waiting_by_client': queues,
+                'granted_bytes': dict(zip(PRIORITY_NAMES, self.granted_bytes)),
+                'wait_seconds': {n: round(v, 3) for n, v in zip(PRIORITY_NAMES, self.wait_seconds)},
+                'max_wait_seconds': {n: round(v, 3) for n, v in zip(PRIORITY_NAMES, self.max_wait)},
+            }
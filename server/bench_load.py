@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+pack_server 负载测试: 用 asyncio 模拟 N 台手机同时访问
+直接运行: python server/bench_load.py [--phones 50] [--duration 30] [--output result.json]
+
+- 默认在临时目录生成测试包 / 清单 / 章节音频，并以子进程启动 pack_server.py (不需要网络)
+- 也可用 --url http://host:port 压测已在运行的服务器 (注意其每 IP 连接上限)
+- 每台手机按权重随机执行: 清单轮询 (带 If-None-Match)、完整包下载、断点续传 Range 下载、单章音频
+- 结果输出 JSON: 各操作的次数、错误率、吞吐、延迟与首字节时间的 p50 / p95 / p99，便于前后两次对比
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+from bench_sendfile import SERVER_SCRIPT, free_port, wait_for_port
+
+PACK_ID = 'voice_6k'
+PACK_FILE = 'voice_6k.zip'
+BOOKS = 66
+CHAPTERS_PER_BOOK = 5
+CHAPTER_SIZE = 48 * 1024
+# 主日早上大家打开同一段经文: 这部分章节请求落在少数热门章节上
+HOT_CHAPTERS = [(19, 1), (19, 2), (43, 1), (43, 3), (1, 1)]
+HOT_RATIO = 0.6
+READ_BUFFER_SIZE = 256 * 1024
+# 操作: 权重
+DEFAULT_MIX = {'manifest': 50, 'full': 5, 'resume': 15, 'chapter': 30}
+
+class HTTPError(Exception):
+    pass
+
+def make_fixture(root, pack_mb):
+    """生成测试用包目录、清单和 opus 目录，返回 (packs_dir, manifest_path, audio_root)"""
+    packs_dir = os.path.join(root, 'packs')
+    audio_root = os.path.join(root, 'data')
+    os.makedirs(packs_dir)
+    block = os.urandom(1024 * 1024)
+    with open(os.path.join(packs_dir, PACK_FILE), 'wb') as f:
+        for _ in range(pack_mb):
+            f.write(block)
+
+    manifest_path = os.path.join(root, 'packs.json')
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump({'format': 2, 'packs': [{
+            'id': PACK_ID, 'name': 'Bench voice pack', 'description': 'load test',
+            'version': 'bench', 'url': '../' + PACK_FILE, 'size': pack_mb * 1024 * 1024,
+        }]}, f)
+
+    for book in range(1, BOOKS + 1):
+        book_dir = os.path.join(audio_root, 'opus_6k', f'{book:02d}_book{book}')
+        os.makedirs(book_dir)
+        for chapter in range(1, CHAPTERS_PER_BOOK + 1):
+            with open(os.path.join(book_dir, f'{chapter}.opus'), 'wb') as f:
+                f.write(block[:CHAPTER_SIZE])
+    return packs_dir, manifest_path, audio_root
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+class Phone:
+    """一台手机: 一条 keep-alive 连接，断开后自动重连"""
+
+    def __init__(self, host, port, pack_size, rng, stats):
+        self.host = host
+        self.port = port
+        self.pack_size = pack_size
+        self.rng = rng
+        self.stats = stats
+        self.manifest_etag = None
+        self.reader = None
+        self.writer = None
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+            self.reader = self.writer = None
+
+    async def request(self, path, headers=None):
+        """发送 GET 并读完响应体，返回 (status, headers, body_bytes, ttfb)"""
+        if self.writer is None:
+            await self.connect()
+        start = time.perf_counter()
+        lines = [f'GET {path} HTTP/1.1', f'Host: {self.host}:{self.port}', 'User-Agent: bench_load']
+        lines += [f'{k}: {v}' for k, v in (headers or {}).items()]
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('ascii'))
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise HTTPError('connection closed')
+        ttfb = time.perf_counter() - start
+        status = int(status_line.split()[1])
+        resp_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            resp_headers[name.strip().lower()] = value.strip()
+
+        remaining = int(resp_headers.get('content-length', 0))
+        received = 0
+        while remaining > 0:
+            chunk = await self.reader.read(min(READ_BUFFER_SIZE, remaining))
+            if not chunk:
+                raise HTTPError('truncated body')
+            received += len(chunk)
+            remaining -= len(chunk)
+        if resp_headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, resp_headers, received, ttfb
+
+    async def manifest(self):
+        headers = {'Accept-Encoding': 'gzip'}
+        if self.manifest_etag:
+            headers['If-None-Match'] = self.manifest_etag
+        status, resp_headers, received, ttfb = await self.request('/api/packs', headers)
+        if status in (200, 304):
+            self.manifest_etag = resp_headers.get('etag', self.manifest_etag)
+        return status in (200, 304), status, received, ttfb
+
+    async def full(self):
+        status, _, received, ttfb = await self.request('/' + PACK_FILE)
+        return status == 200 and received == self.pack_size, status, received, ttfb
+
+    async def resume(self):
+        offset = self.rng.randrange(self.pack_size)
+        status, _, received, ttfb = await self.request('/' + PACK_FILE, {'Range': f'bytes={offset}-'})
+        return status == 206 and received == self.pack_size - offset, status, received, ttfb
+
+    async def chapter(self):
+        if self.rng.random() < HOT_RATIO:
+            book, chapter = self.rng.choice(HOT_CHAPTERS)
+        else:
+            book, chapter = self.rng.randint(1, BOOKS), self.rng.randint(1, CHAPTERS_PER_BOOK)
+        status, _, received, ttfb = await self.request(f'/audio/6k/{book}/{chapter}')
+        return status == 200, status, received, ttfb
+
+    async def run(self, mix, deadline, think_s):
+        ops = list(mix)
+        weights = [mix[op] for op in ops]
+        while time.perf_counter() < deadline:
+            op = self.rng.choices(ops, weights)[0]
+            start = time.perf_counter()
+            try:
+                ok, status, received, ttfb = await getattr(self, op)()
+            except (OSError, HTTPError, ValueError, IndexError, asyncio.IncompleteReadError) as e:
+                ok, status, received, ttfb = False, type(e).__name__, 0, None
+                await self.close()
+            self.stats.record(op, ok, status, received, time.perf_counter() - start, ttfb)
+            if think_s:
+                await asyncio.sleep(self.rng.expovariate(1 / think_s))
+        await self.close()
+
+class Stats:
+    def __init__(self, ops):
+        self.ops = {op: {'latency': [], 'ttfb': [], 'bytes': 0, 'errors': 0, 'status': {}} for op in ops}
+
+    def record(self, op, ok, status, received, latency, ttfb):
+        s = self.ops[op]
+        s['latency'].append(latency)
+        if ttfb is not None:
+            s['ttfb'].append(ttfb)
+        s['bytes'] += received
+        s['status'][str(status)] = s['status'].get(str(status), 0) + 1
+        if not ok:
+            s['errors'] += 1
+
+    def summary(self, elapsed):
+        def ms(values):
+            values = sorted(values)
+            return {f'p{p}': round(percentile(values, p) * 1000, 2) if values else None for p in (50, 95, 99)}
+
+        result = {}
+        total_requests = total_errors = total_bytes = 0
+        for op, s in self.ops.items():
+            count = len(s['latency'])
+            total_requests += count
+            total_errors += s['errors']
+            total_bytes += s['bytes']
+            result[op] = {
+                'requests': count,
+                'errors': s['errors'],
+                'error_rate': round(s['errors'] / count, 4) if count else 0.0,
+                'requests_per_s': round(count / elapsed, 2),
+                'mb_per_s': round(s['bytes'] / 1024 ** 2 / elapsed, 2),
+                'latency_ms': ms(s['latency']),
+                'ttfb_ms': ms(s['ttfb']),
+                'status': s['status'],
+            }
+        result['total'] = {
+            'requests': total_requests,
+            'errors': total_errors,
+            'error_rate': round(total_errors / total_requests, 4) if total_requests else 0.0,
+            'requests_per_s': round(total_requests / elapsed, 2),
+            'mb_per_s': round(total_bytes / 1024 ** 2 / elapsed, 2),
+        }
+        return result
+
+async def run_load(host, port, pack_size, phones, duration, mix, think_s, seed):
+    stats = Stats(mix)
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        Phone(host, port, pack_size, random.Random(seed * 100003 + i), stats).run(mix, deadline, think_s)
+        for i in range(phones)
+    ))
+    return stats.summary(time.perf_counter() - start)
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        op, _, weight = item.partition('=')
+        if op not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown operation {op!r} (choose from {', '.join(DEFAULT_MIX)})")
+        mix[op] = float(weight)
+    return {op: w for op, w in mix.items() if w > 0}
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate many phones hitting pack_server")
+    parser.add_argument("--phones", type=int, default=50, help="Concurrent simulated clients")
+    parser.add_argument("--duration", type=float, default=30, help="Test duration in seconds")
+    parser.add_argument("--think-ms", type=float, default=200, help="Mean pause between a phone's requests")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="Operation weights, e.g. manifest=50,full=5,resume=15,chapter=30")
+    parser.add_argument("--pack-mb", type=int, default=32, help="Size of the generated test pack")
+    parser.add_argument("--url", help="Benchmark an already running server instead of spawning one")
+    parser.add_argument("--pack-size", type=int, help=f"Size of /{PACK_FILE} on --url (bytes)")
+    parser.add_argument("--server-arg", action="append", default=[],
+                        help="Extra argument for the spawned pack_server.py (repeatable)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the request mix")
+    parser.add_argument("--output", help="Write the JSON result to this file as well")
+    args = parser.parse_args()
+
+    root = proc = None
+    try:
+        if args.url:
+            parts = urlsplit(args.url)
+            host, port = parts.hostname, parts.port or 80
+            if not args.pack_size:
+                parser.error("--pack-size is required with --url")
+            pack_size = args.pack_size
+        else:
+            root = tempfile.mkdtemp(prefix='pack_load_')
+            packs_dir, manifest_path, audio_root = make_fixture(root, args.pack_mb)
+            pack_size = args.pack_mb * 1024 * 1024
+            host, port = '127.0.0.1', free_port()
+            # 所有模拟手机都来自 127.0.0.1，关闭每 IP 连接上限
+            cmd = [sys.executable, SERVER_SCRIPT, '--port', str(port), '--packs-dir', packs_dir,
+                   '--manifest', manifest_path, '--audio-root', audio_root,
+                   '--max-conn-per-ip', '0', '--access-log', os.devnull] + args.server_arg
+            proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            if not wait_for_port(port):
+                raise RuntimeError("pack_server did not start")
+
+        print(f"🚀 {args.phones} phones for {args.duration:.0f}s against {host}:{port} ...", file=sys.stderr)
+        summary = asyncio.run(run_load(host, port, pack_size, args.phones, args.duration,
+                                       args.mix, args.think_ms / 1000, args.seed))
+    finally:
+        if proc is not None:
+            proc.send_signal(signal.SIGINT)
+            proc.wait()
+        if root is not None:
+            shutil.rmtree(root, ignore_errors=True)
+
+    result = {
+        'config': {
+            'phones': args.phones, 'duration_s': args.duration, 'think_ms': args.think_ms,
+            'mix': args.mix, 'pack_bytes': pack_size, 'seed': args.seed,
+            'target': args.url or 'spawned', 'server_args': args.server_arg,
+        },
+        'results': summary,
+    }
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+pack_server sendfile 基准测试
+对比零拷贝 (os.sendfile) 与缓冲读写两种模式下的吞吐量和服务端 CPU 消耗
+
+直接运行: python server/bench_sendfile.py [--size-mb 256] [--requests 8] [--concurrency 4]
+
+- 在临时目录生成测试包，分别以 --no-sendfile / 默认模式启动 pack_server.py 子进程
+- 本地并发下载 (完整文件 + 一半的请求带 Range)，只统计服务端子进程的 CPU (os.wait4)
+- 输出 MB/s 与每 GB CPU 秒数
+"""
+
+import argparse
+import http.client
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SERVER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pack_server.py')
+BENCH_FILE = 'bench.bin'
+READ_BUFFER_SIZE = 1024 * 1024
+
+def free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def make_bench_file(path, size_mb):
+    print(f"📦 Generating {size_mb} MB test pack ...")
+    block = os.urandom(1024 * 1024)
+    with open(path, 'wb') as f:
+        for _ in range(size_mb):
+            f.write(block)
+
+def wait_for_port(port, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+def download(port, size, ranged):
+    """下载一次，ranged 时只取后半段 (模拟续传)，返回收到的字节数"""
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    headers = {'Range': f'bytes={size // 2}-'} if ranged else {}
+    conn.request('GET', f'/{BENCH_FILE}', headers=headers)
+    resp = conn.getresponse()
+    buf = bytearray(READ_BUFFER_SIZE)
+    view = memoryview(buf)
+    received = 0
+    while True:
+        n = resp.readinto(view)
+        if not n:
+            break
+        received += n
+    conn.close()
+    return received
+
+def run_mode(packs_dir, size, requests, concurrency, use_sendfile):
+    port = free_port()
+    cmd = [sys.executable, SERVER_SCRIPT, '--port', str(port),
+           '--packs-dir', packs_dir, '--max-conn-per-ip', '0']
+    if not use_sendfile:
+        cmd.append('--no-sendfile')
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_for_port(port):
+            raise RuntimeError("pack_server did not start")
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = [executor.submit(download, port, size, i % 2 == 1) for i in range(requests)]
+            total_bytes = sum(f.result() for f in futures)
+        elapsed = time.perf_counter() - start
+    finally:
+        # SIGINT 让 pack_server 正常退出，再用 wait4 拿到子进程 rusage
+        proc.send_signal(signal.SIGINT)
+        _, _, usage = os.wait4(proc.pid, 0)
+        proc.returncode = 0
+
+    cpu = usage.ru_utime + usage.ru_stime
+    gb = total_bytes / 1024 ** 3
+    return {
+        'mode': 'sendfile' if use_sendfile else 'buffered',
+        'bytes': total_bytes,
+        'seconds': elapsed,
+        'mb_per_s': total_bytes / 1024 ** 2 / elapsed if elapsed > 0 else 0,
+        'cpu_user': usage.ru_utime,
+        'cpu_sys': usage.ru_stime,
+        'cpu_per_gb': cpu / gb if gb > 0 else 0,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pack_server sendfile vs buffered copy")
+    parser.add_argument("--size-mb", type=int, default=256, help="Test pack size in MB")
+    parser.add_argument("--requests", type=int, default=8, help="Downloads per mode")
+    parser.add_argument("--concurrency", type=int, default=4, help="Parallel downloads")
+    args = parser.parse_args()
+
+    if not hasattr(os, 'sendfile') or not hasattr(os, 'wait4'):
+        print("❌ This benchmark needs os.sendfile and os.wait4 (Linux / macOS)")
+        return
+
+    packs_dir = tempfile.mkdtemp(prefix='pack_bench_')
+    try:
+        bench_path = os.path.join(packs_dir, BENCH_FILE)
+        make_bench_file(bench_path, args.size_mb)
+        size = os.path.getsize(bench_path)
+
+        results = []
+        for use_sendfile in (False, True):
+            result = run_mode(packs_dir, size, args.requests, args.concurrency, use_sendfile)
+            results.append(result)
+            print(f"⏱️  {result['mode']:>8}: {result['mb_per_s']:8.1f} MB/s  "
+                  f"CPU user {result['cpu_user']:.2f}s sys {result['cpu_sys']:.2f}s  "
+                  f"({result['cpu_per_gb']:.2f} CPU-s/GB)")
+
+        before, after = results
+        if after['cpu_per_gb'] > 0:
+            print(f"\n📊 sendfile: 吞吐 x{after['mb_per_s'] / before['mb_per_s']:.2f}, "
+                  f"每 GB CPU x{after['cpu_per_gb'] / before['cpu_per_gb']:.2f}")
+    finally:
+        shutil.rmtree(packs_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
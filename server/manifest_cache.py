@@ -0,0 +1,101 @@
+"""
+/api/packs 清单的内存缓存
+- 启动时读一次 packs.json，后台线程按 mtime 轮询，文件变化才重新加载
+- 预先生成 identity / gzip / br 三份编码，每份带强 ETag，请求期间零磁盘 I/O
+- brotli 为可选依赖 (pip install brotli)，未安装时只提供 gzip
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+POLL_INTERVAL = 2.0
+
+class ManifestVariant:
+    __slots__ = ('encoding', 'body', 'etag')
+
+    def __init__(self, encoding, body, etag):
+        self.encoding = encoding
+        self.body = body
+        self.etag = etag
+
+class ManifestCache:
+    def __init__(self, path, poll_interval=POLL_INTERVAL):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.last_modified = None
+        # 解析后的 {pack_id: 清单条目}，供增量包路由查询当前版本
+        self.packs = {}
+        self._variants = {}
+        self._stamp = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.reload()
+
+    def variants(self):
+        """当前可用编码 -> ManifestVariant; 清单文件不存在时为空"""
+        with self._lock:
+            return self._variants
+
+    def reload(self):
+        """stat 发现变化时重新读取并压缩，返回是否更新了缓存"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            with self._lock:
+                self._variants = {}
+                self.packs = {}
+                self._stamp = None
+            return False
+
+        stamp = (st.st_mtime_ns, st.st_size)
+        if stamp == self._stamp:
+            return False
+
+        with open(self.path, 'rb') as f:
+            raw = f.read()
+        try:
+            data = json.loads(raw)
+        except ValueError as e:
+            # 编辑器保存到一半: 继续提供上一份有效清单
+            print(f"⚠️ Manifest {self.path} is not valid JSON, keeping previous copy: {e}")
+            return False
+
+        digest = hashlib.sha256(raw).hexdigest()[:32]
+        variants = {'identity': ManifestVariant('identity', raw, f'"{digest}"')}
+        # mtime=0 保证同一内容压缩结果稳定
+        variants['gzip'] = ManifestVariant('gzip', gzip.compress(raw, 9, mtime=0), f'"{digest}-gz"')
+        if brotli is not None:
+            variants['br'] = ManifestVariant('br', brotli.compress(raw, quality=11), f'"{digest}-br"')
+
+        with self._lock:
+            self._variants = variants
+            self.packs = {p['id']: p for p in data.get('packs', []) if 'id' in p}
+            self._stamp = stamp
+            self.last_modified = st.st_mtime
+        print(f"📄 Manifest loaded: {self.path} ({len(raw)} bytes, {', '.join(variants)})")
+        return True
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name='manifest-watch', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.reload()
+            except OSError as e:
+                print(f"⚠️ Manifest reload failed: {e}")
@@ -0,0 +1,168 @@
+"""
+pack_server 的 Prometheus 文本格式指标 (无需 prometheus_client)
+- Counter / Gauge / Histogram 均按标签组合保存，线程安全
+- MetricsRegistry.render() 输出 text/plain; version=0.0.4，供 /metrics 抓取
+"""
+
+import bisect
+import threading
+
+# 请求耗时 / 首字节时间的桶 (秒)，覆盖从清单 304 到几百 MB 语音包的全部范围
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+TTFB_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        if not self.label_names and self.kind != 'histogram':
+            # 无标签的计数器从 0 开始输出，抓取端能区分 "为 0" 与 "不存在"
+            self._values[()] = 0
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}']
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DURATION_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [各桶计数 (非累计)..., +Inf 桶, sum]
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def _render_sample(self, key, state):
+        names = self.label_names + ('le',)
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), state[:-1]):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{_format_labels(names, key + (_format_value(bound),))} {cumulative}')
+        labels = _format_labels(self.label_names, key)
+        lines.append(f'{self.name}_sum{labels} {_format_value(state[-1])}')
+        lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._add(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=()):
+        return self._add(Gauge(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=DURATION_BUCKETS):
+        return self._add(Histogram(name, help_text, labels, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+class ServerMetrics:
+    """pack_server 用到的全部指标"""
+
+    def __init__(self):
+        self.registry = MetricsRegistry()
+        r = self.registry
+        self.requests = r.counter('pack_server_requests_total', 'HTTP requests handled',
+                                  ('route', 'pack', 'method', 'status'))
+        self.sent_bytes = r.counter('pack_server_sent_bytes_total', 'Bytes written to clients (headers + body)',
+                                    ('route', 'pack'))
+        self.range_requests = r.counter('pack_server_range_requests_total',
+                                        'Requests carrying a Range header (download resumes / chapter seeks)',
+                                        ('route', 'pack', 'status'))
+        self.duration = r.histogram('pack_server_request_duration_seconds', 'Time from request line to last byte',
+                                    ('route', 'pack'), DURATION_BUCKETS)
+        self.ttfb = r.histogram('pack_server_ttfb_seconds', 'Time from request line to response headers flushed',
+                                ('route', 'pack'), TTFB_BUCKETS)
+        self.in_flight = r.gauge('pack_server_in_flight_requests', 'Requests currently being served', ('route',))
+        self.connections = r.gauge('pack_server_open_connections', 'Open client connections')
+        self.rejected = r.counter('pack_server_rejected_connections_total',
+                                  'Connections refused by the per-IP limit')
+        self.audio_cache = r.gauge('pack_server_audio_cache', 'Per-chapter audio LRU state', ('stat',))
+        self.bandwidth_waiting = r.gauge('pack_server_bandwidth_waiting',
+                                         'Transfers waiting for bandwidth tokens', ('priority',))
+
+    def observe(self, route, pack, method, status, sent, duration, ttfb, ranged):
+        self.requests.inc(route=route, pack=pack, method=method, status=status)
+        self.sent_bytes.inc(sent, route=route, pack=pack)
+        self.duration.observe(duration, route=route, pack=pack)
+        if ttfb is not None:
+            self.ttfb.observe(ttfb, route=route, pack=pack)
+        if ranged:
+            self.range_requests.inc(route=route, pack=pack, status=status)
+
+    def render(self):
+        return self.registry.render()
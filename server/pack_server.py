@@ -1,19 +1,77 @@
 #!/usr/bin/env python3
 """
 资源包下载服务器 - 开发者临时测试用
-直接运行: python scripts/pack_server.py
+直接运行: python server/pack_server.py [--port 8080] [--max-conn-per-ip 4] [--no-sendfile]
 按 Ctrl+C 停止
+
+- 多线程并发服务: 一台手机慢速下载不会卡住其他手机
+- 支持 Range / 多段 Range (206 Partial Content)、If-Range、ETag、Last-Modified，
+  App 的下载器可以真正断点续传
+- 每个 IP 的并发连接数可配置 (超出返回 503 + Retry-After)
+- 大文件 (完整 / Range) 走 os.sendfile 零拷贝，不支持时回退到缓冲读写
+- /api/packs 清单常驻内存 (预压缩 gzip / br + 强 ETag)，轮询期间只需一次 304 条件请求
+- /delta/<pack_id>/<from>[/<to>] 提供版本间增量包 (省略 to 表示当前最新版本)
+- 章节音频容器 (*.eyac，见 scripts/audio_container.py) 按普通静态文件支持 Range，
+  /<name>.eyac/index 一次返回头部 + 索引，App 查到偏移后只 Range 下载正在听的章节
+- /audio/{quality}/{book}/{chapter} 按章节返回 Opus (容器或 data/opus_* 目录)，热门章节走内存 LRU，
+  命中率见 /api/audio-cache
+- /metrics 提供 Prometheus 指标 (按路由 / 包统计请求数、字节数、首字节时间、耗时、状态码、并发数)，
+  访问日志为每行一条 JSON，经队列由后台线程写出 (--access-log 指定文件，默认 stdout)
+- 可选上行带宽整形 (--max-bandwidth-mbps): 全局令牌桶 + 按客户端轮转 + 小请求优先，
+  排队状态见 /api/status
+- 文本资源 (json 等) 若有 scripts/precompress_assets.py 生成的 .br / .zst / .gz 副本，
+  按 Accept-Encoding 直接发送副本 (Vary: Accept-Encoding)，运行时不做压缩
 """
 
+import argparse
+import email.utils
+import errno
 import http.server
-import socketserver
+import logging
 import os
 import json
+import re
 import signal
 import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from urllib.parse import urlsplit
+
+from manifest_cache import ManifestCache
+from access_log import LOGGER_NAME, setup_access_log
+from bandwidth import PRIORITY_BULK, SMALL_RESPONSE_BYTES, BandwidthScheduler
+from audio_cache import AUDIO_CACHE_BYTES, QUALITIES, ChapterStore
+from metrics import ServerMetrics
+
+# audio_container / precompress_assets 与构建脚本共用，位于 scripts/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts'))
+from audio_container import AudioContainer
+from precompress_assets import ENCODING_SUFFIXES, is_text_asset
 
 PORT = 8080
 PACKS_DIR = os.path.join(os.path.dirname(__file__), 'packs')
+MANIFEST_PATH = os.path.join(os.path.dirname(__file__), 'api', 'packs.json')
+# 由 scripts/pack_resources.py 生成: deltas/<pack_id>/<from>_<to>.delta
+DELTAS_SUBDIR = 'deltas'
+# data/opus_6k、data/opus_8k 所在目录 (没有打包容器时按章节直接读取)
+AUDIO_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+# 音频容器只可能是 voice_{quality}.eyac; 指标的包标签只接受这些名字，任意请求路径不会新增标签
+CONTAINER_PACKS = frozenset(f'voice_{q}' for q in QUALITIES)
+# 章节音频 URL 不带版本，重新转码 / 打包后内容会变: 短期缓存，过期后凭 ETag 条件请求 (304) 重新验证
+AUDIO_CACHE_CONTROL = 'public, max-age=3600, must-revalidate'
+
+# 每个客户端 IP 允许的并发连接数 (0 表示不限制)
+MAX_CONN_PER_IP = 4
+# 单个请求最多接受的 Range 段数，超过则忽略 Range 返回完整文件
+MAX_RANGES = 16
+COPY_BUFFER_SIZE = 64 * 1024
+# 零拷贝: 内核直接从页缓存写入 socket，不经过 Python 用户态缓冲
+USE_SENDFILE = hasattr(os, 'sendfile')
+SENDFILE_CHUNK_SIZE = 8 * 1024 * 1024
+
+ACCESS_LOG = logging.getLogger(LOGGER_NAME)
 
 if not os.path.exists(PACKS_DIR):
     os.makedirs(PACKS_DIR)
@@ -29,47 +87,797 @@ def get_host_ip():
     except:
         return '127.0.0.1'
 
+class RangeNotSatisfiable(Exception):
+    pass
+
+_DELTA_ROUTE = re.compile(r'^/delta/([A-Za-z0-9_-]+)/([0-9a-f]+)(?:/([0-9a-f]+))?/?$')
+_AUDIO_ROUTE = re.compile(r'^/audio/([0-9a-z]+)/(\d{1,3})/(\d{1,3})(?:\.opus)?/?$')
+_CONTAINER_INDEX_ROUTE = re.compile(r'^/([A-Za-z0-9_-]+\.eyac)/index/?$')
+_RANGE_SPEC = re.compile(r'^\s*(\d*)\s*-\s*(\d*)\s*$')
+
+def parse_range_header(value, size):
+    """
+    解析 Range 请求头, 返回按起点排序、已合并重叠部分的 [(start, end), ...] (end 含)。
+    语法不合法或段数过多时返回 None (按 RFC 7233 忽略 Range, 返回 200)。
+    所有段都无法满足时抛出 RangeNotSatisfiable (416)。
+    """
+    unit, _, spec = value.partition('=')
+    if unit.strip().lower() != 'bytes' or not spec:
+        return None
+
+    specs = spec.split(',')
+    if len(specs) > MAX_RANGES:
+        return None
+
+    ranges = []
+    for item in specs:
+        m = _RANGE_SPEC.match(item)
+        if not m or (not m.group(1) and not m.group(2)):
+            return None
+        first, last = m.group(1), m.group(2)
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+            if last and end < start:
+                return None
+            if start >= size:
+                continue
+            end = min(end, size - 1)
+        else:
+            # 后缀形式 "-500": 最后 500 字节
+            suffix = int(last)
+            if suffix == 0:
+                continue
+            start = max(size - suffix, 0)
+            end = size - 1
+        ranges.append((start, end))
+
+    if not ranges:
+        raise RangeNotSatisfiable()
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def make_etag(st):
+    # 强校验 ETag: 大小 + 纳秒级 mtime，文件重新打包后一定变化
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+def parse_http_date(value):
+    try:
+        dt = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if dt is None:
+        return None
+    return int(dt.timestamp())
+
+def choose_encoding(accept_encoding, available):
+    """
+    按 Accept-Encoding (含 q 值) 在 available 中选择编码，优先 br > zstd > gzip > identity。
+    客户端明确拒绝 identity 且无可用编码时仍返回 identity (由调用方照常发送)。
+    """
+    if not accept_encoding:
+        return 'identity'
+
+    qualities = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        qualities[name] = q
+
+    default_q = qualities.get('*', 0.0)
+    best, best_q = 'identity', 0.0
+    for encoding in ('br', 'zstd', 'gzip', 'identity'):
+        if encoding == 'identity':
+            q = qualities.get('identity', qualities.get('*', 1.0))
+        elif encoding in available:
+            q = qualities.get(encoding, default_q)
+        else:
+            continue
+        # 同 q 值时按 br > zstd > gzip > identity 的顺序取第一个
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+class CountingWriter:
+    """包装 wfile，统计写给客户端的字节数 (sendfile 路径由调用方自行累加)"""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.bytes_written = 0
+
+    def write(self, data):
+        n = self._raw.write(data)
+        self.bytes_written += len(data) if n is None else n
+        return n
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
 class PackHandler(http.server.SimpleHTTPRequestHandler):
+    # HTTP/1.1 保持连接，分片 / 续传请求无需重复握手
+    protocol_version = 'HTTP/1.1'
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, directory=PACKS_DIR, **kwargs)
-    
+
+    def setup(self):
+        super().setup()
+        self.wfile = CountingWriter(self.wfile)
+
+    def handle_one_request(self):
+        # keep-alive 连接上每个请求调用一次; 只有读到请求行 (parse_request) 后才计入指标
+        # 请求行过长 (414) 等错误在 parse_request 之前发出，send_response / 访问日志用到的字段先置默认值
+        self._request_start = None
+        self._ttfb = None
+        self._status = None
+        self._sent_start = None
+        self._route, self._pack = 'invalid', ''
+        self._priority = PRIORITY_BULK
+        try:
+            super().handle_one_request()
+        finally:
+            if self._request_start is not None:
+                self.record_request()
+
+    def parse_request(self):
+        self._request_start = time.perf_counter()
+        self._ttfb = None
+        self._status = None
+        self._sent_start = self.wfile.bytes_written
+        self._route, self._pack = 'invalid', ''
+        self._priority = PRIORITY_BULK
+        ok = super().parse_request()
+        if ok:
+            self._route, self._pack = self.classify(urlsplit(self.path).path)
+        self.server.metrics.in_flight.inc(route=self._route)
+        return ok
+
+    def classify(self, route):
+        """请求 -> (路由, 包) 指标标签; 包标签只取已知的包 ID，避免随意路径撑爆标签基数"""
+        if route in ('/api/packs', '/api/packs.json'):
+            return 'manifest', ''
+        if route == '/metrics':
+            return 'metrics', ''
+        if route in ('/api/audio-cache', '/api/status'):
+            return 'status', ''
+        if route.startswith('/audio/'):
+            quality = route.split('/')[2]
+            return 'audio', f'voice_{quality}' if quality in QUALITIES else ''
+        known = self.server.manifest.packs
+        if route.startswith('/delta/'):
+            pack_id = route.split('/')[2]
+            return 'delta', pack_id if pack_id in known else ''
+        if route.endswith('/index') and '.eyac/' in route:
+            pack = route.strip('/').split('.')[0]
+            return 'container_index', pack if pack in CONTAINER_PACKS else ''
+        # voice_6k.zip / voice_6k.zip.part1 / voice_6k.p1.zip / voice_6k.eyac -> voice_6k
+        name = os.path.basename(route)
+        pack = name.split('.')[0]
+        if pack in known or (name.endswith('.eyac') and pack in CONTAINER_PACKS):
+            return 'static', pack
+        return 'static', ''
+
+    def record_request(self):
+        metrics = self.server.metrics
+        metrics.in_flight.dec(route=self._route)
+        duration = time.perf_counter() - self._request_start
+        sent = self.wfile.bytes_written - self._sent_start
+        status = self._status or 0
+        range_header = self.headers.get('Range') if self.headers else None
+        metrics.observe(self._route, self._pack, self.command or '', status, sent,
+                        duration, self._ttfb, bool(range_header))
+
+        ACCESS_LOG.info('request', extra={'fields': {
+            'client': self.client_address[0],
+            'method': self.command,
+            'path': self.path,
+            'route': self._route,
+            'pack': self._pack,
+            'status': status,
+            'bytes': sent,
+            'duration_ms': round(duration * 1000, 2),
+            'ttfb_ms': round(self._ttfb * 1000, 2) if self._ttfb is not None else None,
+            'range': range_header,
+            'user_agent': self.headers.get('User-Agent') if self.headers else None,
+        }})
+
+    def send_response(self, code, message=None):
+        if self._status is None:
+            self._status = code
+        super().send_response(code, message)
+
+    def flush_headers(self):
+        if self._ttfb is None and self._request_start is not None:
+            self._ttfb = time.perf_counter() - self._request_start
+        super().flush_headers()
+
     def do_GET(self):
         # Support both old and new paths for compatibility
-        if self.path == '/api/packs' or self.path == '/api/packs.json':
-            # Use packs.json as the source of truth
-            mock_file = os.path.join(os.path.dirname(__file__), 'api', 'packs.json')
-            if os.path.exists(mock_file):
+        route = urlsplit(self.path).path
+        if route == '/api/packs' or route == '/api/packs.json':
+            self.serve_manifest(head_only=False)
+            return
+        if route.startswith('/delta/'):
+            self.serve_delta(route, head_only=False)
+            return
+        if route.startswith('/audio/'):
+            self.serve_audio(route, head_only=False)
+            return
+        if route == '/api/audio-cache':
+            self.serve_json(self.server.audio.stats(), head_only=False)
+            return
+        if route == '/api/status':
+            self.serve_json(self.server.status(), head_only=False)
+            return
+        if route == '/metrics':
+            self.serve_metrics(head_only=False)
+            return
+        if route.endswith('/index') and '.eyac/' in route:
+            self.serve_container_index(route, head_only=False)
+            return
+
+        # 其他请求作为静态文件处理
+        self.serve_static(head_only=False)
+
+    def do_HEAD(self):
+        route = urlsplit(self.path).path
+        if route == '/api/packs' or route == '/api/packs.json':
+            self.serve_manifest(head_only=True)
+            return
+        if route.startswith('/delta/'):
+            self.serve_delta(route, head_only=True)
+            return
+        if route.startswith('/audio/'):
+            self.serve_audio(route, head_only=True)
+            return
+        if route == '/api/audio-cache':
+            self.serve_json(self.server.audio.stats(), head_only=True)
+            return
+        if route == '/api/status':
+            self.serve_json(self.server.status(), head_only=True)
+            return
+        if route == '/metrics':
+            self.serve_metrics(head_only=True)
+            return
+        if route.endswith('/index') and '.eyac/' in route:
+            self.serve_container_index(route, head_only=True)
+            return
+        self.serve_static(head_only=True)
+
+    def serve_manifest(self, head_only):
+        # packs.json 是唯一数据源，内存中已缓存各编码版本
+        variants = self.server.manifest.variants()
+        if not variants:
+            self.send_error(404, f"Mock packs file not found: {self.server.manifest.path}")
+            return
+
+        encoding = choose_encoding(self.headers.get('Accept-Encoding'), variants)
+        variant = variants[encoding]
+
+        not_modified = self.etag_matches(variant.etag)
+        self.send_response(304 if not_modified else 200)
+        if not not_modified:
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(variant.body)))
+            if encoding != 'identity':
+                self.send_header('Content-Encoding', encoding)
+        self.send_header('ETag', variant.etag)
+        self.send_header('Last-Modified', email.utils.formatdate(self.server.manifest.last_modified, usegmt=True))
+        # 客户端可缓存，但每次使用前须带 If-None-Match 重新验证
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        if not not_modified and not head_only:
+            self.write_body(variant.body)
+
+    def serve_delta(self, route, head_only):
+        m = _DELTA_ROUTE.match(route)
+        if not m:
+            self.send_error(404, "Bad delta path, expected /delta/<pack_id>/<from>[/<to>]")
+            return
+        pack_id, from_version, to_version = m.groups()
+        if to_version is None:
+            pack = self.server.manifest.packs.get(pack_id)
+            if not pack or 'version' not in pack:
+                self.send_error(404, f"Unknown pack: {pack_id}")
+                return
+            to_version = pack['version']
+
+        if from_version == to_version:
+            # 已是最新版本; 204 不能带 Content-Length (RFC 9110 §8.6)，本身就没有响应体
+            self.send_response(204)
+            self.send_header('X-Pack-Version', to_version)
+            self.end_headers()
+            return
+
+        path = os.path.join(PACKS_DIR, DELTAS_SUBDIR, pack_id, f"{from_version}_{to_version}.delta")
+        if not os.path.isfile(path):
+            # 客户端收到 404 后回退到完整包下载
+            self.send_error(404, f"No delta for {pack_id} {from_version} -> {to_version}")
+            return
+        self.serve_static(head_only, path=path, ctype='application/zip',
+                          extra_headers={'X-Pack-Version': to_version})
+
+    def serve_audio(self, route, head_only):
+        m = _AUDIO_ROUTE.match(route)
+        if not m:
+            self.send_error(404, "Bad audio path, expected /audio/<quality>/<book>/<chapter>")
+            return
+        quality, book, chapter = m.group(1), int(m.group(2)), int(m.group(3))
+        item = self.server.audio.get(quality, book, chapter)
+        if item is None:
+            self.send_error(404, f"No {quality} audio for {book}:{chapter}")
+            return
+
+        headers = {
+            'ETag': item.etag,
+            'Cache-Control': AUDIO_CACHE_CONTROL,
+            'Accept-Ranges': 'bytes',
+            'Access-Control-Allow-Origin': '*',
+        }
+        if self.etag_matches(item.etag):
+            self.send_response(304)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+
+        size = len(item.data)
+        start, end = 0, size - 1
+        range_header = self.headers.get('Range')
+        if range_header and self.if_range_matches(item.etag, None):
+            try:
+                ranges = parse_range_header(range_header, size)
+            except RangeNotSatisfiable:
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            # 播放器拖动进度只会请求单段; 多段时按完整内容返回
+            if ranges and len(ranges) == 1:
+                start, end = ranges[0]
+                headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+
+        self.send_response(206 if 'Content-Range' in headers else 200)
+        self.send_file_headers('audio/ogg', end - start + 1, headers)
+        self.end_headers()
+        if not head_only:
+            try:
+                self.write_body(memoryview(item.data)[start:end + 1])
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+
+    def serve_json(self, data, head_only):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(body)
+
+    def serve_metrics(self, head_only):
+        metrics = self.server.metrics
+        for stat, value in self.server.audio.stats().items():
+            if isinstance(value, (int, float)):
+                metrics.audio_cache.set(value, stat=stat)
+        for priority, waiting in self.server.bandwidth.stats()['waiting'].items():
+            metrics.bandwidth_waiting.set(waiting, priority=priority)
+        body = metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        if not head_only:
+            self.wfile.write(body)
+
+    def serve_container_index(self, route, head_only):
+        m = _CONTAINER_INDEX_ROUTE.match(route)
+        path = os.path.join(PACKS_DIR, m.group(1)) if m else None
+        if not path or not os.path.isfile(path):
+            self.send_error(404, "Audio container not found")
+            return
+        try:
+            with AudioContainer(path) as container:
+                body = container.index_bytes()
+                st = container.stat
+        except (OSError, ValueError) as e:
+            self.send_error(500, f"Bad audio container: {e}")
+            return
+
+        # 索引随容器一起变化，沿用容器的 ETag (加后缀区分表示)
+        etag = make_etag(st)[:-1] + '-index"'
+        not_modified = self.etag_matches(etag)
+        self.send_response(304 if not_modified else 200)
+        if not not_modified:
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.send_header('Last-Modified', email.utils.formatdate(st.st_mtime, usegmt=True))
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        if not not_modified and not head_only:
+            self.wfile.write(body)
+
+    def serve_static(self, head_only, path=None, ctype=None, extra_headers=None):
+        if path is None:
+            path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            # 目录 (列表 / 重定向) 仍交给 SimpleHTTPRequestHandler
+            if head_only:
+                super().do_HEAD()
+            else:
+                super().do_GET()
+            return
+
+        extra_headers = dict(extra_headers or {})
+        if is_text_asset(path):
+            ctype = ctype or self.guess_type(path)
+            extra_headers['Vary'] = 'Accept-Encoding'
+            # 续传请求的 Range 针对原始字节，只对完整请求换成压缩副本
+            if not self.headers.get('Range'):
+                encoding, path = self.choose_precompressed(path)
+                if encoding != 'identity':
+                    extra_headers['Content-Encoding'] = encoding
+
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self.send_error(404, "File not found")
+            return
+
+        with f:
+            st = os.fstat(f.fileno())
+            size = st.st_size
+            etag = make_etag(st)
+            last_modified = email.utils.formatdate(st.st_mtime, usegmt=True)
+
+            if self.is_not_modified(etag, st.st_mtime):
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', last_modified)
+                if 'Vary' in extra_headers:
+                    self.send_header('Vary', extra_headers['Vary'])
+                self.end_headers()
+                return
+
+            ranges = None
+            range_header = self.headers.get('Range')
+            if range_header and self.if_range_matches(etag, st.st_mtime):
+                try:
+                    ranges = parse_range_header(range_header, size)
+                except RangeNotSatisfiable:
+                    self.send_response(416)
+                    self.send_header('Content-Range', f'bytes */{size}')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+            ctype = ctype or self.guess_type(path)
+            headers = {'Accept-Ranges': 'bytes', 'ETag': etag, 'Last-Modified': last_modified}
+            headers.update(extra_headers)
+            if not ranges:
                 self.send_response(200)
-                self.send_header('Content-Type', 'application/json; charset=utf-8')
-                self.send_header('Access-Control-Allow-Origin', '*')
+                self.send_file_headers(ctype, size, headers)
                 self.end_headers()
-                # Read as text to ensure correct content length/encoding if needed, 
-                # but binary read is fine for simple serving
-                with open(mock_file, 'rb') as f:
-                    self.wfile.write(f.read())
+                if not head_only:
+                    self.copy_range(f, 0, size)
+            elif len(ranges) == 1:
+                start, end = ranges[0]
+                self.send_response(206)
+                self.send_file_headers(ctype, end - start + 1, headers)
+                self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+                self.end_headers()
+                if not head_only:
+                    self.copy_range(f, start, end - start + 1)
             else:
-                self.send_error(404, f"Mock packs file not found: {mock_file}")
+                self.send_multipart(f, ranges, size, ctype, headers, head_only)
+
+    def choose_precompressed(self, path):
+        """返回 (编码, 路径): 只考虑不比源文件旧的压缩副本，没有合适副本时为 ('identity', path)"""
+        try:
+            src_mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return 'identity', path
+        available = {}
+        for encoding, suffix in ENCODING_SUFFIXES.items():
+            try:
+                if os.stat(path + suffix).st_mtime_ns >= src_mtime:
+                    available[encoding] = path + suffix
+            except OSError:
+                continue
+        if not available:
+            return 'identity', path
+        encoding = choose_encoding(self.headers.get('Accept-Encoding'), available)
+        return encoding, available.get(encoding, path)
+
+    def send_file_headers(self, ctype, length, headers):
+        self._priority = self.server.bandwidth.priority_for(length)
+        self.send_header('Content-Type', ctype)
+        self.send_header('Content-Length', str(length))
+        for name, value in headers.items():
+            self.send_header(name, value)
+
+    def send_multipart(self, f, ranges, size, ctype, headers, head_only):
+        boundary = uuid.uuid4().hex
+        part_heads = [
+            (f'--{boundary}\r\n'
+             f'Content-Type: {ctype}\r\n'
+             f'Content-Range: bytes {start}-{end}/{size}\r\n\r\n').encode('ascii')
+            for start, end in ranges
+        ]
+        tail = f'--{boundary}--\r\n'.encode('ascii')
+        length = len(tail) + sum(
+            len(head) + (end - start + 1) + 2
+            for head, (start, end) in zip(part_heads, ranges)
+        )
+
+        self.send_response(206)
+        self.send_file_headers(f'multipart/byteranges; boundary={boundary}', length, headers)
+        self.end_headers()
+        if head_only:
             return
-        
-        # 其他请求作为静态文件处理
-        super().do_GET()
-    
+
+        for head, (start, end) in zip(part_heads, ranges):
+            self.wfile.write(head)
+            if not self.copy_range(f, start, end - start + 1):
+                return
+            self.wfile.write(b'\r\n')
+        self.wfile.write(tail)
+
+    def copy_range(self, f, start, length):
+        """把文件 [start, start + length) 写给客户端，客户端断开时返回 False"""
+        try:
+            sent = 0
+            if self.server.use_sendfile:
+                sent = self.sendfile_range(f, start, length)
+            if sent < length:
+                self.buffered_range(f, start + sent, length - sent)
+        except (BrokenPipeError, ConnectionResetError):
+            # 手机切后台 / 断网: 下次带 Range 续传即可
+            self.close_connection = True
+            return False
+        return True
+
+    def throttle(self, nbytes):
+        """带宽整形: 发送 nbytes 之前按优先级 / 客户端排队领取令牌 (未开启时立即返回)"""
+        self.server.bandwidth.acquire(self.client_address[0], nbytes, self._priority)
+
+    def write_body(self, data):
+        """写出内存中的响应体 (清单、章节音频等)，开启整形时分块领取令牌"""
+        bandwidth = self.server.bandwidth
+        if not bandwidth.enabled:
+            self.wfile.write(data)
+            return
+        self._priority = bandwidth.priority_for(len(data))
+        view = memoryview(data)
+        for pos in range(0, len(view), bandwidth.chunk_size):
+            chunk = view[pos:pos + bandwidth.chunk_size]
+            self.throttle(len(chunk))
+            self.wfile.write(chunk)
+
+    def sendfile_range(self, f, start, length):
+        """os.sendfile 零拷贝发送，返回已发送字节数; 平台 / 文件不支持时返回已发部分交给缓冲回退"""
+        out_fd = self.connection.fileno()
+        in_fd = f.fileno()
+        offset = start
+        end = start + length
+        # 整形时按小块发送，每块之前领取令牌
+        chunk_size = self.server.bandwidth.chunk_size if self.server.bandwidth.enabled else SENDFILE_CHUNK_SIZE
+        while offset < end:
+            count = min(chunk_size, end - offset)
+            self.throttle(count)
+            try:
+                sent = os.sendfile(out_fd, in_fd, offset, count)
+            except OSError as e:
+                if e.errno in (errno.EINVAL, errno.ENOSYS, errno.ENOTSOCK, errno.EOPNOTSUPP):
+                    # 例如 socket 被包装 (TLS) 或文件系统不支持，后续请求不再尝试
+                    self.server.use_sendfile = False
+                    break
+                raise
+            if sent == 0:
+                break
+            offset += sent
+            self.wfile.bytes_written += sent
+        return offset - start
+
+    def buffered_range(self, f, start, length):
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(COPY_BUFFER_SIZE, remaining))
+            if not chunk:
+                break
+            self.throttle(len(chunk))
+            self.wfile.write(chunk)
+            remaining -= len(chunk)
+
+    def is_not_modified(self, etag, mtime):
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            # If-None-Match 优先于 If-Modified-Since (弱比较)
+            return self.etag_matches(etag)
+
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            since = parse_http_date(if_modified_since)
+            return since is not None and int(mtime) <= since
+        return False
+
+    def etag_matches(self, etag):
+        """If-None-Match 弱比较"""
+        if_none_match = self.headers.get('If-None-Match')
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == '*':
+            return True
+        tags = [t.strip() for t in if_none_match.split(',')]
+        return any(t.removeprefix('W/') == etag for t in tags)
+
+    def if_range_matches(self, etag, mtime):
+        if_range = self.headers.get('If-Range')
+        if not if_range:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith('"') or if_range.startswith('W/'):
+            # If-Range 必须强比较，弱 ETag 永远不匹配
+            return if_range == etag
+        return mtime is not None and parse_http_date(if_range) == int(mtime)
+
+    def log_request(self, code='-', size='-'):
+        # 每个请求结束时由 record_request 写一条结构化日志
+        pass
+
     def log_message(self, format, *args):
-        print(f"[{self.log_date_time_string()}] {args[0]}")
+        ACCESS_LOG.warning('message', extra={'fields': {
+            'client': self.client_address[0],
+            'message': format % args,
+        }})
+
+class PackServer(http.server.ThreadingHTTPServer):
+    """每个连接一个线程，并按客户端 IP 限制并发连接数"""
+    daemon_threads = True
+    allow_reuse_address = True
+    # socketserver 默认 listen backlog 只有 5，几十台手机同时连接会触发 1s 的 SYN 重传
+    request_queue_size = 128
+
+    def __init__(self, server_address, handler_class, max_conn_per_ip=MAX_CONN_PER_IP,
+                 use_sendfile=USE_SENDFILE, manifest_path=MANIFEST_PATH,
+                 audio_root=AUDIO_ROOT, audio_cache_bytes=AUDIO_CACHE_BYTES, bandwidth=None):
+        super().__init__(server_address, handler_class)
+        self.manifest = ManifestCache(manifest_path).start()
+        self.audio = ChapterStore(PACKS_DIR, audio_root, audio_cache_bytes)
+        self.metrics = ServerMetrics()
+        self.bandwidth = bandwidth or BandwidthScheduler()
+        self.max_conn_per_ip = max_conn_per_ip
+        self.use_sendfile = use_sendfile
+        self._conn_lock = threading.Lock()
+        self._conn_per_ip = Counter()
+
+    def process_request(self, request, client_address):
+        ip = client_address[0]
+        with self._conn_lock:
+            rejected = (self.max_conn_per_ip > 0
+                        and self._conn_per_ip[ip] >= self.max_conn_per_ip)
+            if not rejected:
+                self._conn_per_ip[ip] += 1
+
+        if rejected:
+            self.metrics.rejected.inc()
+            try:
+                request.sendall(b'HTTP/1.1 503 Service Unavailable\r\n'
+                                b'Retry-After: 1\r\n'
+                                b'Content-Length: 0\r\n'
+                                b'Connection: close\r\n\r\n')
+            except OSError:
+                pass
+            self.shutdown_request(request)
+            return
+
+        self.metrics.connections.inc()
+        try:
+            super().process_request(request, client_address)
+        except Exception:
+            self._release(ip)
+            raise
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self._release(client_address[0])
+
+    def status(self):
+        """/api/status: 连接、带宽排队和章节缓存的当前状态"""
+        with self._conn_lock:
+            connections = dict(self._conn_per_ip)
+        return {
+            'connections': sum(connections.values()),
+            'connections_by_client': connections,
+            'max_conn_per_ip': self.max_conn_per_ip,
+            'bandwidth': self.bandwidth.stats(),
+            'audio_cache': self.audio.stats(),
+        }
+
+    def _release(self, ip):
+        self.metrics.connections.dec()
+        with self._conn_lock:
+            self._conn_per_ip[ip] -= 1
+            if self._conn_per_ip[ip] <= 0:
+                del self._conn_per_ip[ip]
 
 def signal_handler(sig, frame):
     print("\n👋 服务器已停止")
     sys.exit(0)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resource pack download server")
+    parser.add_argument("--port", type=int, default=PORT, help="Listen port")
+    parser.add_argument("--max-conn-per-ip", type=int, default=MAX_CONN_PER_IP,
+                        help="Concurrent connections allowed per client IP (0 = unlimited)")
+    parser.add_argument("--no-sendfile", action="store_true",
+                        help="Disable the os.sendfile zero-copy path (buffered copy only)")
+    parser.add_argument("--packs-dir", default=PACKS_DIR, help="Directory to serve packs from")
+    parser.add_argument("--manifest", default=MANIFEST_PATH, help="packs.json served at /api/packs")
+    parser.add_argument("--audio-root", default=AUDIO_ROOT,
+                        help="Directory containing opus_6k / opus_8k for /audio/ requests")
+    parser.add_argument("--audio-cache-mb", type=int, default=AUDIO_CACHE_BYTES // (1024 * 1024),
+                        help="In-memory LRU size for per-chapter audio")
+    parser.add_argument("--access-log", help="Append JSON access logs to this file (default: stdout)")
+    parser.add_argument("--max-bandwidth-mbps", type=float, default=0,
+                        help="Total upload cap in Mbit/s shared fairly between clients (0 = unlimited)")
+    parser.add_argument("--burst-kb", type=int, default=0,
+                        help="Token bucket size in KB (default: 1/4 second of bandwidth)")
+    parser.add_argument("--small-request-kb", type=int, default=SMALL_RESPONSE_BYTES // 1024,
+                        help="Responses up to this size are scheduled ahead of bulk pack transfers")
+    args = parser.parse_args()
+
+    PACKS_DIR = os.path.abspath(args.packs_dir)
+    use_sendfile = USE_SENDFILE and not args.no_sendfile
+    bandwidth = BandwidthScheduler(int(args.max_bandwidth_mbps * 1000 * 1000 / 8),
+                                   args.burst_kb * 1024, args.small_request_kb * 1024)
+
     signal.signal(signal.SIGINT, signal_handler)
-    
+    _, log_listener = setup_access_log(args.access_log)
+
     host_ip = get_host_ip()
     print(f"🚀 资源包服务器启动")
     print(f"📂 包目录: {PACKS_DIR}")
-    print(f"🌐 本地访问: http://localhost:{PORT}/api/packs")
-    print(f"🌐 局域网访问: http://{host_ip}:{PORT}/api/packs")
+    print(f"🌐 本地访问: http://localhost:{args.port}/api/packs")
+    print(f"🌐 局域网访问: http://{host_ip}:{args.port}/api/packs")
+    print(f"🔒 每 IP 并发连接上限: {args.max_conn_per_ip or '不限'}")
+    print(f"⚡ sendfile 零拷贝: {'开启' if use_sendfile else '关闭'}")
+    print(f"🎧 章节音频缓存: {args.audio_cache_mb} MB")
+    print(f"📈 指标: http://localhost:{args.port}/metrics")
+    print(f"🚦 上行带宽上限: {f'{args.max_bandwidth_mbps:g} Mbit/s' if bandwidth.enabled else '不限'}")
     print(f"按 Ctrl+C 停止服务器\n")
-    
-    with socketserver.TCPServer(("", PORT), PackHandler) as httpd:
-        httpd.serve_forever()
+
+    with PackServer(("", args.port), PackHandler, args.max_conn_per_ip, use_sendfile,
+                    args.manifest, args.audio_root, args.audio_cache_mb * 1024 * 1024,
+                    bandwidth) as httpd:
+        try:
+            httpd.serve_forever()
+        finally:
+            # 把队列里尚未写出的访问日志刷完
+            log_listener.stop()
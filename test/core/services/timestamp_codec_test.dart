@@ -0,0 +1,44 @@
+import 'dart:typed_data';
+
+import 'package:flutter_test/flutter_test.dart';
+import 'package:gracewords/core/services/timestamp_codec.dart';
+
+void main() {
+  // Encoded by scripts/timestamp_codec.py from
+  // {"1": {"1": [[0.0, 0.5], [0.5, 1.25]]}, "2": {"3": [[1.0, 2.0], [1.5, 1.0]]}}
+  final encoded = Uint8List.fromList([
+    69, 89, 84, 83, 1, 0, 0, 0, 2, 0, 0, 0, //
+    1, 1, 2, 0, 0, 0, 0, 0, //
+    2, 3, 2, 0, 6, 0, 0, 0, //
+    0, 0, 244, 3, 238, 5, //
+    1, 208, 15, 208, 15, 231, 7, 231, 7,
+  ]);
+
+  group('TimestampFile', () {
+    test('decodes contiguous chapters', () {
+      final file = TimestampFile(encoded);
+      expect(file.chapterCount, 2);
+      expect(file.chapter(1, 1), [
+        [0.0, 0.5],
+        [0.5, 1.25],
+      ]);
+    });
+
+    test('decodes non-contiguous chapters', () {
+      expect(TimestampFile(encoded).chapter(2, 3), [
+        [1.0, 2.0],
+        [1.5, 1.0],
+      ]);
+    });
+
+    test('returns empty list for missing chapters', () {
+      final file = TimestampFile(encoded);
+      expect(file.contains(1, 2), false);
+      expect(file.chapter(1, 2), isEmpty);
+    });
+
+    test('rejects other files', () {
+      expect(() => TimestampFile(Uint8List.fromList(List.filled(12, 0))), throwsFormatException);
+    });
+  });
+}